@@ -0,0 +1,8 @@
+"""
+Performance benchmarks for the intent classifier and query agent.
+
+Run from the backend directory:
+
+    python -m benchmarks --output bench.json
+    python -m benchmarks --compare baseline.json bench.json
+"""
@@ -0,0 +1,74 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+
+from config import CATEGORIES, MODEL_CONFIG, MODEL_PATH, CONFIDENCE_THRESHOLD, PREDICTION_CACHE
+from training_data import training_data
+from utils import IntentClassifier, QueryAgent
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.suite import (
+    bench_predict, bench_handle_query, bench_batch_throughput, bench_cold_start, environment
+)
+from benchmarks.compare import compare_files
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent classifier benchmarks")
+    parser.add_argument('--queries', type=int, default=5000, help='Synthetic queries per latency benchmark')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 256, 1024])
+    parser.add_argument('--cold-start-runs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', '-o', type=str, default='bench_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help='Compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative change that counts as a regression in --compare')
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare_files(*args.compare, threshold=args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+        return
+
+    classifier = IntentClassifier(MODEL_CONFIG, CATEGORIES)
+    classifier.enable_cache(PREDICTION_CACHE['max_size'], PREDICTION_CACHE['ttl_seconds'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        classifier.load_model(MODEL_PATH)
+    agent = QueryAgent(classifier, CONFIDENCE_THRESHOLD)
+
+    corpus = generate_corpus(training_data, args.queries, args.seed)
+
+    print("Benchmarking predict...")
+    predict = bench_predict(classifier, corpus, CONFIDENCE_THRESHOLD)
+    print("Benchmarking handle_query...")
+    classifier.cache.clear()
+    handle_query = bench_handle_query(agent, corpus)
+    print("Benchmarking batch throughput...")
+    batch = bench_batch_throughput(classifier, corpus, args.batch_sizes, CONFIDENCE_THRESHOLD)
+    print("Benchmarking cold start...")
+    cold_start = bench_cold_start(args.cold_start_runs, corpus)
+
+    results = {
+        "environment": environment(),
+        "settings": {"queries": args.queries, "seed": args.seed, "model_path": MODEL_PATH},
+        "metrics": {
+            "predict": predict,
+            "handle_query": handle_query,
+            "batch": batch,
+            "cold_start": cold_start,
+        },
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results["metrics"], indent=2))
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
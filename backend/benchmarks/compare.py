@@ -0,0 +1,54 @@
+"""Compare two benchmark result files and flag regressions"""
+
+import json
+
+# Metrics where a larger value is an improvement; everything else is a cost
+HIGHER_IS_BETTER = ("throughput_qps", "hit_rate")
+IGNORED = ("count",)
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+def compare(baseline, candidate, threshold=0.10):
+    """Return rows of (metric, baseline, candidate, relative change, regressed)"""
+    old = flatten(baseline["metrics"])
+    new = flatten(candidate["metrics"])
+    rows = []
+
+    for metric in sorted(old.keys() & new.keys()):
+        if metric.rsplit(".", 1)[-1] in IGNORED:
+            continue
+
+        before, after = old[metric], new[metric]
+        change = (after - before) / before if before else 0.0
+        if metric.endswith(HIGHER_IS_BETTER):
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+        rows.append((metric, before, after, change, regressed))
+
+    return rows
+
+def print_comparison(rows):
+    width = max((len(row[0]) for row in rows), default=10)
+    print(f"{'metric':<{width}} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for metric, before, after, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric:<{width}} {before:>12.4g} {after:>12.4g} {change:>+8.1%}{flag}")
+
+def compare_files(baseline_path, candidate_path, threshold=0.10):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, threshold)
+    print_comparison(rows)
+    return [row for row in rows if row[4]]
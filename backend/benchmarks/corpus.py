@@ -0,0 +1,32 @@
+"""Synthetic query corpora derived from training_data.py"""
+
+import random
+
+FILLERS = ["please", "bhai", "can you tell me", "quickly", "for me", "now", "sir"]
+PUNCTUATION = ["", "?", "!", ".", "??"]
+
+def mutate(text: str, rng: random.Random) -> str:
+    """Perturb a training utterance the way real driver messages differ from it"""
+    words = text.split()
+
+    if len(words) > 2 and rng.random() < 0.3:
+        del words[rng.randrange(len(words))]
+    if rng.random() < 0.4:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS))
+    if rng.random() < 0.2:
+        words = [word.upper() if rng.random() < 0.3 else word for word in words]
+
+    return " ".join(words).rstrip("?!.") + rng.choice(PUNCTUATION)
+
+def generate_corpus(training_data, size, seed=42, repeat_ratio=0.3):
+    """Return size queries; repeat_ratio of them re-use an earlier query verbatim"""
+    rng = random.Random(seed)
+    texts = [text for text, _ in training_data]
+    corpus = []
+
+    for _ in range(size):
+        if corpus and rng.random() < repeat_ratio:
+            corpus.append(rng.choice(corpus))
+        else:
+            corpus.append(mutate(rng.choice(texts), rng))
+    return corpus
@@ -0,0 +1,128 @@
+"""Latency, throughput, cold-start and memory measurements"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so imports and model loading are really cold
+COLD_START_SCRIPT = """
+import json, resource, time
+start = time.perf_counter()
+from config import CATEGORIES, MODEL_CONFIG, MODEL_PATH
+from utils import IntentClassifier
+imported = time.perf_counter()
+classifier = IntentClassifier(MODEL_CONFIG, CATEGORIES)
+classifier.load_model(MODEL_PATH)
+loaded = time.perf_counter()
+classifier.predict("what are my earnings today")
+first = time.perf_counter()
+classifier.predict_batch(QUERIES)
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "load_model_ms": (loaded - imported) * 1000,
+    "first_predict_ms": (first - loaded) * 1000,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+def summarize(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {
+        "count": int(samples.size),
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "max_ms": round(float(samples.max()), 4),
+    }
+
+def time_each(fn, corpus, warmup=100):
+    for text in corpus[:warmup]:
+        fn(text)
+
+    samples = []
+    for text in corpus:
+        start = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+def bench_predict(classifier, corpus, threshold):
+    """IntentClassifier.predict with and without the prediction cache"""
+    cache, router = classifier.cache, classifier.router
+    classifier.cache, classifier.router = None, None
+    try:
+        results = {"uncached": time_each(lambda text: classifier.predict(text, threshold), corpus)}
+        if cache is not None:
+            cache.clear()
+            classifier.cache = cache
+            results["cached"] = time_each(lambda text: classifier.predict(text, threshold), corpus, warmup=0)
+            results["cached"]["hit_rate"] = cache.stats()["hit_rate"]
+    finally:
+        classifier.cache, classifier.router = cache, router
+    return results
+
+def bench_handle_query(agent, corpus):
+    """Classification plus handler dispatch, as the CLI and server run it"""
+    return time_each(agent.handle_query, corpus)
+
+def bench_batch_throughput(classifier, corpus, batch_sizes, threshold):
+    cache = classifier.cache
+    classifier.cache = None
+    results = {}
+    try:
+        for batch_size in batch_sizes:
+            batches = [corpus[i:i + batch_size] for i in range(0, len(corpus), batch_size)]
+            start = time.perf_counter()
+            for batch in batches:
+                classifier.predict_batch(batch, threshold)
+            elapsed = time.perf_counter() - start
+            results[str(batch_size)] = {"throughput_qps": round(len(corpus) / elapsed, 1)}
+    finally:
+        classifier.cache = cache
+    return results
+
+def bench_cold_start(runs, corpus):
+    """Fresh-process import + load_model time and peak RSS of one worker"""
+    script = COLD_START_SCRIPT.replace("QUERIES", repr(corpus[:1000]))
+    samples = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", script], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        sample = json.loads(completed.stdout.strip().splitlines()[-1])
+        sample["process_wall_ms"] = wall_ms
+        samples.append(sample)
+
+    return {
+        key: round(float(np.median([sample[key] for sample in samples])), 3)
+        for key in samples[0]
+    }
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True,
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
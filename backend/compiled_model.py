@@ -0,0 +1,220 @@
+"""
+NumPy-only intent model exported from the trained sklearn Pipeline.
+
+Serving only needs to tokenize, weight terms by IDF and take one product
+with the LogisticRegression coefficients, so the exported predictor keeps
+just those arrays. It mirrors the Pipeline interface used by
+IntentClassifier (named_steps['tfidf'].transform,
+named_steps['clf'].predict_proba and classes_) and never imports sklearn.
+"""
+
+import re
+import numpy as np
+
+class SparseRows:
+    """Minimal CSR matrix: row i holds indices/data[indptr[i]:indptr[i + 1]]"""
+
+    def __init__(self, indptr, indices, data):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @property
+    def shape(self):
+        return (len(self.indptr) - 1,)
+
+class CompiledTfidfVectorizer:
+    def __init__(self, vocabulary, idf, stop_words, token_pattern,
+                 ngram_range=(1, 1), lowercase=True, norm='l2', sublinear_tf=False):
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.stop_words = frozenset(stop_words)
+        self.token_pattern = token_pattern
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self._token_re = re.compile(token_pattern)
+
+    def analyze(self, text: str):
+        """Same word n-grams as TfidfVectorizer's default word analyzer"""
+        if self.lowercase:
+            text = text.lower()
+
+        tokens = [t for t in self._token_re.findall(text) if t not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+
+        original_tokens = tokens
+        if min_n == 1:
+            tokens = list(original_tokens)
+            min_n += 1
+        else:
+            tokens = []
+
+        n_original = len(original_tokens)
+        for n in range(min_n, min(max_n + 1, n_original + 1)):
+            for i in range(n_original - n + 1):
+                tokens.append(" ".join(original_tokens[i:i + n]))
+        return tokens
+
+    def transform(self, texts):
+        indptr = [0]
+        indices = []
+        data = []
+
+        for text in texts:
+            counts = {}
+            for term in self.analyze(text):
+                index = self.vocabulary.get(term)
+                if index is not None:
+                    counts[index] = counts.get(index, 0) + 1
+
+            row_indices = sorted(counts)
+            indices.extend(row_indices)
+            data.extend(counts[i] for i in row_indices)
+            indptr.append(len(indices))
+
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        data = np.asarray(data, dtype=np.float64)
+
+        if self.sublinear_tf:
+            data = np.log(data) + 1
+        data *= self.idf[indices]
+
+        if self.norm:
+            row_ids = np.repeat(np.arange(len(texts)), np.diff(indptr))
+            if self.norm == 'l2':
+                norms = np.sqrt(np.bincount(row_ids, weights=data * data, minlength=len(texts)))
+            else:
+                norms = np.bincount(row_ids, weights=np.abs(data), minlength=len(texts))
+            norms[norms == 0] = 1
+            data /= norms[row_ids]
+
+        return SparseRows(indptr, indices, data)
+
+class CompiledLogisticRegression:
+    def __init__(self, coef_by_feature, intercept, classes):
+        # Feature-major (n_features, n_classes) layout so each non-zero term
+        # gathers one contiguous row; kept as-is so memory-mapped arrays stay shared
+        self.coef_by_feature = np.asarray(coef_by_feature, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+
+    @property
+    def coef(self):
+        return self.coef_by_feature.T
+
+    def to_arrays(self):
+        return {
+            'coef_by_feature': self.coef_by_feature,
+            'intercept': self.intercept,
+            'classes': self.classes_.astype(str),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['coef_by_feature'], arrays['intercept'], arrays['classes'])
+
+    def decision_function(self, features):
+        n_rows = features.shape[0]
+        scores = np.tile(self.intercept, (n_rows, 1))
+        row_ids = np.repeat(np.arange(n_rows), np.diff(features.indptr))
+        np.add.at(scores, row_ids, features.data[:, None] * self.coef_by_feature[features.indices])
+        return scores
+
+    def predict_proba(self, features):
+        scores = self.decision_function(features)
+
+        if scores.shape[1] == 1:
+            positive = 1 / (1 + np.exp(-scores[:, 0]))
+            return np.column_stack([1 - positive, positive])
+
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+class CompiledIntentModel:
+    """Drop-in replacement for the trained Pipeline at prediction time"""
+
+    model_type = "tfidf_logreg"
+    classifier_class = CompiledLogisticRegression
+
+    def __init__(self, vectorizer, classifier):
+        self.named_steps = {'tfidf': vectorizer, 'clf': classifier}
+        self.steps = list(self.named_steps.items())
+        self.classes_ = classifier.classes_
+
+    def predict_proba(self, texts):
+        return self.named_steps['clf'].predict_proba(self.named_steps['tfidf'].transform(texts))
+
+    def to_arrays(self):
+        vectorizer = self.named_steps['tfidf']
+        classifier = self.named_steps['clf']
+        terms = sorted(vectorizer.vocabulary, key=vectorizer.vocabulary.get)
+
+        return {
+            'terms': np.asarray(terms, dtype=str),
+            'idf': vectorizer.idf,
+            'stop_words': np.asarray(sorted(vectorizer.stop_words), dtype=str),
+            'token_pattern': np.asarray(vectorizer.token_pattern),
+            'ngram_range': np.asarray(vectorizer.ngram_range, dtype=np.int64),
+            'lowercase': np.asarray(vectorizer.lowercase),
+            'norm': np.asarray(vectorizer.norm or ''),
+            'sublinear_tf': np.asarray(vectorizer.sublinear_tf),
+            **classifier.to_arrays(),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        vocabulary = {str(term): i for i, term in enumerate(arrays['terms'])}
+        vectorizer = CompiledTfidfVectorizer(
+            vocabulary,
+            arrays['idf'],
+            [str(word) for word in arrays['stop_words']],
+            str(arrays['token_pattern']),
+            ngram_range=arrays['ngram_range'],
+            lowercase=bool(arrays['lowercase']),
+            norm=str(arrays['norm']) or None,
+            sublinear_tf=bool(arrays['sublinear_tf']),
+        )
+        return cls(vectorizer, cls.classifier_class.from_arrays(arrays))
+
+def compile_pipeline(pipeline):
+    """Extract the arrays needed for prediction from a fitted TF-IDF + LR Pipeline"""
+    tfidf = pipeline.named_steps['tfidf']
+    clf = pipeline.named_steps['clf']
+
+    if tfidf.analyzer != 'word' or tfidf.tokenizer is not None or tfidf.preprocessor is not None:
+        raise ValueError("Only the default word analyzer can be compiled")
+    if tfidf.strip_accents is not None or not tfidf.use_idf:
+        raise ValueError("strip_accents and use_idf=False are not supported")
+
+    vectorizer = CompiledTfidfVectorizer(
+        dict(tfidf.vocabulary_),
+        tfidf.idf_,
+        tfidf.get_stop_words() or (),
+        tfidf.token_pattern,
+        ngram_range=tfidf.ngram_range,
+        lowercase=tfidf.lowercase,
+        norm=tfidf.norm,
+        sublinear_tf=tfidf.sublinear_tf,
+    )
+    classifier = CompiledLogisticRegression(np.ascontiguousarray(clf.coef_.T), clf.intercept_, clf.classes_)
+    return CompiledIntentModel(vectorizer, classifier)
+
+def check_parity(pipeline, compiled, texts, atol=1e-9):
+    """Return the largest probability difference between the two models"""
+    expected = pipeline.predict_proba(list(texts))
+    actual = compiled.predict_proba(list(texts))
+
+    if list(pipeline.classes_) != list(compiled.classes_.astype(str)):
+        raise ValueError("Compiled model classes do not match the pipeline")
+
+    max_diff = float(np.abs(expected - actual).max()) if len(expected) else 0.0
+    if max_diff > atol:
+        raise ValueError(f"Compiled model diverges from pipeline (max diff {max_diff:.3g})")
+    return max_diff
@@ -1,3 +1,5 @@
+import os
+
 # Configuration settings
 CATEGORIES = {
     1: "earning",
@@ -11,8 +13,25 @@ CATEGORIES = {
     "default": "others"
 }
 
+# Handler for each category as "module:function", imported on first use
+# (see handler_registry.py). Must cover every key of CATEGORIES.
+HANDLERS = {
+    1: "response_handlers.earning_handler:handle_earning",
+    2: "response_handlers.business_handler:handle_business",
+    3: "response_handlers.safety_handler:handle_safety",
+    4: "response_handlers.quarterly_earning_handler:handle_quarterly_earning",
+    5: "response_handlers.daily_earning_handler:handle_daily_earning",
+    6: "response_handlers.improve_earning_handler:handle_improve_earning",
+    7: "response_handlers.growth_handler:handle_growth",
+    8: "response_handlers.weather_handler:handle_weather",
+    "default": "response_handlers.default_handler:handle_default",
+}
+
 # Model parameters
 MODEL_CONFIG = {
+    # 'tfidf_logreg' (batch TF-IDF + LogisticRegression) or
+    # 'hashing_sgd' (online hashing features + SGD, updated with partial_fit)
+    'model_type': 'tfidf_logreg',
     'tfidf': {
         'lowercase': True,
         'stop_words': 'english',
@@ -25,8 +44,148 @@ MODEL_CONFIG = {
         'multi_class': 'multinomial',
         'max_iter': 2000,
         'C': 0.8,
-    }
+    },
+    # Used only by the 'hashing_sgd' model type (see online_model.py)
+    'hashing': {
+        'n_features': 2 ** 18,
+        'lowercase': True,
+        'stop_words': 'english',
+        'ngram_range': (1, 2),
+        'alternate_sign': False,
+        'norm': 'l2',
+    },
+    'sgd': {
+        'loss': 'log_loss',
+        'alpha': 1e-4,
+        'random_state': 42,
+    },
+    'online': {
+        'epochs': 20,
+        'batch_size': 256,
+    },
+    # Prune and quantize the trained 'tfidf_logreg' model before saving it,
+    # for low-memory deployments (see model_compaction.py)
+    'compaction': {
+        'enabled': False,
+        'weight_dtype': 'int8',     # 'float64', 'float16' or 'int8' (per-class scales)
+        'prune_threshold': 0.02,    # drop weights below this fraction of the class's largest
+    },
+}
+
+# Search space for main.py --tune (see tuning.py); values override MODEL_CONFIG
+TUNING_GRID = {
+    'tfidf': {
+        'max_features': [250, 500, 1000, None],
+        'ngram_range': [(1, 1), (1, 2)],
+        'min_df': [1, 2],
+    },
+    'classifier': {
+        'C': [0.3, 0.8, 2.0, 5.0, 10.0],
+    },
+}
+
+# Size/quality points compared by main.py --compaction-report
+COMPACTION_CANDIDATES = {
+    'weight_dtype': ['float64', 'float16', 'int8'],
+    'prune_threshold': [0.0, 0.01, 0.02, 0.05, 0.1, 0.2],
+}
+
+# Versioned model artifact directory (see model_artifact.py)
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model")
+
+# Fitted build stages keyed by input hash (see model_build.py)
+BUILD_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "build_cache")
+
+# Per-driver earnings time series, one .npz per driver (see earnings_store.py)
+EARNINGS_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "earnings_store")
+EARNINGS_STORE = {
+    'max_drivers': 10000,     # series kept in memory, least recently used dropped first
+    'refresh_seconds': 30,    # how often a loaded series picks up new trips from the trip ledger
+    'save_seconds': 5,        # a changed series is written to disk at most this often
+}
+
+# Drivers whose growth trends stay in memory (see growth_analytics.py)
+GROWTH_TRACKER_MAX_DRIVERS = 100000
+
+# What --serve/--batch-file do when the artifact does not match MODEL_CONFIG and
+# training_data: 'use_last_good' loads it with a warning, 'fail' exits.
+# Serving modes never train; a missing artifact always fails fast.
+STALE_MODEL_POLICY = 'use_last_good'
+
+# Prediction cache keyed on preprocessed text (see prediction_cache.py)
+PREDICTION_CACHE = {
+    'enabled': True,
+    'max_size': 10000,
+    'ttl_seconds': 3600,
+}
+
+# Keyword fast path in front of the model (see fast_path.py).
+# 'off', 'shadow' (match and compare with the model) or 'on' (short-circuit)
+FAST_PATH_MODE = 'shadow'
+
+# Category ID -> phrases that identify it with high precision. A request
+# matching phrases of more than one category always goes to the model.
+FAST_PATH_RULES = {
+    3: ["safety", "emergency", "accident", "compliance"],
+    4: ["quarterly", "last quarter", "q1", "q2", "q3", "q4"],
+    6: ["improve", "increase", "boost"],
+    8: ["weather", "rain", "temperature", "humidity"],
+}
+
+# Per-stage timing histograms and counters exported at /metrics (see instrumentation.py)
+INSTRUMENTATION_ENABLED = True
+
+# Shared data-access layer for handler backends (see data_access.py).
+# A source with no URL uses the handler's local mock fetcher.
+DATA_ACCESS = {
+    'sources': {
+        'trips': None,   # e.g. "http://earnings-api.internal/trips/{user_id}" (columnar JSON)
+        'business_metrics': None,   # e.g. "http://metrics-api.internal/metrics/{user_id}"
+    },
+    'ttl_seconds': 30,
+    'timeout_seconds': 2.0,
+    'max_concurrency': 16,
+    'pool_size': 8,
+    'max_entries': 10000,
+}
+
+# Generative fallback behind the default handler (see genai_fallback.py).
+# Without a URL the default handler only gives the canned reply.
+GENAI_FALLBACK = {
+    'url': None,                    # e.g. "http://genai.internal/v1/generate"
+    'canned_reply': "I cannot help with this, do you have any other query?",
+    'deadline_seconds': 1.5,        # canned reply if no answer by then
+    'upstream_timeout_seconds': 20, # late answers are still cached until this
+    'max_concurrency': 4,
+    'cache_size': 1000,
+    'cache_ttl_seconds': 3600,
+}
+
+# Per-driver conversation sessions (see session_store.py). Requests without a
+# driver ID get a one-off session for default_driver_id that keeps nothing.
+SESSIONS = {
+    'max_sessions': 100000,
+    'idle_ttl_seconds': 900,
+    'max_bytes': 256 * 1024 * 1024,   # sessions plus their cached handler data
+    'data_ttl_seconds': 300,          # how long a session reuses fetched data
+    'default_driver_id': "123",
 }
 
 # Confidence threshold - lowered for better detection
-CONFIDENCE_THRESHOLD = 0.1
\ No newline at end of file
+CONFIDENCE_THRESHOLD = 0.1
+
+# HTTP inference service
+SERVER_CONFIG = {
+    'host': '0.0.0.0',
+    'port': 8000,
+    'max_batch_size': 32,      # requests classified per model call
+    'max_wait_ms': 5,          # how long to wait for a batch to fill
+    'handler_workers': 8,      # threads running blocking handler code
+    'max_body_bytes': 64 * 1024,
+    # Pre-fork mode (see prefork.py); 1 serves from a single process
+    'workers': 1,
+    'heartbeat_seconds': 1.0,
+    'worker_startup_seconds': 10.0,
+    'reload_poll_seconds': 2.0,    # how often to check the artifact for a replacement
+    'shutdown_grace_seconds': 10,  # time in-flight requests get to finish on stop/reload
+}
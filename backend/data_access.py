@@ -0,0 +1,281 @@
+"""
+Shared async data-access layer for handler backends.
+
+All upstream calls from handlers go through one DataAccessLayer, which
+provides:
+
+- a pooled keep-alive HTTP/1.1 client (AsyncHTTPClient)
+- per-user TTL caching of responses
+- single-flight coalescing: concurrent fetches of the same (source, user)
+  share one upstream call
+- a bound on concurrent upstream calls, and a timeout per fetch that
+  includes the wait for a free slot
+
+Handlers are plain functions that may run on any thread, so the layer
+owns a private event loop on a daemon thread and exposes fetch_sync() as
+a blocking bridge. Sources without a configured URL fall back to the
+handler's local (mock) fetch function, still cached and coalesced.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+class DataAccessError(Exception):
+    """Raised when an upstream fetch fails or times out"""
+
+class AsyncHTTPClient:
+    """Minimal JSON-over-HTTP/1.1 client with per-host connection reuse"""
+
+    def __init__(self, pool_size=8):
+        self.pool_size = pool_size
+        self._idle = {}
+        self._limits = {}
+
+    def _limit(self, origin):
+        limit = self._limits.get(origin)
+        if limit is None:
+            limit = self._limits[origin] = asyncio.Semaphore(self.pool_size)
+        return limit
+
+    async def get_json(self, url):
+        return await self.request_json("GET", url)
+
+    async def post_json(self, url, payload):
+        return await self.request_json("POST", url, json.dumps(payload).encode("utf-8"))
+
+    async def request_json(self, method, url, body=None):
+        parts = urlsplit(url)
+        host = parts.hostname
+        port = parts.port or 80
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        origin = (host, port)
+
+        async with self._limit(origin):
+            idle = self._idle.setdefault(origin, [])
+            reused = bool(idle)
+            reader, writer = idle.pop() if idle else await asyncio.open_connection(host, port)
+
+            try:
+                status, headers, response = await self._request(reader, writer, method, host, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                # A pooled connection may have been closed by the server; retry once on a fresh one
+                reader, writer = await asyncio.open_connection(host, port)
+                try:
+                    status, headers, response = await self._request(reader, writer, method, host, path, body)
+                except BaseException:
+                    writer.close()
+                    raise
+            except BaseException:
+                writer.close()
+                raise
+
+            if headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                idle.append((reader, writer))
+
+        if status != 200:
+            raise DataAccessError(f"{method} {url} returned {status}")
+        return json.loads(response)
+
+    async def _request(self, reader, writer, method, host, path, body=None):
+        head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n"
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        writer.write(f"{head}Connection: keep-alive\r\n\r\n".encode("latin-1") + (body or b""))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by upstream")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            data = bytearray()
+            while True:
+                size = int((await reader.readline()).strip().split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                data += await reader.readexactly(size)
+                await reader.readline()
+            return status, headers, bytes(data)
+
+        if "content-length" in headers:
+            return status, headers, await reader.readexactly(int(headers["content-length"]))
+
+        headers["connection"] = "close"
+        return status, headers, await reader.read()
+
+    async def close(self):
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
+
+class DataAccessLayer:
+    def __init__(self, sources=None, ttl_seconds=30, timeout_seconds=2.0,
+                 max_concurrency=16, pool_size=8, max_entries=10000, clock=time.monotonic):
+        # source name -> URL template with a {user_id} placeholder, or None for local
+        self.sources = dict(sources or {})
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.max_entries = max_entries
+        self.clock = clock
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "upstream_calls": 0, "errors": 0}
+
+        self._cache = {}
+        self._inflight = {}
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._client = AsyncHTTPClient(self.pool_size)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="data-access", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+            return loop
+
+    async def fetch(self, source, user_id, local=None, parse=None):
+        """Return the payload for (source, user_id); must run on the layer's loop.
+
+        parse, if given, converts the raw payload once before it is cached.
+        """
+        key = (source, str(user_id))
+        entry = self._cache.get(key)
+        if entry is not None and self.clock() - entry[1] <= self.ttl_seconds:
+            self.stats["hits"] += 1
+            return entry[0]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats["misses"] += 1
+        task = asyncio.get_running_loop().create_task(self._load(source, user_id, local, parse))
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+        finally:
+            self._inflight.pop(key, None)
+
+        self._cache.pop(key, None)
+        self._cache[key] = (value, self.clock())
+        while len(self._cache) > self.max_entries:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            del self._cache[next(iter(self._cache))]
+        return value
+
+    async def _load(self, source, user_id, local, parse=None):
+        url = self.sources.get(source)
+        if url is None and local is None:
+            raise DataAccessError(f"No URL or local fetcher configured for {source!r}")
+
+        async def call():
+            # Waiting for a concurrency slot counts against the timeout as well
+            async with self._semaphore:
+                self.stats["upstream_calls"] += 1
+                if url is None:
+                    return await asyncio.get_running_loop().run_in_executor(None, local, user_id)
+                return await self._client.get_json(url.format(user_id=user_id))
+
+        try:
+            payload = await asyncio.wait_for(call(), self.timeout_seconds)
+            return parse(payload) if parse is not None else payload
+        except asyncio.TimeoutError:
+            self.stats["errors"] += 1
+            raise DataAccessError(f"Fetching {source!r} timed out after {self.timeout_seconds}s")
+        except DataAccessError:
+            self.stats["errors"] += 1
+            raise
+        except (OSError, ValueError) as e:
+            self.stats["errors"] += 1
+            raise DataAccessError(f"Fetching {source!r} failed: {e}")
+
+    def fetch_sync(self, source, user_id, local=None, parse=None):
+        """Blocking bridge for handlers running outside the layer's loop"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.fetch(source, user_id, local, parse), loop)
+        return future.result()
+
+    async def fetch_async(self, source, user_id, local=None, parse=None):
+        """Awaitable bridge for coroutines running on another event loop, e.g. async handlers"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.fetch(source, user_id, local, parse), loop)
+        return await asyncio.wrap_future(future)
+
+    def invalidate(self, source=None, user_id=None):
+        def clear():
+            for key in list(self._cache):
+                if (source is None or key[0] == source) and (user_id is None or key[1] == str(user_id)):
+                    del self._cache[key]
+
+        if self._loop is None:
+            clear()
+        else:
+            self._loop.call_soon_threadsafe(clear)
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+_data_access = None
+_data_access_lock = threading.Lock()
+
+def get_data_access():
+    """Process-wide layer built from config.DATA_ACCESS on first use"""
+    global _data_access
+    with _data_access_lock:
+        if _data_access is None:
+            from config import DATA_ACCESS
+            _data_access = DataAccessLayer(**DATA_ACCESS)
+        return _data_access
+
+def set_data_access(layer):
+    """Replace the process-wide layer, e.g. to point handlers at a stub server"""
+    global _data_access
+    with _data_access_lock:
+        if _data_access is not None and _data_access is not layer:
+            _data_access.close()
+        _data_access = layer
@@ -0,0 +1,160 @@
+"""
+Vectorized earnings computation over per-trip ledgers.
+
+A TripLedger holds one NumPy column per trip field, sorted by timestamp,
+so any period is a contiguous slice found with two binary searches and
+every total is a single vectorized sum. group_earnings buckets trips by
+day, week, month or quarter with np.unique + np.bincount instead of
+Python loops.
+"""
+
+import numpy as np
+
+# Cost per km by vehicle type; unknown types fall back to DEFAULT_COST_PER_KM
+vehicle_cost_map = {
+    1: 10,
+    2: 20,
+    3: 30,
+    4: 40,
+    5: 50
+}
+DEFAULT_COST_PER_KM = 100
+
+_COST_LOOKUP = np.full(256, DEFAULT_COST_PER_KM, dtype=np.float64)
+for _vehicle_type, _cost in vehicle_cost_map.items():
+    _COST_LOOKUP[_vehicle_type] = _cost
+
+COLUMNS = {
+    "timestamp": np.int64,   # epoch seconds (UTC)
+    "fare": np.float64,
+    "km": np.float64,
+    "vehicle_type": np.uint8,
+    "commission": np.float64,
+    "penalty": np.float64,
+    "bonus": np.float64,
+}
+
+PERIOD_UNITS = {"day": "D", "week": "W", "month": "M", "quarter": "M"}
+
+class TripLedger:
+    """Columnar per-trip records for one driver, sorted by timestamp"""
+
+    def __init__(self, columns):
+        order = None
+        timestamps = np.asarray(columns["timestamp"], dtype=np.int64)
+        if timestamps.size > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind="stable")
+
+        for name, dtype in COLUMNS.items():
+            values = np.asarray(columns.get(name, np.zeros(timestamps.size)), dtype=dtype)
+            if values.shape != timestamps.shape:
+                raise ValueError(f"Column {name!r} has {values.size} rows, expected {timestamps.size}")
+            setattr(self, name, values[order] if order is not None else values)
+
+    def __len__(self):
+        return self.timestamp.size
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    @classmethod
+    def from_records(cls, records):
+        return cls({name: [record.get(name, 0) for record in records] for name in COLUMNS})
+
+    @classmethod
+    def from_payload(cls, payload):
+        """Accept a TripLedger, columnar JSON ({"fare": [...], ...}) or a list of trip dicts"""
+        if isinstance(payload, cls):
+            return payload
+        if isinstance(payload, dict):
+            return cls(payload)
+        return cls.from_records(payload)
+
+    def to_columns(self):
+        return {name: getattr(self, name).tolist() for name in COLUMNS}
+
+    def period_slice(self, start=None, end=None):
+        """Index range of trips with start <= timestamp < end"""
+        lo = 0 if start is None else int(np.searchsorted(self.timestamp, start, side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.timestamp, end, side="left"))
+        return slice(lo, max(lo, hi))
+
+    def travel_cost_per_trip(self, rows=slice(None)):
+        return self.km[rows] * _COST_LOOKUP[self.vehicle_type[rows]]
+
+def compute_earnings(ledger, start=None, end=None):
+    """Net earnings over [start, end) as a summary dict"""
+    rows = ledger.period_slice(start, end)
+    total_earning = float(ledger.fare[rows].sum())
+    commission = float(ledger.commission[rows].sum())
+    penalty = float(ledger.penalty[rows].sum())
+    bonus = float(ledger.bonus[rows].sum())
+    travel_cost = float(ledger.travel_cost_per_trip(rows).sum())
+
+    return {
+        "trips": rows.stop - rows.start,
+        "total_earning": total_earning,
+        "commission": commission,
+        "penalty": penalty,
+        "bonus": bonus,
+        "km_travelled": float(ledger.km[rows].sum()),
+        "travel_cost": travel_cost,
+        "net_earning": (total_earning + bonus) - (commission + penalty + travel_cost),
+    }
+
+def period_keys(timestamps, period):
+    """Integer bucket per timestamp: days/weeks/months since epoch, or quarters"""
+    if period not in PERIOD_UNITS:
+        raise ValueError(f"Unknown period {period!r}; use one of {sorted(PERIOD_UNITS)}")
+
+    if period == "week":
+        # Epoch day 0 was a Thursday; shift so weeks start on Monday
+        return (timestamps // 86400 + 3) // 7
+    keys = timestamps.astype("datetime64[s]").astype(f"datetime64[{PERIOD_UNITS[period]}]").astype(np.int64)
+    return keys // 3 if period == "quarter" else keys
+
+def period_start(key, period):
+    """Epoch seconds at which the bucket returned by period_keys begins"""
+    if period == "day":
+        return int(key) * 86400
+    if period == "week":
+        return (int(key) * 7 - 3) * 86400
+    months = int(key) * 3 if period == "quarter" else int(key)
+    return int(np.datetime64(months, "M").astype("datetime64[s]").astype(np.int64))
+
+def group_earnings(ledger, period="day", start=None, end=None):
+    """Per-period totals as parallel arrays, ordered by period"""
+    rows = ledger.period_slice(start, end)
+    keys, inverse = np.unique(period_keys(ledger.timestamp[rows], period), return_inverse=True)
+    n = keys.size
+
+    def total(values):
+        return np.bincount(inverse, weights=values, minlength=n)
+
+    fare = total(ledger.fare[rows])
+    commission = total(ledger.commission[rows])
+    penalty = total(ledger.penalty[rows])
+    bonus = total(ledger.bonus[rows])
+    travel_cost = total(ledger.travel_cost_per_trip(rows))
+
+    return {
+        "period": keys,
+        "trips": np.bincount(inverse, minlength=n),
+        "total_earning": fare,
+        "commission": commission,
+        "penalty": penalty,
+        "bonus": bonus,
+        "km_travelled": total(ledger.km[rows]),
+        "travel_cost": travel_cost,
+        "net_earning": (fare + bonus) - (commission + penalty + travel_cost),
+    }
+
+def quarter_bounds(timestamp, offset=0):
+    """[start, end) epoch seconds of the quarter containing timestamp, shifted by offset quarters"""
+    key = int(period_keys(np.asarray([timestamp], dtype=np.int64), "quarter")[0]) + offset
+    return period_start(key, "quarter"), period_start(key + 1, "quarter")
+
+def quarter_label(start):
+    month = np.datetime64(int(start), "s").astype("datetime64[M]").astype(np.int64)
+    return f"Q{month % 12 // 3 + 1} {1970 + month // 12}"
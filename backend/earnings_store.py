@@ -0,0 +1,406 @@
+"""
+Time-indexed per-driver earnings store.
+
+Each driver's trips are kept as a sorted timestamp array plus running
+(prefix) sums of every earnings field, so the totals for any date range,
+single day or rolling window take two binary searches and one subtraction,
+whatever the trip count.
+
+- appends extend the arrays in place (amortised O(1) per trip); a late
+  trip only re-accumulates the suffix after its position
+- each driver persists to its own .npz file (timestamps + prefix sums).
+  Rewriting it is O(trips), so a changed series is written at most every
+  save_seconds, under that driver's lock rather than the store's, and
+  flush() writes what is still pending (at exit for the process-wide store)
+- drivers are loaded lazily on first access; a driver with no file is
+  seeded once from the trip ledger and written back
+- a loaded series picks up trips newer than its last timestamp from the
+  trip ledger at most every refresh_seconds, so it does not go stale
+- at most max_drivers series stay in memory, least recently used dropped
+  first (they reload from disk)
+- listeners are called with (driver_id, TripLedger) after every append,
+  e.g. to keep growth_analytics current
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from data_access import DataAccessError
+from earnings_engine import COLUMNS, TripLedger
+
+DAY_SECONDS = 86400
+DRIVER_LOCK_STRIPES = 64
+
+# Prefix-summed fields; trip counts come from the index difference
+FIELDS = ("fare", "commission", "penalty", "bonus", "km", "travel_cost")
+
+def _trip_values(ledger):
+    return np.column_stack([
+        ledger.fare, ledger.commission, ledger.penalty, ledger.bonus,
+        ledger.km, ledger.travel_cost_per_trip(),
+    ])
+
+def day_start(timestamp):
+    """Start of the UTC day containing timestamp"""
+    return int(timestamp) // DAY_SECONDS * DAY_SECONDS
+
+class EarningsSeries:
+    """One driver's trips as sorted timestamps with prefix sums of FIELDS"""
+
+    def __init__(self, timestamps=None, cumulative=None):
+        if timestamps is None:
+            timestamps = np.zeros(0, dtype=np.int64)
+            cumulative = np.zeros((1, len(FIELDS)))
+        self._n = len(timestamps)
+        # Buffers may be longer than _n; rows past _n are spare capacity
+        self._timestamps = np.asarray(timestamps, dtype=np.int64)
+        self._cumulative = np.asarray(cumulative, dtype=np.float64)
+
+    def __len__(self):
+        return self._n
+
+    @classmethod
+    def from_ledger(cls, ledger):
+        values = _trip_values(ledger)
+        cumulative = np.zeros((len(ledger) + 1, len(FIELDS)))
+        np.cumsum(values, axis=0, out=cumulative[1:])
+        return cls(ledger.timestamp.copy(), cumulative)
+
+    @property
+    def timestamps(self):
+        return self._timestamps[:self._n]
+
+    @property
+    def cumulative(self):
+        return self._cumulative[:self._n + 1]
+
+    def append(self, trips):
+        """Add trips (TripLedger, columnar dict or list of trip dicts)"""
+        ledger = TripLedger.from_payload(trips)
+        if not len(ledger):
+            return
+        n, m = self._n, len(ledger)
+
+        if n == 0 or ledger.timestamp[0] >= self._timestamps[n - 1]:
+            self._reserve(n + m)
+            self._timestamps[n:n + m] = ledger.timestamp
+            np.cumsum(_trip_values(ledger), axis=0, out=self._cumulative[n + 1:n + m + 1])
+            self._cumulative[n + 1:n + m + 1] += self._cumulative[n]
+            self._n = n + m
+            return
+
+        # Late trips: merge into the suffix they belong to and re-accumulate it.
+        # New arrays are built so concurrent readers keep a consistent view.
+        lo = int(np.searchsorted(self.timestamps, ledger.timestamp[0], side="right"))
+        timestamps = np.concatenate([self._timestamps[lo:n], ledger.timestamp])
+        values = np.concatenate([np.diff(self._cumulative[lo:n + 1], axis=0), _trip_values(ledger)])
+        order = np.argsort(timestamps, kind="stable")
+
+        merged_ts = np.concatenate([self._timestamps[:lo], timestamps[order]])
+        merged_cum = np.empty((n + m + 1, len(FIELDS)))
+        merged_cum[:lo + 1] = self._cumulative[:lo + 1]
+        np.cumsum(values[order], axis=0, out=merged_cum[lo + 1:])
+        merged_cum[lo + 1:] += self._cumulative[lo]
+        self._timestamps, self._cumulative, self._n = merged_ts, merged_cum, n + m
+
+    def _reserve(self, size):
+        capacity = len(self._timestamps)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 64)
+        timestamps = np.empty(capacity, dtype=np.int64)
+        cumulative = np.empty((capacity + 1, len(FIELDS)))
+        timestamps[:self._n] = self.timestamps
+        cumulative[:self._n + 1] = self.cumulative
+        self._timestamps, self._cumulative = timestamps, cumulative
+
+    def totals(self, start=None, end=None):
+        """Summary over [start, end) with the same keys as compute_earnings"""
+        n, timestamps, cumulative = self._n, self._timestamps, self._cumulative
+        lo = 0 if start is None else int(np.searchsorted(timestamps[:n], start, side="left"))
+        hi = n if end is None else int(np.searchsorted(timestamps[:n], end, side="left"))
+        hi = max(lo, hi)
+        fare, commission, penalty, bonus, km, travel_cost = (cumulative[hi] - cumulative[lo]).tolist()
+
+        return {
+            "trips": hi - lo,
+            "total_earning": fare,
+            "commission": commission,
+            "penalty": penalty,
+            "bonus": bonus,
+            "km_travelled": km,
+            "travel_cost": travel_cost,
+            "net_earning": (fare + bonus) - (commission + penalty + travel_cost),
+        }
+
+    def day(self, timestamp):
+        start = day_start(timestamp)
+        return self.totals(start, start + DAY_SECONDS)
+
+    def window(self, days, now=None):
+        """Rolling window covering the last `days` days up to now"""
+        now = int(time.time()) if now is None else int(now)
+        return self.totals(now - days * DAY_SECONDS, now + 1)
+
+    def daily(self, start, end):
+        """Per-day totals for the UTC days from start's up to end's, as parallel arrays"""
+        first, last = day_start(start), day_start(end)
+        days = np.arange(first, last + 2 * DAY_SECONDS, DAY_SECONDS, dtype=np.int64)
+        index = np.searchsorted(self.timestamps, days, side="left")
+        sums = np.diff(self._cumulative[index], axis=0)
+        fare, commission, penalty, bonus, km, travel_cost = sums.T
+
+        return {
+            "day": days[:-1],
+            "trips": np.diff(index),
+            "total_earning": fare,
+            "commission": commission,
+            "penalty": penalty,
+            "bonus": bonus,
+            "km_travelled": km,
+            "travel_cost": travel_cost,
+            "net_earning": (fare + bonus) - (commission + penalty + travel_cost),
+        }
+
+    def save(self, path):
+        """Write timestamps and prefix sums to an .npz file, replacing it atomically"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, timestamp=self.timestamps, cumulative=self.cumulative)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            timestamps, cumulative = data["timestamp"], data["cumulative"]
+        if cumulative.shape != (len(timestamps) + 1, len(FIELDS)):
+            raise ValueError(f"Corrupt earnings series at {path}")
+        return cls(timestamps, cumulative)
+
+class EarningsStore:
+    """Lazily loaded EarningsSeries per driver, persisted under one directory"""
+
+    def __init__(self, directory, seed=None, max_drivers=10000, refresh_seconds=None, save_seconds=0,
+                 clock=time.monotonic):
+        # seed(driver_id) -> TripLedger: seeds drivers with no file yet and, every
+        # refresh_seconds (None: never), supplies trips newer than a loaded series.
+        # A changed series is written at most every save_seconds (0: on every change)
+        if max_drivers < 1:
+            raise ValueError("max_drivers must be at least 1")
+        self.directory = directory
+        self.seed = seed
+        self.max_drivers = max_drivers
+        self.refresh_seconds = refresh_seconds
+        self.save_seconds = save_seconds
+        self.clock = clock
+        self.listeners = []
+        self.saves = 0
+        self._series = OrderedDict()   # driver_id -> (series, refreshed_at), least recently used first
+        self._dirty = {}               # driver_id -> (series, first unsaved change at)
+        self._lock = threading.Lock()  # guards the two dicts only; never held for disk I/O
+        # Per-driver locks for changing and writing a series, striped to bound their number
+        self._driver_locks = [threading.Lock() for _ in range(DRIVER_LOCK_STRIPES)]
+
+    def _path(self, driver_id):
+        # Driver IDs reach here from requests: refuse any that would leave the directory
+        directory = os.path.realpath(self.directory)
+        path = os.path.realpath(os.path.join(directory, f"{driver_id}.npz"))
+        if os.path.dirname(path) != directory:
+            raise ValueError(f"Invalid driver ID {driver_id!r}")
+        return path
+
+    def _driver_lock(self, driver_id):
+        return self._driver_locks[hash(driver_id) % DRIVER_LOCK_STRIPES]
+
+    def series(self, driver_id):
+        driver_id = str(driver_id)
+        now = self.clock()
+        evicted = []
+        with self._lock:
+            series, refresh = self._cached(driver_id, now, evicted)
+
+        if series is None:
+            # Disk reads and seeding (an upstream fetch) run outside the lock
+            path = self._path(driver_id)
+            seeded = False
+            if os.path.exists(path):
+                series, refresh = EarningsSeries.load(path), self._refresh_due(None, now)
+            elif self.seed is not None:
+                series, refresh, seeded = EarningsSeries.from_ledger(self.seed(driver_id)), False, True
+            else:
+                series, refresh = EarningsSeries(), False
+
+            with self._lock:
+                cached, _ = self._cached(driver_id, now, evicted)
+                if cached is not None:
+                    # Another thread loaded it first; keep that one
+                    series, refresh, seeded = cached, False, False
+                else:
+                    self._insert(driver_id, (series, now), evicted)
+            if seeded:
+                with self._driver_lock(driver_id):
+                    self._write(driver_id, series)
+
+        for victim in evicted:
+            # Evicted with changes not yet on disk
+            self.save(victim)
+        if refresh:
+            self.refresh(driver_id, series)
+        return series
+
+    def _cached(self, driver_id, now, evicted):
+        """(series, refresh due) if the driver's series is in memory, else (None, False); under _lock"""
+        entry = self._series.get(driver_id)
+        if entry is None:
+            unsaved = self._dirty.get(driver_id)
+            if unsaved is None:
+                return None, False
+            # Evicted before its changes were written: the file is behind this copy
+            self._insert(driver_id, (unsaved[0], now), evicted)
+            return unsaved[0], False
+
+        self._series.move_to_end(driver_id)
+        if self._refresh_due(entry[1], now):
+            # Claimed here so concurrent readers do not refresh too
+            self._series[driver_id] = (entry[0], now)
+            return entry[0], True
+        return entry[0], False
+
+    def _insert(self, driver_id, entry, evicted):
+        self._series[driver_id] = entry
+        while len(self._series) > self.max_drivers:
+            victim, _ = self._series.popitem(last=False)
+            if victim in self._dirty:
+                evicted.append(victim)
+
+    def _refresh_due(self, refreshed_at, now):
+        if self.seed is None or self.refresh_seconds is None:
+            return False
+        return refreshed_at is None or now - refreshed_at >= self.refresh_seconds
+
+    def refresh(self, driver_id, series=None):
+        """Append the trip ledger's trips newer than the series' last one; returns how many.
+
+        An unavailable ledger leaves the series as it is until the next refresh.
+        """
+        driver_id = str(driver_id)
+        series = self.series(driver_id) if series is None else series
+        try:
+            ledger = self.seed(driver_id)
+        except DataAccessError as e:
+            print(f"Earnings refresh for driver {driver_id} failed: {e}")
+            return 0
+
+        with self._driver_lock(driver_id):
+            # Filtered under the driver's lock so concurrent refreshes never append a trip twice
+            lo = int(np.searchsorted(ledger.timestamp, series.timestamps[-1], side="right")) if len(series) else 0
+            if lo == len(ledger):
+                return 0
+            new = TripLedger({name: getattr(ledger, name)[lo:] for name in COLUMNS})
+            series.append(new)
+            self._changed(driver_id, series)
+        for listener in self.listeners:
+            listener(driver_id, new)
+        return len(new)
+
+    def append(self, driver_id, trips):
+        """Add trips in memory; the file is rewritten at most every save_seconds"""
+        driver_id = str(driver_id)
+        ledger = TripLedger.from_payload(trips)
+        series = self.series(driver_id)
+        with self._driver_lock(driver_id):
+            series.append(ledger)
+            self._changed(driver_id, series)
+        for listener in self.listeners:
+            listener(driver_id, ledger)
+
+    def _changed(self, driver_id, series):
+        """Mark a series unsaved and write it if it has been for save_seconds; holds the driver's lock"""
+        now = self.clock()
+        with self._lock:
+            unsaved = self._dirty.get(driver_id)
+            if unsaved is None or unsaved[0] is not series:
+                unsaved = self._dirty[driver_id] = (series, now)
+        if now - unsaved[1] >= self.save_seconds:
+            self._write(driver_id, series)
+
+    def _write(self, driver_id, series):
+        """Write a series to its file; holds the driver's lock so no append runs meanwhile"""
+        os.makedirs(self.directory, exist_ok=True)
+        series.save(self._path(driver_id))
+        with self._lock:
+            self.saves += 1
+            unsaved = self._dirty.get(driver_id)
+            if unsaved is not None and unsaved[0] is series:
+                del self._dirty[driver_id]
+
+    def save(self, driver_id):
+        """Write the driver's series now if it has unsaved changes"""
+        driver_id = str(driver_id)
+        with self._driver_lock(driver_id):
+            with self._lock:
+                unsaved = self._dirty.get(driver_id)
+            if unsaved is not None:
+                self._write(driver_id, unsaved[0])
+
+    def flush(self):
+        """Write every series with unsaved changes, e.g. before the process exits"""
+        with self._lock:
+            driver_ids = list(self._dirty)
+        for driver_id in driver_ids:
+            self.save(driver_id)
+
+    def driver_ids(self):
+        """Drivers with a persisted series"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.directory) if name.endswith(".npz"))
+
+    def evict(self, driver_id=None):
+        """Drop loaded series from memory; they reload from disk on next access.
+
+        Series with unsaved changes stay pending until flush() or their next save.
+        """
+        with self._lock:
+            if driver_id is None:
+                self._series.clear()
+            else:
+                self._series.pop(str(driver_id), None)
+
+def _seed_from_trip_ledger(driver_id):
+    from response_handlers.trip_ledger import load_trip_ledger
+    return load_trip_ledger(driver_id)
+
+_earnings_store = None
+_earnings_store_lock = threading.Lock()
+
+def get_earnings_store():
+    """Process-wide store at config.EARNINGS_STORE_PATH, seeded from the trip ledger"""
+    global _earnings_store
+    with _earnings_store_lock:
+        if _earnings_store is None:
+            from config import EARNINGS_STORE_PATH, EARNINGS_STORE
+            _earnings_store = EarningsStore(
+                EARNINGS_STORE_PATH, seed=_seed_from_trip_ledger,
+                max_drivers=EARNINGS_STORE['max_drivers'], refresh_seconds=EARNINGS_STORE['refresh_seconds'],
+                save_seconds=EARNINGS_STORE['save_seconds'],
+            )
+            atexit.register(flush_earnings_store)
+        return _earnings_store
+
+def flush_earnings_store():
+    """Write the unsaved series of the process-wide store, if one was created"""
+    with _earnings_store_lock:
+        store = _earnings_store
+    if store is not None:
+        store.flush()
+
+def set_earnings_store(store):
+    global _earnings_store
+    with _earnings_store_lock:
+        _earnings_store = store
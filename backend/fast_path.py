@@ -0,0 +1,100 @@
+"""
+Keyword fast path in front of the intent model.
+
+Rule phrases are compiled into a token trie once; matching walks the trie
+from every token of the preprocessed request, so the cost is linear in the
+request length regardless of how many rules exist. A request is routed only
+when every matched phrase points at the same category; anything ambiguous
+falls through to the model.
+
+Modes:
+- 'off': never consulted
+- 'shadow': matched but the model still decides; agreement is recorded
+- 'on': a match short-circuits the model
+"""
+
+import threading
+
+MODES = ('off', 'shadow', 'on')
+_END = object()
+
+class KeywordRouter:
+    def __init__(self, rules, categories, preprocessor, mode='shadow'):
+        if mode not in MODES:
+            raise ValueError(f"Fast path mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.trie = {}
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.fires = 0
+        self.agreements = 0
+        self.disagreements = 0
+        self.model_ms_on_fires = 0.0
+
+        for category_id, phrases in rules.items():
+            if category_id not in categories:
+                raise ValueError(f"Fast path rule targets unknown category {category_id!r}")
+            for phrase in phrases:
+                tokens = preprocessor.preprocess(phrase).split()
+                if not tokens:
+                    raise ValueError(f"Fast path phrase {phrase!r} is empty after preprocessing")
+                node = self.trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node[_END] = category_id
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    @property
+    def short_circuits(self):
+        return self.mode == 'on'
+
+    def match(self, processed_text: str):
+        """Return the single category matched by the rules, or None"""
+        tokens = processed_text.split()
+        matched = set()
+
+        for start in range(len(tokens)):
+            node = self.trie
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                if _END in node:
+                    matched.add(node[_END])
+            if len(matched) > 1:
+                break
+
+        # Phrases from two categories means the request is ambiguous
+        category_id = next(iter(matched)) if len(matched) == 1 else None
+
+        with self._lock:
+            self.checks += 1
+            if category_id is not None:
+                self.fires += 1
+        return category_id
+
+    def record(self, rule_category, model_category, model_ms=0.0):
+        """Shadow mode: compare a rule hit with the model's top class"""
+        with self._lock:
+            if rule_category == model_category:
+                self.agreements += 1
+            else:
+                self.disagreements += 1
+            self.model_ms_on_fires += model_ms
+
+    def stats(self):
+        with self._lock:
+            compared = self.agreements + self.disagreements
+            return {
+                "mode": self.mode,
+                "checks": self.checks,
+                "fires": self.fires,
+                "fire_rate": round(self.fires / self.checks, 4) if self.checks else 0.0,
+                "agreements": self.agreements,
+                "disagreements": self.disagreements,
+                "agreement_rate": round(self.agreements / compared, 4) if compared else None,
+                "model_ms_saveable": round(self.model_ms_on_fires, 3),
+            }
@@ -0,0 +1,197 @@
+"""
+Deadline-bounded generative fallback for the default route.
+
+Requests the classifier cannot place go to a slow generative backend.
+GenerativeFallback keeps that from setting the tail latency:
+
+- every request has a deadline; when it passes, the caller immediately
+  gets the canned reply
+- upstream calls are bounded by a concurrency limit; a request that cannot
+  get a slot before its deadline is answered with the canned reply instead
+  of queueing behind the backlog
+- replies are cached on normalized text, and concurrent identical
+  questions share one upstream call
+- a call that outlives its caller's deadline keeps running (up to
+  upstream_timeout_seconds) and its reply is cached for the next asker
+
+Like data_access.py, the fallback owns an event loop on a daemon thread;
+async handlers await it through respond_async() without holding a
+handler-pool thread, synchronous callers use respond_sync().
+"""
+
+import asyncio
+import threading
+
+from data_access import AsyncHTTPClient, DataAccessError
+from prediction_cache import PredictionCache
+from utils import TextPreprocessor
+
+class GenerativeFallback:
+    def __init__(self, url=None, canned_reply="", deadline_seconds=1.5, upstream_timeout_seconds=20,
+                 max_concurrency=4, cache_size=1000, cache_ttl_seconds=3600):
+        # url of a backend answering POST {"prompt": text} with {"reply": text}; None = canned only
+        self.url = url
+        self.canned_reply = canned_reply
+        self.deadline_seconds = deadline_seconds
+        self.upstream_timeout_seconds = upstream_timeout_seconds
+        self.max_concurrency = max_concurrency
+        self.cache = PredictionCache(cache_size, cache_ttl_seconds)
+        self.preprocessor = TextPreprocessor()
+        self.stats = {
+            "requests": 0, "answered": 0, "coalesced": 0, "upstream_calls": 0,
+            "deadline_missed": 0, "rejected": 0, "errors": 0,
+        }
+
+        self._inflight = {}
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._client = AsyncHTTPClient(self.max_concurrency)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="genai-fallback", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+            return loop
+
+    async def respond(self, text):
+        """Generated reply, or the canned reply if it is not ready by the deadline; runs on the fallback's loop"""
+        self.stats["requests"] += 1
+        key = self.preprocessor.preprocess(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline_seconds
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.deadline_seconds)
+            except asyncio.TimeoutError:
+                self.stats["rejected"] += 1
+                return self.canned_reply
+
+            task = self._inflight.get(key)
+            if task is not None:
+                # An identical question started while this one waited for a slot
+                self._semaphore.release()
+                self.stats["coalesced"] += 1
+            else:
+                task = loop.create_task(self._generate(key, text))
+                task.add_done_callback(_consume_result)
+                self._inflight[key] = task
+
+        try:
+            reply = await asyncio.wait_for(asyncio.shield(task), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            self.stats["deadline_missed"] += 1
+            return self.canned_reply
+        except DataAccessError:
+            return self.canned_reply
+
+        self.stats["answered"] += 1
+        return reply
+
+    async def _generate(self, key, text):
+        """One upstream call; holds a concurrency slot acquired by respond()"""
+        try:
+            self.stats["upstream_calls"] += 1
+            try:
+                payload = await asyncio.wait_for(
+                    self._client.post_json(self.url, {"prompt": text}), self.upstream_timeout_seconds
+                )
+            except asyncio.TimeoutError:
+                self.stats["errors"] += 1
+                raise DataAccessError(f"Generative backend timed out after {self.upstream_timeout_seconds}s")
+            except (OSError, ValueError, DataAccessError) as e:
+                self.stats["errors"] += 1
+                raise DataAccessError(f"Generative backend failed: {e}")
+
+            reply = payload.get("reply") if isinstance(payload, dict) else None
+            if not isinstance(reply, str) or not reply.strip():
+                self.stats["errors"] += 1
+                raise DataAccessError("Generative backend returned no reply")
+
+            self.cache.put(key, reply)
+            return reply
+        finally:
+            self._inflight.pop(key, None)
+            self._semaphore.release()
+
+    def respond_sync(self, text):
+        """Blocking bridge for handlers; returns within roughly deadline_seconds"""
+        if not self.url:
+            return self.canned_reply
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.respond(text), loop).result()
+
+    async def respond_async(self, text):
+        """Awaitable bridge for coroutines running on another event loop, e.g. async handlers"""
+        if not self.url:
+            return self.canned_reply
+        loop = self._ensure_loop()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.respond(text), loop))
+
+    def close(self):
+        if self._loop is None:
+            return
+
+        async def shutdown():
+            # Calls still running past their callers' deadlines are dropped
+            tasks = list(self._inflight.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._client.close()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+def _consume_result(task):
+    # Replies that arrive after every caller gave up are only cached; mark
+    # their errors as retrieved so asyncio does not log them
+    if not task.cancelled():
+        task.exception()
+
+_fallback = None
+_fallback_lock = threading.Lock()
+
+def get_fallback():
+    """Process-wide fallback built from config.GENAI_FALLBACK on first use"""
+    global _fallback
+    with _fallback_lock:
+        if _fallback is None:
+            from config import GENAI_FALLBACK
+            _fallback = GenerativeFallback(**GENAI_FALLBACK)
+        return _fallback
+
+def set_fallback(fallback):
+    """Replace the process-wide fallback, e.g. to point it at a stub model server"""
+    global _fallback
+    with _fallback_lock:
+        if _fallback is not None and _fallback is not fallback:
+            _fallback.close()
+        _fallback = fallback
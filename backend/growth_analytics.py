@@ -0,0 +1,299 @@
+"""
+Incremental growth trends over daily net earnings.
+
+GrowthTracker holds one row per tracked driver (at most max_drivers, the
+least recently used row is reused first): the last HISTORY_DAYS complete
+days in a ring buffer plus running sums for the current and previous
+week and month windows and for a least-squares fit over the last month.
+A new trip updates a handful of sums in O(1); rolling over to a new day
+shifts every driver at once with a few vectorized operations. Metrics
+(week-over-week, month-over-month, moving averages, linear projection)
+are computed for all drivers in one pass, so the per-driver answer and
+the fleet-wide nightly report share the same code.
+
+Windows cover complete UTC days only, ending yesterday; today's trips
+accumulate separately and enter the windows when the day rolls over.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DAY_SECONDS = 86400
+WEEK_DAYS = 7
+MONTH_DAYS = 30
+HISTORY_DAYS = 2 * MONTH_DAYS
+FIT_DAYS = MONTH_DAYS
+# Running sums keep float residue (~1e-12) after every trip has left a window;
+# a previous window smaller than this counts as empty for the growth ratios
+EMPTY_WINDOW = 1e-6
+
+# Constant regression sums over x = 0 .. FIT_DAYS - 1 (oldest day is x = 0)
+_SUM_X = FIT_DAYS * (FIT_DAYS - 1) / 2
+_SUM_XX = (FIT_DAYS - 1) * FIT_DAYS * (2 * FIT_DAYS - 1) / 6
+
+METRICS = (
+    "week", "previous_week", "week_over_week",
+    "month", "previous_month", "month_over_month",
+    "moving_average_7d", "moving_average_30d",
+    "trend_per_day", "projected_next_7d", "projected_next_30d",
+)
+
+class GrowthTracker:
+    def __init__(self, day=None, history=None, max_drivers=100000):
+        # history(driver_id, day) -> (daily net for the HISTORY_DAYS complete days
+        # before `day`, oldest first; net so far on `day`), used to seed new drivers
+        if max_drivers < 1:
+            raise ValueError("max_drivers must be at least 1")
+        self.day = int(time.time()) // DAY_SECONDS if day is None else int(day)
+        self.history = history
+        self.max_drivers = max_drivers
+        self.rows = OrderedDict()   # driver_id -> row index, least recently used first
+        self._lock = threading.Lock()
+
+        self.ring = np.zeros((0, HISTORY_DAYS))
+        self.today = np.zeros(0)
+        self.week = np.zeros(0)
+        self.previous_week = np.zeros(0)
+        self.month = np.zeros(0)
+        self.previous_month = np.zeros(0)
+        self.sum_xy = np.zeros(0)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _slot(self, age):
+        """Ring column holding the complete day `age` days before self.day"""
+        return (self.day - age) % HISTORY_DAYS
+
+    def _add_row(self, driver_id):
+        if len(self.rows) >= self.max_drivers:
+            # Reuse the least recently used driver's row; rows stay 0 .. len(rows) - 1
+            _, row = self.rows.popitem(last=False)
+        else:
+            row = len(self.rows)
+            if row == len(self.today):
+                capacity = min(max(2 * row, 16), self.max_drivers)
+                self.ring = np.resize(self.ring, (capacity, HISTORY_DAYS))
+                for name in ("today", "week", "previous_week", "month", "previous_month", "sum_xy"):
+                    setattr(self, name, np.resize(getattr(self, name), capacity))
+        self.rows[driver_id] = row
+        self.ring[row] = 0.0
+        for name in ("today", "week", "previous_week", "month", "previous_month", "sum_xy"):
+            getattr(self, name)[row] = 0.0
+        return row
+
+    def row(self, driver_id):
+        """Row index for a driver, seeding it from history on first use.
+
+        history() may fetch from upstream, so it runs outside the lock and a
+        slow driver does not hold up the others.
+        """
+        driver_id = str(driver_id)
+        while True:
+            with self._lock:
+                row = self.rows.get(driver_id)
+                if row is not None:
+                    self.rows.move_to_end(driver_id)
+                    return row
+                if self.history is None:
+                    return self._add_row(driver_id)
+                day = self.day
+
+            daily, today = self.history(driver_id, day)
+
+            with self._lock:
+                row = self.rows.get(driver_id)
+                if row is not None:
+                    # Seeded by another thread meanwhile
+                    self.rows.move_to_end(driver_id)
+                    return row
+                if self.day == day:
+                    row = self._add_row(driver_id)
+                    self._seed(row, np.asarray(daily, dtype=np.float64), today)
+                    return row
+            # The day rolled over during the fetch; that history is a day behind
+
+    def _seed(self, row, daily, today):
+        """Fill a row from HISTORY_DAYS daily totals (oldest first); O(HISTORY_DAYS) once"""
+        ages = np.arange(HISTORY_DAYS, 0, -1)
+        self.ring[row, self._slot(ages)] = daily
+        self.today[row] = today
+        self.week[row] = daily[-WEEK_DAYS:].sum()
+        self.previous_week[row] = daily[-2 * WEEK_DAYS:-WEEK_DAYS].sum()
+        self.month[row] = daily[-MONTH_DAYS:].sum()
+        self.previous_month[row] = daily[-2 * MONTH_DAYS:-MONTH_DAYS].sum()
+        self.sum_xy[row] = np.dot(np.arange(FIT_DAYS), daily[-FIT_DAYS:])
+
+    def record(self, driver_id, timestamp, net_earning):
+        """Add one trip's net earning; O(1) unless it starts a new day"""
+        driver_id = str(driver_id)
+        day = int(timestamp) // DAY_SECONDS
+        while True:
+            self.row(driver_id)
+            with self._lock:
+                # Re-read: the row may have been reused for another driver since
+                row = self.rows.get(driver_id)
+                if row is None:
+                    continue
+                if day > self.day:
+                    self.advance(day)
+                age = self.day - day
+                if age == 0:
+                    self.today[row] += net_earning
+                elif age <= HISTORY_DAYS:
+                    self._add_complete(row, age, net_earning)
+                return
+
+    def record_trips(self, driver_id, ledger):
+        """EarningsStore listener: record every trip of an appended TripLedger.
+
+        Drivers not tracked yet are skipped: the store already holds these
+        trips when they are seeded from it later.
+        """
+        driver_id = str(driver_id)
+        with self._lock:
+            if driver_id not in self.rows:
+                return
+        net = (ledger.fare + ledger.bonus) - (ledger.commission + ledger.penalty + ledger.travel_cost_per_trip())
+        for timestamp, value in zip(ledger.timestamp.tolist(), net.tolist()):
+            self.record(driver_id, timestamp, value)
+
+    def _add_complete(self, row, age, value):
+        """Late trip for an already complete day"""
+        self.ring[row, self._slot(age)] += value
+        if age <= WEEK_DAYS:
+            self.week[row] += value
+        elif age <= 2 * WEEK_DAYS:
+            self.previous_week[row] += value
+        if age <= MONTH_DAYS:
+            self.month[row] += value
+            self.sum_xy[row] += (FIT_DAYS - age) * value
+        else:
+            self.previous_month[row] += value
+
+    def advance(self, day):
+        """Roll every driver forward to `day`; each step is vectorized over drivers"""
+        steps = int(day) - self.day
+        if steps <= 0:
+            return
+        n = len(self.rows)
+        if steps > HISTORY_DAYS + 1:
+            for name in ("ring", "today", "week", "previous_week", "month", "previous_month", "sum_xy"):
+                getattr(self, name)[:n] = 0.0
+            self.day = int(day)
+            return
+
+        ring = self.ring[:n]
+        week, previous_week = self.week[:n], self.previous_week[:n]
+        month, previous_month = self.month[:n], self.previous_month[:n]
+        sum_xy, today = self.sum_xy[:n], self.today[:n]
+
+        for _ in range(steps):
+            # Ages shift by one: these days cross a window boundary
+            leaving_week = ring[:, self._slot(WEEK_DAYS)]
+            leaving_previous_week = ring[:, self._slot(2 * WEEK_DAYS)]
+            leaving_month = ring[:, self._slot(MONTH_DAYS)]
+            leaving_history = ring[:, self._slot(HISTORY_DAYS)]
+
+            week += today - leaving_week
+            previous_week += leaving_week - leaving_previous_week
+            previous_month += leaving_month - leaving_history
+            # Every remaining day's x drops by one; the completed day enters at x = FIT_DAYS - 1
+            sum_xy -= month - leaving_month
+            sum_xy += (FIT_DAYS - 1) * today
+            month += today - leaving_month
+
+            # The slot of the day leaving history is reused for the day just completed
+            ring[:, self.day % HISTORY_DAYS] = today
+            today[:] = 0.0
+            self.day += 1
+
+    def metrics(self, rows=None):
+        """Growth metrics as parallel arrays, for all drivers or the given rows"""
+        n = len(self.rows)
+        index = slice(0, n) if rows is None else np.asarray(rows)
+        week, previous_week = self.week[index], self.previous_week[index]
+        month, previous_month = self.month[index], self.previous_month[index]
+
+        slope = (FIT_DAYS * self.sum_xy[index] - _SUM_X * month) / (FIT_DAYS * _SUM_XX - _SUM_X ** 2)
+        intercept = (month - slope * _SUM_X) / FIT_DAYS
+
+        def projected(days):
+            # Sum of the fitted line over x = FIT_DAYS .. FIT_DAYS + days - 1
+            return days * intercept + slope * (days * FIT_DAYS + days * (days - 1) / 2)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            week_over_week = np.where(np.abs(previous_week) > EMPTY_WINDOW,
+                                      (week - previous_week) / np.abs(previous_week), np.nan)
+            month_over_month = np.where(np.abs(previous_month) > EMPTY_WINDOW,
+                                        (month - previous_month) / np.abs(previous_month), np.nan)
+
+        return {
+            "week": week,
+            "previous_week": previous_week,
+            "week_over_week": week_over_week,
+            "month": month,
+            "previous_month": previous_month,
+            "month_over_month": month_over_month,
+            "moving_average_7d": week / WEEK_DAYS,
+            "moving_average_30d": month / MONTH_DAYS,
+            "trend_per_day": slope,
+            "projected_next_7d": projected(WEEK_DAYS),
+            "projected_next_30d": projected(MONTH_DAYS),
+        }
+
+    def driver_metrics(self, driver_id, now=None):
+        """Metrics for one driver as a dict of floats (NaN where undefined)"""
+        driver_id = str(driver_id)
+        while True:
+            self.row(driver_id)
+            with self._lock:
+                row = self.rows.get(driver_id)
+                if row is None:
+                    continue
+                self.advance((int(time.time()) if now is None else int(now)) // DAY_SECONDS)
+                return {name: float(values[0]) for name, values in self.metrics([row]).items()}
+
+    def fleet_report(self, now=None):
+        """(driver_ids, metrics) for every tracked driver, computed in one vectorized pass"""
+        with self._lock:
+            self.advance((int(time.time()) if now is None else int(now)) // DAY_SECONDS)
+            driver_ids = [None] * len(self.rows)
+            for driver_id, row in self.rows.items():
+                driver_ids[row] = driver_id
+            return driver_ids, self.metrics()
+
+def store_history(driver_id, day):
+    """GrowthTracker history source backed by the earnings store"""
+    from earnings_store import get_earnings_store
+
+    series = get_earnings_store().series(driver_id)
+    start = (day - HISTORY_DAYS) * DAY_SECONDS
+    daily = series.daily(start, day * DAY_SECONDS)["net_earning"]
+    return daily[:HISTORY_DAYS], float(daily[HISTORY_DAYS])
+
+def write_fleet_report(tracker, path, now=None):
+    """Nightly CSV: one row per driver, one column per metric"""
+    driver_ids, metrics = tracker.fleet_report(now)
+    with open(path, "w") as f:
+        f.write(",".join(("driver_id",) + METRICS) + "\n")
+        for i, driver_id in enumerate(driver_ids):
+            f.write(",".join([driver_id] + [f"{metrics[name][i]:.4f}" for name in METRICS]) + "\n")
+    return len(driver_ids)
+
+_growth_tracker = None
+_growth_tracker_lock = threading.Lock()
+
+def get_growth_tracker():
+    """Process-wide tracker seeded from, and kept current by, the earnings store"""
+    global _growth_tracker
+    with _growth_tracker_lock:
+        if _growth_tracker is None:
+            from config import GROWTH_TRACKER_MAX_DRIVERS
+            from earnings_store import get_earnings_store
+            _growth_tracker = GrowthTracker(history=store_history, max_drivers=GROWTH_TRACKER_MAX_DRIVERS)
+            get_earnings_store().listeners.append(_growth_tracker.record_trips)
+        return _growth_tracker
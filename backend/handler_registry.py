@@ -0,0 +1,91 @@
+"""
+Config-driven, lazily imported response handlers.
+
+config.HANDLERS maps every category ID in config.CATEGORIES to a
+"package.module:function" path. HandlerRegistry checks at construction
+that every category has a handler and that its module can be found,
+without importing it; the module is imported the first time one of its
+categories is dispatched. Handlers are called as handler(request, session)
+with a session_store.Session (the registry rejects a handler that cannot
+take both when it imports it; single-argument handlers from before
+sessions must add the parameter) and return the reply as a string, or as a
+generator or async generator of fragments. Handler modules defer their own clients and
+stores to first use as well (see data_access.get_data_access), so a
+process only pays for the intents it actually serves.
+"""
+
+import importlib
+import importlib.util
+import inspect
+import threading
+
+def parse_handler_path(path):
+    module, _, attribute = path.partition(":")
+    if not module or not attribute:
+        raise ValueError(f"Handler path {path!r} must look like 'package.module:function'")
+    return module, attribute
+
+def check_handler(handler, path):
+    """Raise ValueError unless handler can be called as handler(request, session)"""
+    if not callable(handler):
+        raise ValueError(f"Handler {path!r} is not callable")
+    try:
+        signature = inspect.signature(handler)
+    except (TypeError, ValueError):
+        return  # builtins without a signature are taken on trust
+    try:
+        signature.bind(None, None)
+    except TypeError:
+        raise ValueError(
+            f"Handler {path!r} must accept (request, session), not {signature}"
+        ) from None
+
+class HandlerRegistry:
+    def __init__(self, categories, handlers, default="default"):
+        self.categories = categories
+        self.default = default
+        self.paths = {}
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+        missing = [category_id for category_id in categories if category_id not in handlers]
+        unknown = [category_id for category_id in handlers if category_id not in categories]
+        if missing or unknown:
+            raise ValueError(
+                f"HANDLERS must cover exactly the CATEGORIES: missing {missing}, unknown {unknown}"
+            )
+        if default not in handlers:
+            raise ValueError(f"HANDLERS needs a {default!r} entry for unmatched categories")
+
+        for category_id, path in handlers.items():
+            module, _ = parse_handler_path(path)
+            if importlib.util.find_spec(module) is None:
+                raise ValueError(f"Handler module {module!r} for category {category_id!r} not found")
+            self.paths[category_id] = path
+
+    def get(self, category_id):
+        """Handler for a category (the default handler for unknown IDs), imported on first use"""
+        if category_id not in self.paths:
+            category_id = self.default
+        handler = self._loaded.get(category_id)
+        if handler is not None:
+            return handler
+
+        with self._lock:
+            handler = self._loaded.get(category_id)
+            if handler is None:
+                path = self.paths[category_id]
+                module, attribute = parse_handler_path(path)
+                handler = getattr(importlib.import_module(module), attribute)
+                check_handler(handler, path)
+                self._loaded[category_id] = handler
+            return handler
+
+    def loaded(self):
+        """Category IDs whose handlers have been imported so far"""
+        return list(self._loaded)
+
+    def preload(self):
+        """Import every handler now, e.g. before forking workers that all serve every intent"""
+        for category_id in self.paths:
+            self.get(category_id)
@@ -0,0 +1,138 @@
+"""
+Hot-path instrumentation with Prometheus text export.
+
+IntentClassifier and QueryAgent only touch this module when
+classifier.instrumentation is set, so a disabled setup costs one
+attribute check per request. Recorded:
+
+- per-stage latency histograms (preprocess, vectorize, score, batch,
+  handler per category); on the batch path each stage is timed once
+  per batch
+- per-category and per-source (model, cache, fast_path) counts
+- confidence distribution and default-fallback count
+
+Hooks receive the same events, e.g. to forward them to StatsD or logs.
+"""
+
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+class InstrumentationHook:
+    """Base class for hooks; override the events you care about"""
+
+    def on_stage(self, stage, seconds, category=None):
+        pass
+
+    def on_classification(self, category_name, confidence, source):
+        pass
+
+class Instrumentation:
+    def __init__(self, namespace="saathi"):
+        self.namespace = namespace
+        self.hooks = []
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.categories = {}
+        self.sources = {}
+        self.confidence = Histogram(CONFIDENCE_BUCKETS)
+        self.classifications = 0
+        self.default_fallbacks = 0
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def observe_stage(self, stage, seconds, category=None):
+        key = (stage, category)
+        with self._lock:
+            histogram = self.stages.get(key)
+            if histogram is None:
+                histogram = self.stages[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+        for hook in self.hooks:
+            hook.on_stage(stage, seconds, category)
+
+    def observe_classification(self, category_name, confidence, source="model"):
+        with self._lock:
+            self.classifications += 1
+            self.categories[category_name] = self.categories.get(category_name, 0) + 1
+            self.sources[source] = self.sources.get(source, 0) + 1
+            self.confidence.observe(confidence)
+            if category_name == "others":
+                self.default_fallbacks += 1
+        for hook in self.hooks:
+            hook.on_classification(category_name, confidence, source)
+
+    def observe_timings(self, timings):
+        """Record the *_ms stage timings produced by IntentClassifier.classify and predict_batch"""
+        for name, value in timings.items():
+            if name.endswith('_ms') and name != 'classify_ms':
+                self.observe_stage(name[:-3], value / 1000)
+
+    def render_prometheus(self):
+        ns = self.namespace
+        lines = []
+
+        with self._lock:
+            lines.append(f"# HELP {ns}_stage_seconds Time spent in each request stage")
+            lines.append(f"# TYPE {ns}_stage_seconds histogram")
+            for (stage, category), histogram in sorted(self.stages.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+                labels = f'stage="{stage}"' + (f',category="{category}"' if category is not None else "")
+                lines.extend(_histogram_lines(f"{ns}_stage_seconds", labels, histogram))
+
+            lines.append(f"# HELP {ns}_classifications_total Classified requests by category")
+            lines.append(f"# TYPE {ns}_classifications_total counter")
+            for category, count in sorted(self.categories.items()):
+                lines.append(f'{ns}_classifications_total{{category="{category}"}} {count}')
+
+            lines.append(f"# HELP {ns}_classification_source_total Classified requests by decision source")
+            lines.append(f"# TYPE {ns}_classification_source_total counter")
+            for source, count in sorted(self.sources.items()):
+                lines.append(f'{ns}_classification_source_total{{source="{source}"}} {count}')
+
+            lines.append(f"# HELP {ns}_confidence Confidence of the top predicted class")
+            lines.append(f"# TYPE {ns}_confidence histogram")
+            lines.extend(_histogram_lines(f"{ns}_confidence", "", self.confidence))
+
+            lines.append(f"# HELP {ns}_default_fallback_total Requests routed to the default handler")
+            lines.append(f"# TYPE {ns}_default_fallback_total counter")
+            lines.append(f"{ns}_default_fallback_total {self.default_fallbacks}")
+
+            ratio = self.default_fallbacks / self.classifications if self.classifications else 0.0
+            lines.append(f"# HELP {ns}_default_fallback_ratio Share of requests routed to the default handler")
+            lines.append(f"# TYPE {ns}_default_fallback_ratio gauge")
+            lines.append(f"{ns}_default_fallback_ratio {ratio:.6f}")
+
+        return "\n".join(lines) + "\n"
+
+def _histogram_lines(name, labels, histogram):
+    separator = "," if labels else ""
+    for bound, count in histogram.cumulative():
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        yield f'{name}_bucket{{{labels}{separator}le="{le}"}} {count}'
+    suffix = f"{{{labels}}}" if labels else ""
+    yield f"{name}_sum{suffix} {histogram.sum:.9f}"
+    yield f"{name}_count{suffix} {histogram.count}"
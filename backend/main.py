@@ -4,53 +4,271 @@ Simple Intent Classification System
 """
 
 import argparse
-from config import CATEGORIES, MODEL_CONFIG, CONFIDENCE_THRESHOLD
+import contextlib
+import json
+import sys
+from itertools import islice
+from config import (
+    CATEGORIES, MODEL_CONFIG, CONFIDENCE_THRESHOLD, SERVER_CONFIG,
+    MODEL_PATH, BUILD_CACHE_PATH, STALE_MODEL_POLICY, PREDICTION_CACHE,
+    FAST_PATH_MODE, FAST_PATH_RULES, TUNING_GRID, INSTRUMENTATION_ENABLED,
+    COMPACTION_CANDIDATES, SESSIONS
+)
 from training_data import training_data
-from utils import IntentClassifier, QueryAgent
+from model_artifact import ArtifactError, StaleArtifactError, model_fingerprint, read_manifest
+from session_store import valid_driver_id
+from utils import IntentClassifier, QueryAgent, read_batch_records
+
+def run_batch(classifier, stream, out, batch_size=1000):
+    """Label records from stream in fixed-size chunks and write JSONL to out"""
+    records = read_batch_records(stream)
+
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+
+        predictions = classifier.predict_batch(
+            [record['text'] for record in chunk], CONFIDENCE_THRESHOLD
+        )
+
+        for record, (category_id, category_name, confidence) in zip(chunk, predictions):
+            record['category_id'] = category_id
+            record['category_name'] = category_name
+            record['confidence'] = round(confidence, 4)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+def run_update(classifier, stream, batch_size=1000):
+    """Stream labelled records into IntentClassifier.update in fixed-size chunks"""
+    records = read_batch_records(stream)
+    total = 0
+
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+
+        missing = [record['text'] for record in chunk if 'label' not in record]
+        if missing:
+            raise ValueError(f"Update records need a 'label': {missing[0]!r}")
+
+        total += classifier.update([(record['text'], record['label']) for record in chunk], batch_size)
+        print(f"Applied {total} new examples")
+
+def train_and_save(classifier, fingerprint):
+    classifier.train(training_data, BUILD_CACHE_PATH)
+    classifier.save_model(MODEL_PATH, fingerprint, [text for text, _ in training_data])
+
+def artifact_is_current(fingerprint):
+    try:
+        return read_manifest(MODEL_PATH)["fingerprint"] == fingerprint
+    except (FileNotFoundError, ArtifactError):
+        return False
+
+def load_for_serving(classifier, fingerprint):
+    """Load the artifact without ever training; exits if no usable model exists"""
+    try:
+        classifier.load_model(MODEL_PATH, fingerprint)
+    except FileNotFoundError:
+        sys.exit(f"No model artifact at {MODEL_PATH}. Run 'python main.py --train' first.")
+    except StaleArtifactError as e:
+        if STALE_MODEL_POLICY != 'use_last_good':
+            sys.exit(f"{e}. Run 'python main.py --train' to rebuild it.")
+        print(f"Warning: {e}. Serving the last good artifact; run 'python main.py --train' to rebuild.")
+        classifier.load_model(MODEL_PATH)
+    except ArtifactError as e:
+        sys.exit(f"Model artifact is unusable: {e}")
+
+def reload_for_serving(classifier, fingerprint):
+    """Reload a replaced artifact in place; like load_for_serving but raises instead of exiting"""
+    try:
+        classifier.load_model(MODEL_PATH, fingerprint)
+    except StaleArtifactError as e:
+        if STALE_MODEL_POLICY != 'use_last_good':
+            raise
+        print(f"Warning: {e}. Serving it anyway.")
+        classifier.load_model(MODEL_PATH)
+
+def load_or_train(classifier, fingerprint):
+    """Interactive/demo modes: load the artifact, building it first if needed"""
+    try:
+        classifier.load_model(MODEL_PATH, fingerprint)
+        print("Model loaded successfully!")
+    except FileNotFoundError:
+        print("No trained model found. Training new model...")
+        train_and_save(classifier, fingerprint)
+    except ArtifactError as e:
+        print(f"Model artifact is out of date ({e}). Training new model...")
+        train_and_save(classifier, fingerprint)
 
 def main():
     parser = argparse.ArgumentParser(description="Simple Intent Classifier")
-    parser.add_argument('--train', '-t', action='store_true', help='Train the model')
+    parser.add_argument('--train', '-t', action='store_true', help='Build the model if its inputs changed')
+    parser.add_argument('--force', '-f', action='store_true', help='With --train, rebuild even if up to date')
     parser.add_argument('--query', '-q', type=str, help='Process a single query')
     parser.add_argument('--interactive', '-i', action='store_true', help='Interactive mode')
+    parser.add_argument('--driver', type=str,
+                        help='Driver ID for --query/--interactive sessions (default: SESSIONS default_driver_id)')
+    parser.add_argument('--batch-file', '-b', type=str,
+                        help="Label a JSONL or plain-text file ('-' for stdin) and stream JSONL to stdout")
+    parser.add_argument('--batch-size', type=int,
+                        help='Records per batch in --batch-file/--update mode (default 1000), per worker chunk in --replay (default 20000)')
+    parser.add_argument('--update', '-u', type=str, metavar='PATH',
+                        help="Fold labelled JSONL records ({\"text\": ..., \"label\": ...}) into the online model")
+    parser.add_argument('--tune', action='store_true',
+                        help='Cross-validated search over TUNING_GRID; writes the best config and a report')
+    parser.add_argument('--folds', type=int, default=5, help='Stratified folds for --tune')
+    parser.add_argument('--jobs', type=int, help='Worker processes for --tune/--replay (default: all cores)')
+    parser.add_argument('--output', type=str, default='tuning', help='Output directory for --tune')
+    parser.add_argument('--compaction-report', action='store_true',
+                        help='Compare pruned/quantized model sizes against validation accuracy')
+    parser.add_argument('--from-pickle', type=str, metavar='PATH',
+                        help='Convert a legacy intent_model.pkl into a model artifact')
+    parser.add_argument('--replay', type=str, metavar='LOG',
+                        help="Replay a JSONL or plain-text query log ('-' for stdin) through --baseline and --candidate")
+    parser.add_argument('--baseline', type=str, default=MODEL_PATH,
+                        help='Model artifact directory or legacy .pkl for --replay (default: MODEL_PATH)')
+    parser.add_argument('--candidate', type=str, help='Model artifact directory or legacy .pkl to compare in --replay')
+    parser.add_argument('--latency-sample', type=float, default=0.01,
+                        help='Fraction of replayed queries timed one at a time per model')
+    parser.add_argument('--replay-output', type=str, default='replay_summary.json',
+                        help='Summary JSON written by --replay')
+    parser.add_argument('--growth-report', type=str, metavar='PATH',
+                        help='Write nightly growth metrics for every stored driver to a CSV')
+    parser.add_argument('--serve', '-s', action='store_true', help='Run the HTTP inference service')
+    parser.add_argument('--host', type=str, help='Host to bind in --serve mode')
+    parser.add_argument('--port', type=int, help='Port to bind in --serve mode')
+    parser.add_argument('--workers', '-w', type=int,
+                        help='Pre-forked worker processes in --serve mode (default: SERVER_CONFIG)')
     
     args = parser.parse_args()
+    if args.batch_size is not None and args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.replay and not args.candidate:
+        parser.error("--replay needs --candidate")
+    if not 0 < args.latency_sample <= 1:
+        parser.error("--latency-sample must be in (0, 1]")
+    if args.driver is not None and not valid_driver_id(args.driver):
+        parser.error("--driver must be 1-64 letters, digits, '_' or '-'")
     
     # Initialize classifier and agent
     classifier = IntentClassifier(MODEL_CONFIG, CATEGORIES)
+    if PREDICTION_CACHE['enabled']:
+        classifier.enable_cache(PREDICTION_CACHE['max_size'], PREDICTION_CACHE['ttl_seconds'])
+    classifier.enable_fast_path(FAST_PATH_RULES, FAST_PATH_MODE)
+    if INSTRUMENTATION_ENABLED:
+        from instrumentation import Instrumentation
+        classifier.instrumentation = Instrumentation()
     agent = QueryAgent(classifier, CONFIDENCE_THRESHOLD)
     
+    fingerprint = model_fingerprint(MODEL_CONFIG, training_data)
+    
     if args.train:
+        if not args.force and artifact_is_current(fingerprint):
+            print(f"Model at {MODEL_PATH} is up to date.")
+            return
         print("Training the model...")
-        classifier.train(training_data)
-        classifier.save_model()
+        train_and_save(classifier, fingerprint)
         print("Training completed!")
         return
     
-    # Try to load existing model or train if not exists
-    try:
-        classifier.load_model()
-        print("Model loaded successfully!")
-    except:
-        print("No trained model found. Training new model...")
-        classifier.train(training_data)
-        classifier.save_model()
+    if args.tune:
+        from tuning import tune, write_results, print_report
+        best_config, report = tune(MODEL_CONFIG, training_data, TUNING_GRID, args.folds, args.jobs)
+        print_report(report)
+        config_path, report_path = write_results(best_config, report, args.output)
+        print(f"Evaluated {report['configurations']} configurations in {report['elapsed_seconds']}s")
+        print(f"Best config written to {config_path}, full report to {report_path}")
+        return
+    
+    if args.compaction_report:
+        from model_compaction import compaction_report, print_compaction_report
+        report = compaction_report(MODEL_CONFIG, training_data, COMPACTION_CANDIDATES, BUILD_CACHE_PATH)
+        print_compaction_report(report)
+        return
+    
+    if args.replay:
+        from replay import replay_log, write_summary, print_summary
+        stream = sys.stdin if args.replay == '-' else open(args.replay, encoding='utf-8')
+        with stream:
+            summary = replay_log(stream, args.baseline, args.candidate, CATEGORIES, CONFIDENCE_THRESHOLD,
+                                 args.batch_size or 20000, args.jobs, args.latency_sample)
+        print_summary(summary)
+        write_summary(summary, args.replay_output)
+        print(f"Summary written to {args.replay_output}")
+        return
+    
+    if args.growth_report:
+        from earnings_store import get_earnings_store
+        from growth_analytics import GrowthTracker, store_history, write_fleet_report
+        driver_ids = get_earnings_store().driver_ids()
+        # Sized for every driver: the report must not evict any of them
+        tracker = GrowthTracker(history=store_history, max_drivers=max(1, len(driver_ids)))
+        for driver_id in driver_ids:
+            tracker.row(driver_id)
+        count = write_fleet_report(tracker, args.growth_report)
+        print(f"Wrote growth metrics for {count} drivers to {args.growth_report}")
+        return
+    
+    if args.update:
+        classifier.load_model(MODEL_PATH, fingerprint)
+        with open(args.update, encoding='utf-8') as stream:
+            run_update(classifier, stream, args.batch_size or 1000)
+        classifier.save_model(MODEL_PATH, fingerprint)
+        return
+    
+    if args.from_pickle:
+        classifier.load_pickle(args.from_pickle)
+        classifier.save_model(MODEL_PATH, fingerprint, [text for text, _ in training_data])
+        return
+    
+    # Keep stdout clean for JSONL output in batch mode
+    log_stream = sys.stderr if args.batch_file else sys.stdout
+
+    with contextlib.redirect_stdout(log_stream):
+        if args.serve or args.batch_file:
+            load_for_serving(classifier, fingerprint)
+        else:
+            load_or_train(classifier, fingerprint)
+    
+    if args.serve:
+        server_config = dict(SERVER_CONFIG, workers=args.workers or SERVER_CONFIG['workers'])
+        if server_config['workers'] > 1:
+            from prefork import serve_prefork
+            serve_prefork(agent, server_config, MODEL_PATH,
+                          lambda: reload_for_serving(classifier, fingerprint), args.host, args.port)
+        else:
+            from server import serve
+            serve(agent, server_config, args.host, args.port)
+    
+    elif args.batch_file:
+        if args.batch_file == '-':
+            run_batch(classifier, sys.stdin, sys.stdout, args.batch_size or 1000)
+        else:
+            with open(args.batch_file, encoding='utf-8') as stream:
+                run_batch(classifier, stream, sys.stdout, args.batch_size or 1000)
+        if classifier.router is not None:
+            print(f"Fast path: {classifier.router.stats()}", file=sys.stderr)
     
-    if args.query:
+    elif args.query:
         # Process single query
-        result = agent.process_request(args.query)
-        response = agent.handle_query(args.query)
+        result = agent.run(args.query, args.driver)
         
         print(f"\nQuery: '{args.query}'")
         print(f"Category: {result['category_name']} (ID: {result['category_id']})")
         print(f"Confidence: {result['confidence']:.2%}")
-        print(f"Response: {response}")
+        print(f"Response: {agent.format_response(result)}")
     
     elif args.interactive:
         # Interactive mode
         print("Intent Classification Agent - Interactive Mode")
         print("Type 'quit' to exit")
         print("-" * 40)
+        # One session for the whole conversation, so follow-up answers resume their handler
+        driver_id = args.driver or SESSIONS['default_driver_id']
         
         while True:
             user_input = input("\nEnter your query: ").strip()
@@ -61,12 +279,11 @@ def main():
             if not user_input:
                 continue
             
-            result = agent.process_request(user_input)
-            response = agent.handle_query(user_input)
+            result = agent.run(user_input, driver_id)
             
             print(f"\nCategory: {result['category_name']}")
             print(f"Confidence: {result['confidence']:.2%}")
-            print(f"Agent: {response}")
+            print(f"Agent: {agent.format_response(result)}")
     
     else:
         # Demo mode - show sample queries
@@ -84,13 +301,12 @@ def main():
         ]
         
         for query in sample_queries:
-            result = agent.process_request(query)
-            response = agent.handle_query(query)
+            result = agent.run(query)
             
             print(f"\nQuery: '{query}'")
             print(f"Category: {result['category_name']} (ID: {result['category_id']})")
             print(f"Confidence: {result['confidence']:.2%}")
-            print(f"Response: {response}")
+            print(f"Response: {agent.format_response(result)}")
             print("-" * 40)
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+"""
+Directory-based model artifact.
+
+Each array of the compiled model is stored as a raw .npy file so workers can
+np.load(..., mmap_mode='r') it and share pages after fork. manifest.json
+records the schema version, a fingerprint of MODEL_CONFIG and the training
+data, the class labels and the training metrics.
+"""
+
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+from compiled_model import CompiledIntentModel
+
+SCHEMA_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# Readers that overlap save_artifact's directory swap retry this often before giving up
+SWAP_RETRIES = 20
+SWAP_RETRY_SECONDS = 0.01
+
+class ArtifactError(Exception):
+    """Raised when an artifact is unreadable or does not match the current inputs"""
+
+class StaleArtifactError(ArtifactError):
+    """Raised when a readable artifact was built from other config or training data"""
+
+def stable_hash(value):
+    """sha256 of a JSON-serialisable value, with tuples treated as lists"""
+    payload = json.dumps(value, sort_keys=True, default=list)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def training_data_key(training_data):
+    return [[text, str(label)] for text, label in training_data]
+
+def model_fingerprint(model_config, training_data):
+    """Stable hash of everything that determines the trained weights"""
+    if model_config.get('model_type', 'tfidf_logreg') == 'hashing_sgd':
+        # Online models absorb updates beyond training_data, so only their config pins them
+        sections = ('model_type', 'hashing', 'sgd', 'online')
+        return stable_hash({"config": {key: model_config[key] for key in sections}})
+
+    config = {key: model_config[key] for key in ('tfidf', 'classifier')}
+    if model_config.get('compaction', {}).get('enabled'):
+        config['compaction'] = model_config['compaction']
+    return stable_hash({"config": config, "training_data": training_data_key(training_data)})
+
+def save_artifact(model, directory, fingerprint, metrics=None):
+    """Write the compiled model arrays and manifest, replacing any previous artifact.
+
+    The new directory is complete before it is swapped in, but the swap takes two
+    renames: for a moment nothing exists at `directory`. read_manifest and
+    load_artifact retry across that gap.
+    """
+    tmp_directory = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_directory, exist_ok=True)
+
+    arrays = model.to_arrays()
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_directory, f"{name}.npy"), array, allow_pickle=False)
+
+    manifest = {
+        "schema_version": SCHEMA_VERSION,
+        "model_type": model.model_type,
+        "fingerprint": fingerprint,
+        "classes": [str(label) for label in model.classes_],
+        "metrics": metrics or {},
+        "arrays": sorted(arrays),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(os.path.join(tmp_directory, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.isdir(directory):
+        old_directory = f"{directory}.old-{os.getpid()}"
+        os.rename(directory, old_directory)
+        os.rename(tmp_directory, directory)
+        for name in os.listdir(old_directory):
+            os.remove(os.path.join(old_directory, name))
+        os.rmdir(old_directory)
+    else:
+        os.rename(tmp_directory, directory)
+
+    return manifest
+
+def _swapping(directory):
+    """True while a save_artifact's temporary or old directory sits next to `directory`"""
+    parent, name = os.path.split(os.path.abspath(directory))
+    try:
+        return any(entry.startswith((f"{name}.tmp-", f"{name}.old-")) for entry in os.listdir(parent))
+    except OSError:
+        return False
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST_FILE)
+    for attempt in range(SWAP_RETRIES):
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+            break
+        except FileNotFoundError:
+            if attempt + 1 == SWAP_RETRIES or not _swapping(directory):
+                raise
+            time.sleep(SWAP_RETRY_SECONDS)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ArtifactError(f"Unreadable manifest {path}: {e}")
+
+    if manifest.get("schema_version") != SCHEMA_VERSION:
+        raise ArtifactError(
+            f"Artifact schema {manifest.get('schema_version')} is not supported (expected {SCHEMA_VERSION})"
+        )
+    return manifest
+
+def load_artifact(directory, expected_fingerprint=None, mmap=True):
+    """Load a compiled model, checking the manifest before touching any weights.
+
+    A load that overlaps save_artifact may read the old manifest and the new
+    arrays, so it is retried until the manifest is unchanged after the arrays
+    are loaded.
+    """
+    for attempt in range(SWAP_RETRIES):
+        try:
+            model, manifest = _load_artifact(directory, expected_fingerprint, mmap)
+            if read_manifest(directory) == manifest:
+                return model, manifest
+        except (OSError, ValueError, ArtifactError):
+            if attempt + 1 == SWAP_RETRIES or not _swapping(directory):
+                raise
+        time.sleep(SWAP_RETRY_SECONDS)
+    raise ArtifactError(f"Artifact {directory} kept changing while it was loaded")
+
+def _load_artifact(directory, expected_fingerprint, mmap):
+    manifest = read_manifest(directory)
+
+    if expected_fingerprint and manifest["fingerprint"] != expected_fingerprint:
+        raise StaleArtifactError(
+            f"Artifact {directory} was built from a different config or training data"
+        )
+
+    model_type = manifest.get("model_type", CompiledIntentModel.model_type)
+    if model_type == CompiledIntentModel.model_type:
+        model_class = CompiledIntentModel
+    elif model_type == "tfidf_logreg_compact":
+        from model_compaction import CompactIntentModel
+        model_class = CompactIntentModel
+    elif model_type == "hashing_sgd":
+        from online_model import OnlineIntentModel
+        model_class = OnlineIntentModel
+    else:
+        raise ArtifactError(f"Unknown model type {model_type!r} in {directory}")
+
+    arrays = {}
+    for name in manifest["arrays"]:
+        path = os.path.join(directory, f"{name}.npy")
+        try:
+            arrays[name] = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+        except (OSError, ValueError) as e:
+            raise ArtifactError(f"Unreadable array {path}: {e}")
+
+    model = model_class.from_arrays(arrays)
+    if [str(label) for label in model.classes_] != manifest["classes"]:
+        raise ArtifactError(f"Artifact {directory} classes do not match its manifest")
+
+    return model, manifest
@@ -0,0 +1,146 @@
+"""
+Incremental model build with a fingerprint-keyed cache.
+
+The build runs in two stages, each cached under a hash of its inputs:
+
+- vectorizer: training data + MODEL_CONFIG['tfidf'] -> fitted vocabulary,
+  idf vector and the TF-IDF matrices of the train/test split
+- classifier: vectorizer key + MODEL_CONFIG['classifier'] -> coef/intercept
+
+Changing only the classifier settings reuses the cached TF-IDF matrices;
+changing nothing reuses both stages and skips fitting entirely.
+"""
+
+import os
+import numpy as np
+
+from model_artifact import stable_hash, training_data_key
+
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+def vectorizer_key(model_config, training_data):
+    return stable_hash({
+        "tfidf": model_config['tfidf'],
+        "training_data": training_data_key(training_data),
+        "split": [TEST_SIZE, RANDOM_STATE],
+    })
+
+def classifier_key(model_config, vectorizer_stage_key):
+    return stable_hash({"classifier": model_config['classifier'], "vectorizer": vectorizer_stage_key})
+
+def _write_stage(directory, arrays, matrices=()):
+    from scipy import sparse
+
+    tmp_directory = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_directory, f"{name}.npy"), array, allow_pickle=False)
+    for name, matrix in matrices:
+        sparse.save_npz(os.path.join(tmp_directory, f"{name}.npz"), matrix)
+    os.replace(tmp_directory, directory)
+
+def _read_stage(directory, names, matrix_names=()):
+    from scipy import sparse
+
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), allow_pickle=False) for name in names}
+    for name in matrix_names:
+        arrays[name] = sparse.load_npz(os.path.join(directory, f"{name}.npz"))
+    return arrays
+
+def _stage_cached(directory):
+    return os.path.isdir(directory)
+
+def split_training_data(training_data):
+    """The fixed train/validation split: (texts_train, texts_test, y_train, y_test)"""
+    from sklearn.model_selection import train_test_split
+
+    texts, labels = zip(*training_data)
+    labels = [str(label) for label in labels]
+    return train_test_split(
+        texts, labels, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=labels
+    )
+
+def fit_vectorizer_stage(model_config, training_data, cache_dir=None):
+    """Return (vectorizer, X_train, X_test, y_train, y_test, key, cache_hit)"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    key = vectorizer_key(model_config, training_data)
+    directory = os.path.join(cache_dir, f"vectorizer-{key[:16]}") if cache_dir else None
+    vectorizer = TfidfVectorizer(**model_config['tfidf'])
+
+    if directory and _stage_cached(directory):
+        stage = _read_stage(directory, ["terms", "idf", "y_train", "y_test"], ["X_train", "X_test"])
+        vectorizer.vocabulary_ = {str(term): i for i, term in enumerate(stage["terms"])}
+        vectorizer.idf_ = stage["idf"]
+        return (vectorizer, stage["X_train"], stage["X_test"],
+                stage["y_train"], stage["y_test"], key, True)
+
+    texts_train, texts_test, y_train, y_test = split_training_data(training_data)
+
+    X_train = vectorizer.fit_transform(texts_train)
+    X_test = vectorizer.transform(texts_test)
+    y_train = np.asarray(y_train, dtype=str)
+    y_test = np.asarray(y_test, dtype=str)
+
+    if directory:
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        _write_stage(
+            directory,
+            {"terms": np.asarray(terms, dtype=str), "idf": vectorizer.idf_,
+             "y_train": y_train, "y_test": y_test},
+            [("X_train", X_train), ("X_test", X_test)],
+        )
+
+    return vectorizer, X_train, X_test, y_train, y_test, key, False
+
+def fit_classifier_stage(model_config, X_train, y_train, vectorizer_stage_key, cache_dir=None):
+    """Return (classifier, cache_hit)"""
+    from sklearn.linear_model import LogisticRegression
+
+    key = classifier_key(model_config, vectorizer_stage_key)
+    directory = os.path.join(cache_dir, f"classifier-{key[:16]}") if cache_dir else None
+    classifier = LogisticRegression(**model_config['classifier'])
+
+    if directory and _stage_cached(directory):
+        stage = _read_stage(directory, ["coef", "intercept", "classes"])
+        classifier.coef_ = stage["coef"]
+        classifier.intercept_ = stage["intercept"]
+        classifier.classes_ = stage["classes"]
+        classifier.n_features_in_ = stage["coef"].shape[1]
+        return classifier, True
+
+    classifier.fit(X_train, y_train)
+
+    if directory:
+        _write_stage(directory, {
+            "coef": classifier.coef_,
+            "intercept": classifier.intercept_,
+            "classes": classifier.classes_.astype(str),
+        })
+
+    return classifier, False
+
+def build_pipeline(model_config, training_data, cache_dir=None):
+    """Fit (or reuse) both stages and return (pipeline, metrics, cache_hits)"""
+    from sklearn.pipeline import Pipeline
+    from sklearn.metrics import accuracy_score
+
+    vectorizer, X_train, X_test, y_train, y_test, key, vectorizer_hit = fit_vectorizer_stage(
+        model_config, training_data, cache_dir
+    )
+    classifier, classifier_hit = fit_classifier_stage(model_config, X_train, y_train, key, cache_dir)
+
+    # Score the cached matrices directly instead of re-running the vectorizer
+    train_acc = accuracy_score(y_train, classifier.predict(X_train))
+    test_acc = accuracy_score(y_test, classifier.predict(X_test))
+
+    pipeline = Pipeline([('tfidf', vectorizer), ('clf', classifier)])
+    metrics = {
+        "train_accuracy": round(float(train_acc), 4),
+        "test_accuracy": round(float(test_acc), 4),
+        "train_examples": int(X_train.shape[0]),
+        "test_examples": int(X_test.shape[0]),
+    }
+    cache_hits = {"vectorizer": vectorizer_hit, "classifier": classifier_hit}
+    return pipeline, metrics, cache_hits
@@ -0,0 +1,250 @@
+"""
+Pruned, quantized intent model for low-memory deployments.
+
+compact_model turns a CompiledIntentModel into a CompactIntentModel:
+
+- coefficients below prune_threshold x the largest weight of their class
+  are dropped; once enough are gone the rest move to a feature-major CSR
+  layout (feature_indptr, class_index, weights), otherwise they stay in a
+  dense feature-major matrix, whichever is smaller
+- weights are stored as float16, or as int8 with one scale per class
+  (float64 keeps full precision and only prunes)
+- vocabulary terms left without any weight are removed together with
+  their IDF entries, and terms and stop words are stored as packed UTF-8
+
+Removed terms no longer count towards a request's L2 norm, so scores
+shift slightly beyond the pruning itself; compaction_report measures the
+combined effect on the validation split alongside size and latency.
+"""
+
+import numpy as np
+
+from compiled_model import CompiledIntentModel, CompiledLogisticRegression, CompiledTfidfVectorizer
+
+WEIGHT_DTYPES = {"float64": np.float64, "float16": np.float16, "int8": np.int8}
+
+class CompactLogisticRegression(CompiledLogisticRegression):
+    def __init__(self, weights, scales, intercept, classes, feature_indptr=None, class_index=None):
+        # Dense layout: weights is (n_features, n_classes). Sparse layout: feature f
+        # owns entries feature_indptr[f]:feature_indptr[f + 1] of class_index/weights.
+        # Either way a stored weight's value is weight * scales[its class].
+        self.weights = np.asarray(weights)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.feature_indptr = None if feature_indptr is None else np.asarray(feature_indptr)
+        self.class_index = None if class_index is None else np.asarray(class_index)
+
+    @property
+    def layout(self):
+        return "dense" if self.feature_indptr is None else "sparse"
+
+    @property
+    def coef_by_feature(self):
+        """Dequantized dense weights, for inspection only"""
+        if self.feature_indptr is None:
+            return self.weights * self.scales
+        n_features = len(self.feature_indptr) - 1
+        dense = np.zeros((n_features, len(self.classes_)))
+        rows = np.repeat(np.arange(n_features), np.diff(self.feature_indptr))
+        dense[rows, self.class_index] = self.weights * self.scales[self.class_index]
+        return dense
+
+    def decision_function(self, features):
+        if self.feature_indptr is None:
+            n_rows = features.shape[0]
+            scores = np.tile(self.intercept, (n_rows, 1))
+            row_ids = np.repeat(np.arange(n_rows), np.diff(features.indptr))
+            np.add.at(scores, row_ids, features.data[:, None] * (self.weights[features.indices] * self.scales))
+            return scores
+        return self._sparse_decision_function(features)
+
+    def _sparse_decision_function(self, features):
+        n_rows = features.shape[0]
+        scores = np.tile(self.intercept, (n_rows, 1))
+
+        starts = self.feature_indptr[features.indices]
+        counts = self.feature_indptr[features.indices + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return scores
+
+        # Expand each (row, term) into the positions of that term's stored weights
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        entries = np.repeat(starts, counts) + offsets
+        classes = self.class_index[entries]
+        values = self.weights[entries] * self.scales[classes]
+
+        # One bincount over flattened (row, class) cells is much cheaper than np.add.at
+        row_ids = np.repeat(np.arange(n_rows), np.diff(features.indptr))
+        n_classes = scores.shape[1]
+        cells = np.repeat(row_ids, counts) * n_classes + classes
+        scores += np.bincount(
+            cells, weights=np.repeat(features.data, counts) * values, minlength=n_rows * n_classes
+        ).reshape(n_rows, n_classes)
+        return scores
+
+    def to_arrays(self):
+        arrays = {
+            'weights': self.weights,
+            'scales': self.scales.astype(np.float32),
+            'intercept': self.intercept,
+            'classes': self.classes_.astype(str),
+        }
+        if self.feature_indptr is not None:
+            arrays['feature_indptr'] = self.feature_indptr
+            arrays['class_index'] = self.class_index
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(
+            arrays['weights'], arrays['scales'], arrays['intercept'], arrays['classes'],
+            arrays.get('feature_indptr'), arrays.get('class_index'),
+        )
+
+def _pack_strings(strings):
+    """Newline-joined UTF-8 bytes; a fraction of the size of a fixed-width unicode array"""
+    return np.frombuffer("\n".join(strings).encode("utf-8"), dtype=np.uint8)
+
+def _unpack_strings(packed):
+    text = packed.tobytes().decode("utf-8")
+    return text.split("\n") if text else []
+
+class CompactIntentModel(CompiledIntentModel):
+    model_type = "tfidf_logreg_compact"
+    classifier_class = CompactLogisticRegression
+
+    def to_arrays(self):
+        arrays = super().to_arrays()
+        arrays['terms'] = _pack_strings(arrays['terms'].tolist())
+        arrays['stop_words'] = _pack_strings(arrays['stop_words'].tolist())
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return super().from_arrays(dict(
+            arrays,
+            terms=_unpack_strings(arrays['terms']),
+            stop_words=_unpack_strings(arrays['stop_words']),
+        ))
+
+def compact_model(model, weight_dtype="int8", prune_threshold=0.0, layout="auto"):
+    """Prune and quantize a CompiledIntentModel (or its compact form).
+
+    layout 'auto' keeps the surviving weights sparse only when that is smaller:
+    a sparse entry costs a class index on top of the weight, so a dense
+    quantized matrix wins until pruning removes about half of the weights.
+    """
+    if weight_dtype not in WEIGHT_DTYPES:
+        raise ValueError(f"Unknown weight dtype {weight_dtype!r}; use one of {sorted(WEIGHT_DTYPES)}")
+    if layout not in ("auto", "dense", "sparse"):
+        raise ValueError(f"Unknown layout {layout!r}; use 'auto', 'dense' or 'sparse'")
+    if not isinstance(model, CompiledIntentModel):
+        raise ValueError("Only TF-IDF + LogisticRegression models can be compacted")
+
+    vectorizer = model.named_steps['tfidf']
+    coef = np.asarray(model.named_steps['clf'].coef_by_feature, dtype=np.float64)
+    magnitude = np.abs(coef)
+
+    class_max = magnitude.max(axis=0) if coef.size else np.zeros(coef.shape[1])
+    keep = (magnitude > 0) & (magnitude >= prune_threshold * class_max)
+    kept_features = np.flatnonzero(keep.any(axis=1))
+
+    terms = sorted(vectorizer.vocabulary, key=vectorizer.vocabulary.get)
+    vocabulary = {terms[old]: new for new, old in enumerate(kept_features)}
+    compact_vectorizer = CompiledTfidfVectorizer(
+        vocabulary,
+        vectorizer.idf[kept_features],
+        vectorizer.stop_words,
+        vectorizer.token_pattern,
+        ngram_range=vectorizer.ngram_range,
+        lowercase=vectorizer.lowercase,
+        norm=vectorizer.norm,
+        sublinear_tf=vectorizer.sublinear_tf,
+    )
+
+    n_classes = coef.shape[1]
+    kept = np.where(keep, coef, 0.0)[kept_features]
+    if weight_dtype == "int8":
+        class_max = np.abs(kept).max(axis=0) if kept.size else np.zeros(n_classes)
+        scales = np.where(class_max > 0, class_max / 127, 1.0)
+        quantized = np.clip(np.rint(kept / scales), -127, 127).astype(np.int8)
+    else:
+        scales = np.ones(n_classes)
+        quantized = kept.astype(WEIGHT_DTYPES[weight_dtype])
+
+    index_dtype = np.uint8 if n_classes <= 256 else np.int32
+    weight_bytes = quantized.itemsize
+    sparse_bytes = keep.sum() * (weight_bytes + np.dtype(index_dtype).itemsize) + 4 * (len(kept_features) + 1)
+    if layout == "sparse" or (layout == "auto" and sparse_bytes < quantized.nbytes):
+        rows, class_index = np.nonzero(keep[kept_features])
+        feature_indptr = np.zeros(len(kept_features) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=len(kept_features)), out=feature_indptr[1:])
+        weights, sparse = quantized[rows, class_index], (feature_indptr, class_index.astype(index_dtype))
+    else:
+        weights, sparse = quantized, (None, None)
+
+    classifier = CompactLogisticRegression(
+        weights,
+        scales.astype(np.float32),   # stored at the precision they are saved with
+        model.named_steps['clf'].intercept,
+        model.classes_,
+        *sparse,
+    )
+    return CompactIntentModel(compact_vectorizer, classifier)
+
+def evaluate(model, texts, labels, baseline=None):
+    """Validation accuracy, and agreement with a baseline model's predictions"""
+    from tuning import latency_us, model_size_bytes
+
+    probabilities = model.predict_proba(list(texts))
+    predictions = model.classes_.astype(str)[probabilities.argmax(axis=1)]
+    result = {
+        "accuracy": round(float((predictions == np.asarray(labels, dtype=str)).mean()), 4),
+        "model_size_bytes": model_size_bytes(model),
+        "vocabulary_size": len(model.named_steps['tfidf'].vocabulary),
+        "layout": getattr(model.named_steps['clf'], "layout", "dense"),
+        "latency_us": round(latency_us(model, list(texts)), 2),
+    }
+    if baseline is not None:
+        expected = baseline.predict_proba(list(texts))
+        result["agreement"] = round(float((expected.argmax(axis=1) == probabilities.argmax(axis=1)).mean()), 4)
+        result["max_probability_diff"] = round(float(np.abs(expected - probabilities).max()), 4)
+    return result
+
+def compaction_report(model_config, training_data, candidates, cache_dir=None):
+    """Score every (weight_dtype, prune_threshold) candidate against the uncompacted model"""
+    from compiled_model import compile_pipeline
+    from model_build import build_pipeline, split_training_data
+    from tuning import expand_grid
+
+    pipeline, _, _ = build_pipeline(model_config, training_data, cache_dir)
+    baseline = compile_pipeline(pipeline)
+    _, texts, _, labels = split_training_data(training_data)
+
+    reference = evaluate(baseline, texts, labels)
+    results = []
+    for params in expand_grid(candidates):
+        result = evaluate(compact_model(baseline, **params), texts, labels, baseline)
+        result.update(params)
+        result["accuracy_delta"] = round(result["accuracy"] - reference["accuracy"], 4)
+        result["size_ratio"] = round(result["model_size_bytes"] / reference["model_size_bytes"], 4)
+        results.append(result)
+
+    results.sort(key=lambda r: (-r["accuracy"], r["model_size_bytes"]))
+    return {"baseline": reference, "validation_examples": len(texts), "results": results}
+
+def print_compaction_report(report):
+    baseline = report["baseline"]
+    print(f"Baseline: accuracy {baseline['accuracy']:.3f}, {baseline['model_size_bytes'] / 1024:.1f} KB, "
+          f"{baseline['vocabulary_size']} terms, {baseline['latency_us']:.1f} us/query "
+          f"({report['validation_examples']} validation examples)")
+    print(f"{'dtype':>8} {'prune':>6} {'layout':>6} {'accuracy':>9} {'delta':>7} {'agree':>6} "
+          f"{'size KB':>8} {'ratio':>6} {'terms':>6} {'latency us':>11}")
+    for r in report["results"]:
+        print(
+            f"{r['weight_dtype']:>8} {r['prune_threshold']:>6.2f} {r['layout']:>6} {r['accuracy']:>9.3f} "
+            f"{r['accuracy_delta']:>+7.3f} {r['agreement']:>6.2f} {r['model_size_bytes'] / 1024:>8.1f} "
+            f"{r['size_ratio']:>6.2f} {r['vocabulary_size']:>6} {r['latency_us']:>11.1f}"
+        )
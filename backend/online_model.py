@@ -0,0 +1,128 @@
+"""
+Online intent model: stateless hashing features + SGD logistic regression.
+
+HashingVectorizer needs no fitted vocabulary, so new examples can be folded
+in with SGDClassifier.partial_fit without revisiting old data. The
+checkpoint is a regular model artifact (model_type 'hashing_sgd') holding
+the SGD weights, its step counter and the vectorizer/SGD parameters.
+
+Selected with MODEL_CONFIG['model_type'] = 'hashing_sgd'. Unlike the
+TF-IDF model this one needs sklearn at load time, since updates continue
+from the restored estimator.
+"""
+
+import json
+import numpy as np
+
+MODEL_TYPE = "hashing_sgd"
+
+class OnlineIntentModel:
+    model_type = MODEL_TYPE
+
+    def __init__(self, hashing_params, sgd_params, classes):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+
+        hashing_params = dict(hashing_params)
+        if 'ngram_range' in hashing_params:
+            hashing_params['ngram_range'] = tuple(hashing_params['ngram_range'])
+
+        self.hashing_params = hashing_params
+        self.sgd_params = dict(sgd_params)
+        self.all_classes = np.asarray(sorted(str(label) for label in classes))
+        self.examples_seen = 0
+
+        self.named_steps = {
+            'hashing': HashingVectorizer(**hashing_params),
+            'clf': SGDClassifier(**self.sgd_params),
+        }
+        self.steps = list(self.named_steps.items())
+
+    @property
+    def classes_(self):
+        return getattr(self.named_steps['clf'], 'classes_', self.all_classes)
+
+    def partial_fit(self, texts, labels):
+        """One SGD pass over a mini-batch; earlier batches are never revisited"""
+        clf = self.named_steps['clf']
+        features = self.named_steps['hashing'].transform(texts)
+        labels = np.asarray([str(label) for label in labels])
+
+        unknown = set(labels) - set(self.all_classes)
+        if unknown:
+            raise ValueError(f"Unknown labels for online model: {sorted(unknown)}")
+
+        if hasattr(clf, 'classes_'):
+            clf.partial_fit(features, labels)
+        else:
+            clf.partial_fit(features, labels, classes=self.all_classes)
+        self.examples_seen += len(labels)
+
+    def predict(self, texts):
+        return self.named_steps['clf'].predict(self.named_steps['hashing'].transform(texts))
+
+    def predict_proba(self, texts):
+        return self.named_steps['clf'].predict_proba(self.named_steps['hashing'].transform(texts))
+
+    def to_arrays(self):
+        clf = self.named_steps['clf']
+        return {
+            'hashing_params': np.asarray(json.dumps(self.hashing_params)),
+            'sgd_params': np.asarray(json.dumps(self.sgd_params)),
+            'all_classes': self.all_classes,
+            'coef': clf.coef_,
+            'intercept': clf.intercept_,
+            'classes': clf.classes_.astype(str),
+            't': np.asarray(clf.t_),
+            'examples_seen': np.asarray(self.examples_seen, dtype=np.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        model = cls(
+            json.loads(str(arrays['hashing_params'])),
+            json.loads(str(arrays['sgd_params'])),
+            [str(label) for label in arrays['all_classes']],
+        )
+        # Copies, not memory maps: partial_fit updates the weights in place
+        clf = model.named_steps['clf']
+        clf.coef_ = np.array(arrays['coef'], dtype=np.float64)
+        clf.intercept_ = np.array(arrays['intercept'], dtype=np.float64)
+        clf.classes_ = np.array([str(label) for label in arrays['classes']])
+        clf.t_ = float(arrays['t'])
+        clf.n_features_in_ = clf.coef_.shape[1]
+        model.examples_seen = int(arrays['examples_seen'])
+        return model
+
+def iter_minibatches(examples, batch_size):
+    for start in range(0, len(examples), batch_size):
+        yield examples[start:start + batch_size]
+
+def build_online_model(model_config, training_data, classes):
+    """Fit a fresh online model on training_data and return (model, metrics)"""
+    from sklearn.metrics import accuracy_score
+    from model_build import RANDOM_STATE, split_training_data
+
+    online_config = model_config['online']
+    # The same split as the batch build, so both model types report comparable metrics
+    texts_train, texts_test, y_train, y_test = split_training_data(training_data)
+
+    model = OnlineIntentModel(model_config['hashing'], model_config['sgd'], classes)
+    examples = list(zip(texts_train, y_train))
+    rng = np.random.default_rng(RANDOM_STATE)
+
+    for _ in range(online_config['epochs']):
+        order = rng.permutation(len(examples))
+        shuffled = [examples[i] for i in order]
+        for batch in iter_minibatches(shuffled, online_config['batch_size']):
+            batch_texts, batch_labels = zip(*batch)
+            model.partial_fit(batch_texts, batch_labels)
+
+    metrics = {
+        "train_accuracy": round(float(accuracy_score(y_train, model.predict(texts_train))), 4),
+        "test_accuracy": round(float(accuracy_score(y_test, model.predict(texts_test))), 4),
+        "train_examples": len(texts_train),
+        "test_examples": len(texts_test),
+        "examples_seen": model.examples_seen,
+    }
+    return model, metrics
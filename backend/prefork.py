@@ -0,0 +1,312 @@
+"""
+Pre-fork multi-worker mode for the inference server.
+
+The parent process loads the model and imports every response handler
+once, moves every object it owns into the GC's permanent generation
+(gc.freeze) so collections in the workers never write to those pages,
+binds one listening socket and forks N workers that all accept on it. Model memory is shared copy-on-write, and
+the artifact arrays are mmap'd, so adding workers adds throughput rather
+than model copies.
+
+The parent never serves requests. It:
+
+- restarts workers that exit or stop sending heartbeats
+- watches the artifact manifest (or SIGHUP) and reloads gracefully: it
+  loads the new model, forks a new generation, waits for it to report
+  healthy, then asks the old generation to finish in-flight requests
+  and exit. A reload that arrives while an older generation is still
+  draining waits until its slots are free.
+- stops all workers gracefully on SIGTERM/SIGINT
+
+Workers write pid, generation, heartbeat and request counters into a
+shared-memory table, returned by every worker's /healthz as "workers".
+"""
+
+import asyncio
+import gc
+import mmap
+import os
+import signal
+import socket
+import time
+
+import numpy as np
+
+from model_artifact import MANIFEST_FILE
+from server import InferenceServer
+
+HEALTH_DTYPE = np.dtype([
+    ("pid", np.int64),
+    ("generation", np.int64),
+    ("model_version", np.int64),
+    ("started", np.float64),
+    ("heartbeat", np.float64),
+    ("requests", np.int64),
+    ("batches", np.int64),
+])
+
+def bind_socket(host, port, backlog=1024):
+    sock = socket.create_server((host, port), backlog=backlog)
+    sock.setblocking(False)
+    return sock
+
+class WorkerTable:
+    """Per-worker health slots in anonymous shared memory, inherited across fork"""
+
+    def __init__(self, slots):
+        self._mmap = mmap.mmap(-1, HEALTH_DTYPE.itemsize * slots)
+        self.rows = np.ndarray((slots,), dtype=HEALTH_DTYPE, buffer=self._mmap)
+        self.rows[:] = 0
+
+    def free_slots(self):
+        return int(np.count_nonzero(self.rows["pid"] == 0))
+
+    def free_slot(self):
+        free = np.flatnonzero(self.rows["pid"] == 0)
+        if not free.size:
+            raise RuntimeError("No free worker slot")
+        return int(free[0])
+
+    def snapshot(self, heartbeat_timeout):
+        now = time.time()
+        return [
+            {
+                "pid": int(row["pid"]),
+                "generation": int(row["generation"]),
+                "model_version": int(row["model_version"]),
+                "uptime_seconds": round(now - float(row["started"]), 1),
+                "healthy": bool(now - float(row["heartbeat"]) <= heartbeat_timeout),
+                "requests": int(row["requests"]),
+                "batches": int(row["batches"]),
+            }
+            for row in self.rows if row["pid"]
+        ]
+
+def _artifact_key(model_path):
+    """Changes whenever the artifact directory is replaced"""
+    try:
+        stat = os.stat(os.path.join(model_path, MANIFEST_FILE))
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+class PreforkServer:
+    def __init__(self, agent, server_config, model_path, reload_model):
+        # reload_model() reloads agent.classifier in place; raises if the artifact is unusable
+        self.agent = agent
+        self.config = server_config
+        self.model_path = model_path
+        self.reload_model = reload_model
+        self.workers = server_config['workers']
+        self.heartbeat = server_config['heartbeat_seconds']
+        self.heartbeat_timeout = 3 * self.heartbeat + server_config['worker_startup_seconds']
+
+        self.table = WorkerTable(2 * self.workers)
+        self.generation = 0
+        self.children = {}   # pid -> (slot, generation)
+        self.sock = None
+        self._stopping = False
+        self._reload_requested = False
+        self._reload_deferred = False
+
+    # Worker side
+
+    def _run_worker(self, slot):
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        row = self.table.rows[slot:slot + 1]
+        row["pid"] = os.getpid()
+        row["generation"] = self.generation
+        row["model_version"] = self.agent.classifier.model_version
+
+        async def main():
+            stop = asyncio.Event()
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+            server = InferenceServer(self.agent, self.config)
+            server.worker_health = lambda: self.table.snapshot(self.heartbeat_timeout)
+
+            async def heartbeat():
+                while True:
+                    row["heartbeat"] = time.time()
+                    row["requests"] = server.batcher.requests
+                    row["batches"] = server.batcher.batches
+                    await asyncio.sleep(self.heartbeat)
+
+            beat = asyncio.get_running_loop().create_task(heartbeat())
+            try:
+                await server.serve(sock=self.sock, stop=stop)
+            finally:
+                beat.cancel()
+
+        code = 0
+        try:
+            asyncio.run(main())
+        except BaseException as e:
+            print(f"Worker {os.getpid()} failed: {e}")
+            code = 1
+        finally:
+            # os._exit skips atexit handlers, including the earnings store's flush
+            try:
+                from earnings_store import flush_earnings_store
+                flush_earnings_store()
+            except Exception as e:
+                print(f"Worker {os.getpid()} could not save earnings: {e}")
+            os._exit(code)
+
+    # Parent side
+
+    def _spawn(self):
+        slot = self.table.free_slot()
+        self.table.rows[slot]["pid"] = -1   # reserved until the child writes its pid
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker(slot)
+        self.table.rows[slot]["pid"] = pid
+        self.table.rows[slot]["started"] = self.table.rows[slot]["heartbeat"] = time.time()
+        self.children[pid] = (slot, self.generation)
+        return pid
+
+    def _freeze(self):
+        # Every worker serves every intent: import all handlers here, once,
+        # instead of in each worker after fork
+        self.agent.handlers.preload()
+        # Objects created before fork are never scanned again, so GC in the
+        # workers does not touch (and copy) the pages holding the model and handlers
+        gc.collect()
+        gc.freeze()
+
+    def _reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot, generation = self.children.pop(pid, (None, None))
+            if slot is None:
+                continue
+            self.table.rows[slot] = 0
+            if not self._stopping and generation == self.generation:
+                print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+                self._spawn()
+
+    def _kill_unresponsive(self):
+        now = time.time()
+        for pid, (slot, _) in list(self.children.items()):
+            if now - float(self.table.rows[slot]["heartbeat"]) > self.heartbeat_timeout:
+                print(f"Worker {pid} missed its heartbeat; killing it")
+                os.kill(pid, signal.SIGKILL)
+
+    def _generation_healthy(self, generation):
+        pids = [pid for pid, (_, g) in self.children.items() if g == generation]
+        if len(pids) < self.workers:
+            return False
+        rows = [self.table.rows[self.children[pid][0]] for pid in pids]
+        return all(row["generation"] == generation and row["heartbeat"] > row["started"] for row in rows)
+
+    def _stop_generation(self, generation, sig=signal.SIGTERM):
+        for pid, (_, g) in list(self.children.items()):
+            if g == generation:
+                os.kill(pid, sig)
+
+    def reload(self):
+        """Load the replaced artifact and swap worker generations without dropping requests"""
+        if self.table.free_slots() < self.workers:
+            # The table holds two generations; the one before is still draining
+            if not self._reload_deferred:
+                print("Reload deferred until the previous generation has drained")
+            self._reload_deferred = True
+            self._reload_requested = True
+            return False
+        self._reload_deferred = False
+
+        gc.unfreeze()
+        try:
+            self.reload_model()
+        except Exception as e:
+            print(f"Reload failed, keeping generation {self.generation}: {e}")
+            self._freeze()
+            return False
+        self._freeze()
+
+        old = self.generation
+        self.generation += 1
+        for _ in range(self.workers):
+            self._spawn()
+
+        deadline = time.monotonic() + self.heartbeat_timeout
+        while not self._generation_healthy(self.generation):
+            if time.monotonic() > deadline:
+                print(f"Generation {self.generation} did not become healthy; keeping generation {old}")
+                self._stop_generation(self.generation, signal.SIGKILL)
+                self.generation = old
+                return False
+            self._reap()
+            time.sleep(0.05)
+
+        self._stop_generation(old)
+        print(f"Reloaded model; generation {self.generation} serving with {self.workers} workers")
+        return True
+
+    def run(self, host=None, port=None):
+        host = host or self.config['host']
+        port = port or self.config['port']
+        self.sock = bind_socket(host, port)
+
+        def stop(signum, frame):
+            self._stopping = True
+
+        def request_reload(signum, frame):
+            self._reload_requested = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, request_reload)
+
+        self._freeze()
+        for _ in range(self.workers):
+            self._spawn()
+        print(f"Serving on http://{host}:{port} with {self.workers} workers (parent pid {os.getpid()})")
+
+        artifact_key = _artifact_key(self.model_path)
+        next_check = time.monotonic() + self.config['reload_poll_seconds']
+
+        while not self._stopping:
+            self._reap()
+            self._kill_unresponsive()
+
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + self.config['reload_poll_seconds']
+                key = _artifact_key(self.model_path)
+                if key is not None and key != artifact_key:
+                    artifact_key = key
+                    self._reload_requested = True
+
+            if self._reload_requested:
+                self._reload_requested = False
+                self.reload()
+
+            time.sleep(0.1)
+
+        self.shutdown()
+
+    def shutdown(self):
+        for pid in list(self.children):
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.config['shutdown_grace_seconds'] + 1
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            os.kill(pid, signal.SIGKILL)
+        self._reap()
+        self.sock.close()
+        print("Server stopped")
+
+def serve_prefork(agent, server_config, model_path, reload_model, host=None, port=None):
+    """Run the pre-fork server until SIGTERM/SIGINT"""
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Pre-fork serving needs os.fork; use workers = 1 on this platform")
+    PreforkServer(agent, server_config, model_path, reload_model).run(host, port)
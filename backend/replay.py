@@ -0,0 +1,290 @@
+"""
+Offline replay of a query log through two intent models.
+
+Before promoting a retrained artifact, replay_log streams logged queries
+(JSONL with a "text" field, or plain text lines) through the baseline and
+the candidate and reports:
+
+- label agreement and a confusion-style diff (baseline label -> candidate
+  label) with a few example queries per changed cell
+- confidence shift (candidate - baseline top confidence)
+- default-fallback rate of each model
+- per-query latency histograms of the single-query serving path, timed on
+  a deterministic sample of the log, plus batched throughput (distinct
+  texts labelled per second, since each chunk labels a repeated query once)
+
+The parent only reads raw lines and hands fixed-size chunks to a process
+pool, keeping at most two chunks per worker in flight. Each worker loads
+both models once (artifact directories are mmap'd, legacy .pkl files are
+unpickled), labels the distinct queries of its chunk with one batched
+call per model and returns fixed-size count arrays that the parent adds
+up, so memory stays flat whatever the log length.
+"""
+
+import contextlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+
+import numpy as np
+
+# Single-query latency buckets: 1 us to 100 ms, about 26% apart
+LATENCY_EDGES = np.geomspace(1e-6, 1e-1, 51)
+SHIFT_EDGES = np.linspace(-1.0, 1.0, 41)
+EXAMPLES_PER_CELL = 3
+
+_models = None
+
+def _load_classifier(path, categories):
+    from config import MODEL_CONFIG
+    from utils import IntentClassifier
+
+    classifier = IntentClassifier(MODEL_CONFIG, categories)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if os.path.isdir(path):
+            classifier.load_model(path)
+        else:
+            classifier.load_pickle(path)
+    return classifier
+
+def _init_worker(baseline_path, candidate_path, categories, confidence_threshold):
+    global _models
+    _models = (
+        _load_classifier(baseline_path, categories),
+        _load_classifier(candidate_path, categories),
+        confidence_threshold,
+    )
+
+def _label_index(categories):
+    names = list(dict.fromkeys(categories.values()))
+    return names, {name: i for i, name in enumerate(names)}
+
+def _empty_counts(n_labels):
+    return {
+        "queries": 0,
+        "labelled": 0,    # distinct texts sent to predict_batch
+        "confusion": np.zeros((n_labels, n_labels), dtype=np.int64),
+        "confidence_sum": np.zeros(2),
+        "shift_sum": 0.0,
+        "shift_abs_sum": 0.0,
+        "shift_hist": np.zeros(len(SHIFT_EDGES) + 1, dtype=np.int64),
+        "latency_hist": np.zeros((2, len(LATENCY_EDGES) + 1), dtype=np.int64),
+        "latency_sum": np.zeros(2),
+        "latency_samples": 0,
+        "batch_seconds": np.zeros(2),
+        "examples": {},   # (baseline label, candidate label) -> a few queries
+    }
+
+def replay_chunk(task):
+    """Counts for one chunk of raw log lines, labelled by both models"""
+    from utils import read_batch_records
+
+    lines, first_index, sample_every = task
+    baseline, candidate, threshold = _models
+    names, index = _label_index(baseline.categories)
+    texts = [record['text'] for record in read_batch_records(lines)]
+
+    result = _empty_counts(len(names))
+    result["queries"] = len(texts)
+    if not texts:
+        return result
+
+    # Logs repeat popular queries; label each distinct text once and expand
+    positions = {}
+    inverse = np.fromiter((positions.setdefault(text, len(positions)) for text in texts),
+                          dtype=np.int64, count=len(texts))
+    unique = list(positions)
+    result["labelled"] = len(unique)
+
+    labels, confidences = [], []
+    for m, model in enumerate((baseline, candidate)):
+        start = time.perf_counter()
+        predictions = model.predict_batch(unique, threshold)
+        result["batch_seconds"][m] = time.perf_counter() - start
+        labels.append(np.fromiter((index[name] for _, name, _ in predictions), dtype=np.int64, count=len(unique))[inverse])
+        confidences.append(np.fromiter((c for _, _, c in predictions), dtype=np.float64, count=len(unique))[inverse])
+    old_labels, new_labels = labels
+    old_conf, new_conf = confidences
+
+    np.add.at(result["confusion"], (old_labels, new_labels), 1)
+    result["confidence_sum"][:] = old_conf.sum(), new_conf.sum()
+    shift = new_conf - old_conf
+    result["shift_sum"] = float(shift.sum())
+    result["shift_abs_sum"] = float(np.abs(shift).sum())
+    result["shift_hist"] += np.bincount(np.searchsorted(SHIFT_EDGES, shift), minlength=len(SHIFT_EDGES) + 1)
+
+    for i in np.flatnonzero(old_labels != new_labels):
+        cell = (names[old_labels[i]], names[new_labels[i]])
+        examples = result["examples"].setdefault(cell, [])
+        if len(examples) < EXAMPLES_PER_CELL:
+            examples.append(texts[i])
+
+    # Time the single-query path on every sample_every-th query of the log,
+    # alternating which model goes first so neither gets the warmer caches
+    offset = -first_index % sample_every
+    for i in range(offset, len(texts), sample_every):
+        order = (0, 1) if (first_index + i) // sample_every % 2 == 0 else (1, 0)
+        for m in order:
+            model = (baseline, candidate)[m]
+            start = time.perf_counter()
+            model.classify(texts[i], threshold)
+            elapsed = time.perf_counter() - start
+            result["latency_hist"][m, np.searchsorted(LATENCY_EDGES, elapsed)] += 1
+            result["latency_sum"][m] += elapsed
+        result["latency_samples"] += 1
+
+    return result
+
+def _merge(total, part):
+    for key, value in part.items():
+        if key == "examples":
+            for cell, examples in value.items():
+                kept = total["examples"].setdefault(cell, [])
+                kept.extend(examples[:EXAMPLES_PER_CELL - len(kept)])
+        else:
+            total[key] = total[key] + value
+
+def _percentile(hist, q):
+    """Approximate percentile from a LATENCY_EDGES histogram, interpolating within the bucket"""
+    total = hist.sum()
+    if not total:
+        return 0.0
+    cumulative = np.cumsum(hist)
+    bucket = int(np.searchsorted(cumulative, q * total))
+    lower = LATENCY_EDGES[bucket - 1] if bucket > 0 else 0.0
+    upper = LATENCY_EDGES[bucket] if bucket < len(LATENCY_EDGES) else LATENCY_EDGES[-1]
+    previous = cumulative[bucket - 1] if bucket > 0 else 0
+    fraction = (q * total - previous) / hist[bucket] if hist[bucket] else 1.0
+    return float(lower + (upper - lower) * fraction)
+
+def summarize(total, names, elapsed, jobs):
+    """Compact JSON-ready summary of merged replay counts"""
+    n = int(total["queries"])
+    labelled = int(total["labelled"])
+    confusion = total["confusion"]
+    default = names.index("others") if "others" in names else None
+    samples = int(total["latency_samples"])
+
+    models = {}
+    for m, role in enumerate(("baseline", "candidate")):
+        counts = confusion.sum(axis=1 - m)
+        hist = total["latency_hist"][m]
+        models[role] = {
+            "default_rate": round(float(counts[default]) / n, 4) if n and default is not None else 0.0,
+            "mean_confidence": round(float(total["confidence_sum"][m]) / n, 4) if n else 0.0,
+            "label_counts": {name: int(count) for name, count in zip(names, counts) if count},
+            "latency_us": {
+                "mean": round(float(total["latency_sum"][m]) / samples * 1e6, 2) if samples else 0.0,
+                "p50": round(_percentile(hist, 0.50) * 1e6, 2),
+                "p90": round(_percentile(hist, 0.90) * 1e6, 2),
+                "p99": round(_percentile(hist, 0.99) * 1e6, 2),
+                # [upper bound in us (None = above the last edge), count]
+                "histogram": [
+                    [round(float(edge) * 1e6, 2) if edge is not None else None, int(count)]
+                    for edge, count in zip(list(LATENCY_EDGES) + [None], hist) if count
+                ],
+            },
+            "batched_queries_per_second": round(labelled / float(total["batch_seconds"][m]), 1) if total["batch_seconds"][m] else 0.0,
+        }
+
+    changes = [
+        {
+            "baseline": names[i],
+            "candidate": names[j],
+            "count": int(confusion[i, j]),
+            "share_of_baseline_label": round(float(confusion[i, j]) / confusion[i].sum(), 4),
+            "examples": total["examples"].get((names[i], names[j]), []),
+        }
+        for i, j in zip(*np.nonzero(confusion))
+        if i != j
+    ]
+    changes.sort(key=lambda change: -change["count"])
+
+    agreement = int(np.trace(confusion))
+    return {
+        "queries": n,
+        "labelled": labelled,
+        "elapsed_seconds": round(elapsed, 2),
+        "queries_per_second": round(n / elapsed, 1) if elapsed else 0.0,
+        "jobs": jobs,
+        "latency_samples": samples,
+        "agreement": round(agreement / n, 4) if n else 0.0,
+        "changed": n - agreement,
+        "confidence_shift": {
+            "mean": round(total["shift_sum"] / n, 4) if n else 0.0,
+            "mean_abs": round(total["shift_abs_sum"] / n, 4) if n else 0.0,
+            # [upper bound of the shift bucket, count]
+            "histogram": [
+                [round(float(edge), 2), int(count)] for edge, count in zip(SHIFT_EDGES, total["shift_hist"]) if count
+            ],
+        },
+        "models": models,
+        "per_label_agreement": {
+            name: round(float(confusion[i, i]) / confusion[i].sum(), 4)
+            for i, name in enumerate(names) if confusion[i].sum()
+        },
+        "label_changes": changes,
+    }
+
+def replay_log(stream, baseline_path, candidate_path, categories, confidence_threshold,
+               chunk_size=20000, jobs=None, latency_sample=0.01):
+    """Replay every line of stream through both models and return the summary"""
+    if not 0 < latency_sample <= 1:
+        raise ValueError("latency_sample must be in (0, 1]")
+    jobs = jobs or os.cpu_count() or 1
+    sample_every = max(1, round(1 / latency_sample))
+    names, _ = _label_index(categories)
+    total = _empty_counts(len(names))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(baseline_path, candidate_path, categories, confidence_threshold),
+    ) as pool:
+        pending = set()
+        first_index = 0
+        while True:
+            lines = list(islice(stream, chunk_size))
+            if lines:
+                pending.add(pool.submit(replay_chunk, (lines, first_index, sample_every)))
+                first_index += len(lines)
+            # Bound the lines held in memory to two chunks per worker
+            if pending and (len(pending) >= 2 * jobs or not lines):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _merge(total, future.result())
+            if not lines and not pending:
+                break
+
+    summary = summarize(total, names, time.perf_counter() - start, jobs)
+    summary["baseline"] = baseline_path
+    summary["candidate"] = candidate_path
+    return summary
+
+def write_summary(summary, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+def print_summary(summary, limit=10):
+    print(f"Replayed {summary['queries']} queries ({summary['labelled']} labelled) in {summary['elapsed_seconds']}s "
+          f"({summary['queries_per_second']:.0f}/s, {summary['jobs']} jobs)")
+    print(f"Agreement: {summary['agreement']:.2%} ({summary['changed']} changed); "
+          f"confidence shift mean {summary['confidence_shift']['mean']:+.4f}, "
+          f"mean abs {summary['confidence_shift']['mean_abs']:.4f}")
+    print(f"{'model':>10} {'default':>8} {'mean conf':>10} {'p50 us':>8} {'p90 us':>8} {'p99 us':>8} {'batch q/s':>10}")
+    for role, m in summary["models"].items():
+        latency = m["latency_us"]
+        print(f"{role:>10} {m['default_rate']:>8.2%} {m['mean_confidence']:>10.4f} {latency['p50']:>8.1f} "
+              f"{latency['p90']:>8.1f} {latency['p99']:>8.1f} {m['batched_queries_per_second']:>10.0f}")
+    if summary["label_changes"]:
+        print("Largest label changes (baseline -> candidate):")
+        for change in summary["label_changes"][:limit]:
+            print(f"  {change['baseline']:>18} -> {change['candidate']:<18} {change['count']:>8} "
+                  f"({change['share_of_baseline_label']:.2%} of {change['baseline']})")
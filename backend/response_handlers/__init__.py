@@ -1,21 +1,29 @@
-from .earning_handler import handle_earning
-from .business_handler import handle_business
-from .safety_handler import handle_safety
-from .quarterly_earning_handler import handle_quarterly_earning
-from .daily_earning_handler import handle_daily_earning
-from .improve_earning_handler import handle_improve_earning
-from .growth_handler import handle_growth
-from .weather_handler import handle_weather
-from .default_handler import handle_default
+"""
+Response handlers, one module per category.
 
-__all__ = [
-    "handle_earning",
-    "handle_business",
-    "handle_safety",
-    "handle_quarterly_earning",
-    "handle_daily_earning",
-    "handle_improve_earning",
-    "handle_growth",
-    "handle_weather",
-    "handle_default"
-]
+Submodules are imported on first access (PEP 562), so importing the
+package, or resolving a single handler through handler_registry, does not
+load every handler and its dependencies.
+"""
+
+import importlib
+
+_HANDLER_MODULES = {
+    "handle_earning": "earning_handler",
+    "handle_business": "business_handler",
+    "handle_safety": "safety_handler",
+    "handle_quarterly_earning": "quarterly_earning_handler",
+    "handle_daily_earning": "daily_earning_handler",
+    "handle_improve_earning": "improve_earning_handler",
+    "handle_growth": "growth_handler",
+    "handle_weather": "weather_handler",
+    "handle_default": "default_handler",
+}
+
+__all__ = list(_HANDLER_MODULES)
+
+def __getattr__(name):
+    module = _HANDLER_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{module}", __name__), name)
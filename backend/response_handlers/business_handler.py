@@ -1,3 +1,5 @@
+from data_access import DataAccessError, get_data_access
+
 def fetch_business_metrics(user_id):
     """
     Simulated API call to get business performance metrics for a delivery person.
@@ -14,28 +16,36 @@ def fetch_business_metrics(user_id):
         "efficiency_score": 89.3
     }
 
-def handle_business(request: str) -> str:
+async def handle_business(request: str, session):
     """
-    Provide a business performance summary in conversational style.
+    Provide a business performance summary in conversational style, one
+    paragraph at a time so a streaming client can show the first one early.
     """
-    user_id = "123"  # Static for now — in a real app, extract from user/session
-    data = fetch_business_metrics(user_id)
+    try:
+        data = await session.fetch_async("business_metrics", lambda: get_data_access().fetch_async(
+            "business_metrics", session.driver_id, local=fetch_business_metrics
+        ))
+    except DataAccessError:
+        yield "Sorry, I couldn't fetch your business metrics right now. Please try again in a moment."
+        return
 
     repeat_rate = (data["repeat_customers"] / data["total_customers"]) * 100
 
-    response = (
+    yield (
         f"You’ve completed **{data['total_deliveries']} deliveries** so far, "
         f"with an impressive average customer rating of **{data['average_rating']} out of 5**. "
         f"Your **average delivery time** is around **{data['average_delivery_time_minutes']} minutes**, "
         f"which shows good speed.\n\n"
-        
+    )
+
+    yield (
         f"You’ve generated a total revenue of **₹{data['revenue_generated']}**, "
         f"and collected **₹{data['cod_collected']}** in COD payments. "
         f"About **{repeat_rate:.1f}%** of your customers have booked with you more than once — a strong indicator of trust.\n\n"
-        
+    )
+
+    yield (
         f"There were **{data['delayed_deliveries']} delayed_deliveries**, which is something to keep an eye on. "
         f"Your overall efficiency score is **{data['efficiency_score']} out of 100**, "
         f"reflecting solid performance and reliability.\n\n"
     )
-
-    return response
@@ -1,2 +1,64 @@
-def handle_daily_earning(request):
-    return "I can provide daily earnings reports. For which date?"
+import calendar
+import re
+import time
+
+from data_access import DataAccessError
+from earnings_store import DAY_SECONDS, day_start, get_earnings_store
+
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_LAST_N_DAYS = re.compile(r"\b(?:last|past)\s+(\d{1,3})\s+days?\b")
+
+def parse_period(request, now):
+    """Map a request to ([start, end), label); defaults to today. Raises ValueError for an impossible date"""
+    text = request.lower()
+    today = day_start(now)
+
+    match = _ISO_DATE.search(text)
+    if match:
+        start = calendar.timegm(time.strptime(match.group(0), "%Y-%m-%d"))
+        return start, start + DAY_SECONDS, f"on {match.group(0)}"
+
+    match = _LAST_N_DAYS.search(text)
+    if match:
+        days = max(1, int(match.group(1)))
+        return now - days * DAY_SECONDS, now + 1, f"in the last {days} days"
+
+    if "yesterday" in text:
+        return today - DAY_SECONDS, today, "yesterday"
+
+    # Weeks start on Monday; epoch day 0 was a Thursday
+    week_start = today - ((today // DAY_SECONDS + 3) % 7) * DAY_SECONDS
+    if "last week" in text or "previous week" in text:
+        return week_start - 7 * DAY_SECONDS, week_start, "last week"
+    if "week" in text:
+        return week_start, now + 1, "this week"
+
+    return today, now + 1, "today"
+
+def handle_daily_earning(request, session):
+    """
+    Respond with earnings for a day, week or recent range.
+    Understands "today", "yesterday", YYYY-MM-DD, "last N days" and "this/last week".
+    """
+    now = int(time.time())
+    try:
+        start, end, label = parse_period(request, now)
+    except ValueError:
+        return "Sorry, I couldn't read that date. Please give a valid date (YYYY-MM-DD)."
+
+    try:
+        summary = get_earnings_store().series(session.driver_id).totals(start, end)
+    except DataAccessError:
+        return "Sorry, I couldn't fetch your earnings right now. Please try again in a moment."
+
+    if not summary["trips"]:
+        return f"You have no completed trips {label}."
+
+    return (
+        f"Your earnings {label} ({summary['trips']} trips, {summary['km_travelled']:.0f} km):\n"
+        f"1. Total Earning: ₹{summary['total_earning']:.0f}\n"
+        f"2. Commission and Penalties: ₹{summary['commission'] + summary['penalty']:.0f}\n"
+        f"3. Travel Cost: ₹{summary['travel_cost']:.0f}\n"
+        f"4. Bonus Points: ₹{summary['bonus']:.0f}\n"
+        f"5. 👉 Net Earning: ₹{summary['net_earning']:.0f}"
+    )
@@ -1,2 +1,9 @@
-def handle_default(request):
-    return "I cannot help with this, do you have any other query? : processing it via gen ai response"
+from genai_fallback import get_fallback
+
+async def handle_default(request, session):
+    """
+    Out-of-scope requests go to the generative fallback, which answers within
+    its deadline or returns the canned reply. Async, so waiting for it does
+    not hold a handler-pool thread.
+    """
+    yield await get_fallback().respond_async(request)
@@ -1,57 +1,42 @@
-# Cost per km by vehicle type
-vehicle_cost_map = {
-    1: 10,
-    2: 20,
-    3: 30,
-    4: 40,
-    5: 50
-}
+import re
+import time
 
-# This function should replace with your actual API
-def fetch_user_earning_data(user_id):
-    """Mock API call to get user earnings."""
-    # Replace this with actual API request like:
-    # response = requests.get(f"https://api.example.com/earnings/{user_id}")
-    # return response.json()
+import numpy as np
 
-    # Mocked response
-    return {
-        "total_earning": 15000,
-        "commission": 2000,
-        "penalty": 500,
-        "km_travelled": 100,
-        "vehicle_type": 3,
-        "bonus": 1200
-    }
+from data_access import DataAccessError
+from earnings_engine import compute_earnings, period_keys, period_start
+from .trip_ledger import load_trip_ledger, format_earnings_summary, format_period_breakdown
 
-def handle_earning(request: str) -> str:
-    """
-    Respond with user's earning details.
-    You can parse user_id from request or context in real implementation.
-    """
-    user_id = "123"  # Ideally this would be extracted from the request context
-    data = fetch_user_earning_data(user_id)
-
-    total_earning = data.get("total_earning", 0)
-    commission = data.get("commission", 0)
-    penalty = data.get("penalty", 0)
-    km_travelled = data.get("km_travelled", 0)
-    vehicle_type = data.get("vehicle_type", 1)
-    bonus = data.get("bonus", 0)
-
-    travel_cost_per_km = vehicle_cost_map.get(vehicle_type, 100)
-    travel_cost = km_travelled * travel_cost_per_km
+# Breakdown asked for -> (bucket, how many buckets back including the current one)
+_BREAKDOWNS = (
+    (re.compile(r"\b(?:week|weeks|weekly)\b"), ("week", 4)),
+    (re.compile(r"\b(?:month|months|monthly)\b"), ("month", 3)),
+)
 
-    net_earning = (total_earning + bonus) - (commission + penalty + travel_cost)
+def _breakdown(request):
+    text = request.lower()
+    for pattern, breakdown in _BREAKDOWNS:
+        if pattern.search(text):
+            return breakdown
+    return None
 
-    response = (
-        f"Here is your earnings summary:\n"
-        f"1. Total Earning: ₹{total_earning}\n"
-        f"2. Commission to Porter: ₹{commission}\n"
-        f"3. Penalty Applied: ₹{penalty}\n"
-        f"4. Travel Cost (₹{travel_cost_per_km}/km × {km_travelled} km): ₹{travel_cost}\n"
-        f"5. Bonus Points: ₹{bonus}\n"
-        f"6. 👉 Net Earning: ₹{net_earning}"
-    )
-
-    return response
+def handle_earning(request: str, session) -> str:
+    """
+    Respond with the driver's earning details; a request for weekly or
+    monthly earnings gets the net earnings of each of the last few weeks
+    or months instead.
+    """
+    try:
+        ledger = session.fetch("trip_ledger", lambda: load_trip_ledger(session.driver_id))
+    except DataAccessError:
+        return "Sorry, I couldn't fetch your earnings right now. Please try again in a moment."
+
+    breakdown = _breakdown(request)
+    if breakdown is None:
+        return format_earnings_summary(compute_earnings(ledger))
+
+    period, count = breakdown
+    now = int(time.time())
+    current = int(period_keys(np.asarray([now], dtype=np.int64), period)[0])
+    start = period_start(current - count + 1, period)
+    return format_period_breakdown(ledger, period, start, now + 1, f"Your earnings for the last {count} {period}s")
@@ -1,2 +1,28 @@
-def handle_growth(request):
-    return "I can analyze growth trends. Historical or projected data?"
+import math
+
+from data_access import DataAccessError
+from growth_analytics import get_growth_tracker
+
+def _change(value):
+    if math.isnan(value):
+        return "no change data yet"
+    direction = "up" if value >= 0 else "down"
+    return f"{direction} {abs(value) * 100:.1f}%"
+
+def handle_growth(request, session):
+    """
+    Respond with the driver's net-earning growth trends and a short projection.
+    """
+    try:
+        m = get_growth_tracker().driver_metrics(session.driver_id)
+    except DataAccessError:
+        return "Sorry, I couldn't fetch your earnings history right now. Please try again in a moment."
+
+    return (
+        f"Here are your growth trends (net earnings, complete days):\n"
+        f"1. Last 7 days: ₹{m['week']:.0f} — {_change(m['week_over_week'])} week over week (₹{m['previous_week']:.0f})\n"
+        f"2. Last 30 days: ₹{m['month']:.0f} — {_change(m['month_over_month'])} month over month (₹{m['previous_month']:.0f})\n"
+        f"3. Moving average: ₹{m['moving_average_7d']:.0f}/day (7-day), ₹{m['moving_average_30d']:.0f}/day (30-day)\n"
+        f"4. Trend: {'+' if m['trend_per_day'] >= 0 else '-'}₹{abs(m['trend_per_day']):.1f}/day each day\n"
+        f"5. 👉 Projected next 7 days: ₹{m['projected_next_7d']:.0f}, next 30 days: ₹{m['projected_next_30d']:.0f}"
+    )
@@ -1,2 +1,62 @@
-def handle_improve_earning(request):
-    return "Let me help you improve earnings. Are you focusing on costs or revenue?"
+import time
+
+from data_access import DataAccessError
+from earnings_engine import compute_earnings
+from .trip_ledger import load_trip_ledger
+
+_COST_WORDS = ("cost", "costs", "expense", "expenses", "fuel", "commission", "penalty", "penalties", "spend", "spending", "save", "saving")
+_REVENUE_WORDS = ("revenue", "income", "fare", "fares", "trips", "bonus", "bonuses", "more", "earn", "sales")
+
+def _focus(request):
+    words = request.lower().replace("?", " ").replace(",", " ").split()
+    costs = any(word in words for word in _COST_WORDS)
+    revenue = any(word in words for word in _REVENUE_WORDS)
+    if costs == revenue:
+        return None
+    return "costs" if costs else "revenue"
+
+def _names_focus(request):
+    return _focus(request) is not None
+
+def _cost_advice(summary):
+    deductions = summary['commission'] + summary['penalty'] + summary['travel_cost']
+    share = deductions / summary['total_earning'] * 100 if summary['total_earning'] else 0.0
+    per_km = summary['travel_cost'] / summary['km_travelled'] if summary['km_travelled'] else 0.0
+    tips = [
+        f"In the last 30 days commission, penalties and travel cost took ₹{deductions:.0f} "
+        f"({share:.0f}%) of your ₹{summary['total_earning']:.0f} in fares.",
+        f"1. Travel cost is ₹{summary['travel_cost']:.0f} over {summary['km_travelled']:.0f} km (₹{per_km:.1f}/km): "
+        f"prefer trips that end near your next pickup area to cut empty kilometres.",
+    ]
+    if summary['penalty']:
+        tips.append(f"2. Penalties cost you ₹{summary['penalty']:.0f}: avoid late cancellations and delayed drops.")
+    return "\n".join(tips)
+
+def _revenue_advice(summary):
+    per_trip = summary['total_earning'] / summary['trips'] if summary['trips'] else 0.0
+    return (
+        f"In the last 30 days you earned ₹{summary['total_earning']:.0f} from {summary['trips']} trips "
+        f"(₹{per_trip:.0f} per trip) plus ₹{summary['bonus']:.0f} in bonuses.\n"
+        f"1. Log in during peak hours, when fares and trip counts are highest.\n"
+        f"2. Track your bonus targets; bonuses are paid on top of the fare."
+    )
+
+def handle_improve_earning(request, session):
+    """
+    Advice on costs or revenue from the driver's last 30 days. Asks which one
+    first when the request does not say; a reply naming one comes back here
+    directly, anything else is classified as a new question.
+    """
+    focus = _focus(request)
+    if focus is None:
+        session.ask("focus", _names_focus)
+        return "Let me help you improve earnings. Are you focusing on costs or revenue?"
+
+    now = int(time.time())
+    try:
+        ledger = session.fetch("trip_ledger", lambda: load_trip_ledger(session.driver_id))
+    except DataAccessError:
+        return "Sorry, I couldn't fetch your earnings right now. Please try again in a moment."
+
+    summary = compute_earnings(ledger, now - 30 * 86400, now + 1)
+    return _cost_advice(summary) if focus == "costs" else _revenue_advice(summary)
@@ -1,57 +1,27 @@
-# Cost per km by vehicle type
-vehicle_cost_map = {
-    1: 10,
-    2: 20,
-    3: 30,
-    4: 40,
-    5: 50
-}
+import time
 
-# This function should replace with your actual API
-def fetch_user_earning_data(user_id):
-    """Mock API call to get user earnings."""
-    # Replace this with actual API request like:
-    # response = requests.get(f"https://api.example.com/earnings/{user_id}")
-    # return response.json()
+from data_access import DataAccessError
+from earnings_engine import compute_earnings, quarter_bounds, quarter_label
+from .trip_ledger import load_trip_ledger, format_earnings_summary, format_period_breakdown
 
-    # Mocked response
-    return {
-        "total_earning": 15000,
-        "commission": 2000,
-        "penalty": 500,
-        "km_travelled": 100,
-        "vehicle_type": 3,
-        "bonus": 1200
-    }
-
-def handle_quarterly_earning(request: str) -> str:
+def handle_quarterly_earning(request: str, session) -> str:
     """
-    Respond with user's earning details.
-    You can parse user_id from request or context in real implementation.
+    Respond with user's earnings for the current quarter, or the previous
+    one when the request asks for the "last"/"previous" quarter; split by
+    month when it asks for monthly earnings.
     """
-    user_id = "123"  # Ideally this would be extracted from the request context
-    data = fetch_user_earning_data(user_id)
-
-    total_earning = data.get("total_earning", 0)
-    commission = data.get("commission", 0)
-    penalty = data.get("penalty", 0)
-    km_travelled = data.get("km_travelled", 0)
-    vehicle_type = data.get("vehicle_type", 1)
-    bonus = data.get("bonus", 0)
-
-    travel_cost_per_km = vehicle_cost_map.get(vehicle_type, 100)
-    travel_cost = km_travelled * travel_cost_per_km
+    try:
+        ledger = session.fetch("trip_ledger", lambda: load_trip_ledger(session.driver_id))
+    except DataAccessError:
+        return "Sorry, I couldn't fetch your earnings right now. Please try again in a moment."
 
-    net_earning = (total_earning + bonus) - (commission + penalty + travel_cost)
+    words = request.lower().split()
+    offset = -1 if "last" in words or "previous" in words else 0
+    start, end = quarter_bounds(int(time.time()), offset)
 
-    response = (
-        f"Here is your earnings summary:\n"
-        f"1. Total Earning: ₹{total_earning}\n"
-        f"2. Commission to Porter: ₹{commission}\n"
-        f"3. Penalty Applied: ₹{penalty}\n"
-        f"4. Travel Cost (₹{travel_cost_per_km}/km × {km_travelled} km): ₹{travel_cost}\n"
-        f"5. Bonus Points: ₹{bonus}\n"
-        f"6. 👉 Net Earning: ₹{net_earning}"
-    )
+    if "month" in words or "monthly" in words or "months" in words:
+        end = min(end, int(time.time()) + 1)
+        return format_period_breakdown(ledger, "month", start, end, f"Your earnings by month for {quarter_label(start)}")
 
-    return response
+    label = quarter_label(start) + (" so far" if offset == 0 else "")
+    return format_earnings_summary(compute_earnings(ledger, start, end), label)
@@ -1,2 +1,45 @@
-def handle_safety(request):
-    return "Safety and compliance is my expertise. What information do you require?"
+_TOPICS = {
+    "accident": (
+        ("accident", "crash", "injury", "injured", "hurt"),
+        "If you are in an accident: move to a safe spot, call 112 for injuries, photograph the vehicles "
+        "and the scene, and report it in the app as soon as you can.",
+    ),
+    "documents": (
+        ("document", "documents", "license", "licence", "rc", "permit", "puc", "compliance"),
+        "Keep your driving licence, vehicle RC, insurance and PUC certificate valid, carry them on every "
+        "trip and update them in the app before they expire.",
+    ),
+    "insurance": (
+        ("insurance", "insured", "claim", "cover"),
+        "To make an insurance claim, report the incident in the app as soon as possible and keep "
+        "photos, hospital bills and the FIR if one was filed.",
+    ),
+    "emergency": (
+        ("emergency", "sos", "unsafe", "threat", "harassment"),
+        "If you feel unsafe, stop in a busy, well-lit place and call 112. Share your live location with "
+        "someone you trust and report the incident in the app.",
+    ),
+}
+
+def _topic(request):
+    words = request.lower().replace("?", " ").replace(",", " ").split()
+    for topic, (keywords, _) in _TOPICS.items():
+        if any(word in words for word in keywords):
+            return topic
+    return None
+
+def _names_topic(request):
+    return _topic(request) is not None
+
+def handle_safety(request, session):
+    """
+    Safety and compliance guidance by topic; asks for the topic when the
+    request does not name one. A reply naming a topic comes back here
+    directly; anything else is classified as a new question.
+    """
+    topic = _topic(request)
+    if topic is not None:
+        return _TOPICS[topic][1]
+
+    session.ask("topic", _names_topic)
+    return "Safety and compliance is my expertise. What information do you require: accidents, documents, insurance or emergencies?"
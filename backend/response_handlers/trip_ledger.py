@@ -0,0 +1,69 @@
+import time
+import zlib
+
+import numpy as np
+
+from data_access import get_data_access
+from earnings_engine import TripLedger, group_earnings, period_keys, period_start
+
+# This function should replace with your actual API
+def fetch_trip_ledger(user_id):
+    """Mock API call returning roughly a year of trips for a driver."""
+    # Replace this with actual API request like:
+    # response = requests.get(f"https://api.example.com/trips/{user_id}")
+    # return response.json()   # columnar: {"timestamp": [...], "fare": [...], ...}
+
+    rng = np.random.default_rng(zlib.crc32(str(user_id).encode("utf-8")))
+    now = int(time.time())
+    n = int(rng.poisson(8 * 365))
+
+    fare = rng.uniform(150, 600, n).round()
+    return TripLedger({
+        "timestamp": now - rng.integers(0, 365 * 86400, n),
+        "fare": fare,
+        "km": (fare / rng.uniform(100, 200, n)).round(1),
+        "vehicle_type": np.full(n, 3),
+        "commission": (fare * 0.15).round(),
+        "penalty": np.where(rng.random(n) < 0.03, 50, 0),
+        "bonus": np.where(rng.random(n) < 0.1, 100, 0),
+    })
+
+def load_trip_ledger(user_id):
+    """Trip ledger via the shared data-access layer, parsed once and cached"""
+    return get_data_access().fetch_sync(
+        "trips", user_id, local=fetch_trip_ledger, parse=TripLedger.from_payload
+    )
+
+def format_earnings_summary(summary, period_label=None):
+    heading = f"Here is your earnings summary for {period_label}" if period_label else "Here is your earnings summary"
+    return (
+        f"{heading} ({summary['trips']} trips):\n"
+        f"1. Total Earning: ₹{summary['total_earning']:.0f}\n"
+        f"2. Commission to Porter: ₹{summary['commission']:.0f}\n"
+        f"3. Penalty Applied: ₹{summary['penalty']:.0f}\n"
+        f"4. Travel Cost ({summary['km_travelled']:.0f} km): ₹{summary['travel_cost']:.0f}\n"
+        f"5. Bonus Points: ₹{summary['bonus']:.0f}\n"
+        f"6. 👉 Net Earning: ₹{summary['net_earning']:.0f}"
+    )
+
+def _period_label(start, period):
+    if period == "week":
+        return time.strftime("Week of %d %b %Y", time.gmtime(start))
+    if period == "month":
+        return time.strftime("%b %Y", time.gmtime(start))
+    return time.strftime("%d %b %Y", time.gmtime(start))
+
+def format_period_breakdown(ledger, period, start, end, heading):
+    """Net earnings for every day/week/month bucket overlapping [start, end), oldest first"""
+    first, last = (int(key) for key in period_keys(np.asarray([start, end - 1], dtype=np.int64), period))
+    groups = group_earnings(ledger, period, start, end)
+    rows = {int(key): i for i, key in enumerate(groups["period"])}
+
+    lines = [f"{heading}:"]
+    for key in range(first, last + 1):
+        i = rows.get(key)
+        trips = int(groups["trips"][i]) if i is not None else 0
+        net = float(groups["net_earning"][i]) if i is not None else 0.0
+        so_far = " so far" if period_start(key + 1, period) > end else ""
+        lines.append(f"{_period_label(period_start(key, period), period)}{so_far}: ₹{net:.0f} net from {trips} trips")
+    return "\n".join(lines)
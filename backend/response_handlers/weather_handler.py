@@ -1,2 +1,17 @@
-def handle_weather(request):
+def _names_place(request):
+    """A short reply that is not itself a question, e.g. "Bandra this evening" """
+    return "?" not in request and 0 < len(request.split()) <= 6
+
+def handle_weather(request, session):
+    """
+    Asks for the location and time; the reply comes back here. There is no
+    forecast source yet, so the answer says so rather than guessing.
+    """
+    if session.followup == "place":
+        return (
+            f"I don't have a live forecast for {request.strip()} yet. "
+            "Please check the weather in your maps app before heading out."
+        )
+
+    session.ask("place", _names_place)
     return "I can check weather information. For which location and time?"
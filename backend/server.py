@@ -0,0 +1,446 @@
+"""
+Async HTTP inference service for the Saathi assistant.
+
+Serves POST /api/assistant/query with the model loaded once. Concurrent
+requests are gathered into micro-batches and classified with a single
+IntentClassifier call; handler code runs in a thread pool so it never
+blocks the event loop.
+
+A body may carry "driver_id" to keep a conversation session (see
+session_store.py): the reply's "awaiting" names the slot a handler asked
+for, and the driver's next message goes straight to that handler.
+Sessions live in the worker process, so with several workers a driver's
+turns need to reach the same worker for follow-ups to resume.
+
+Requests sent with "Accept: text/event-stream" (or "stream": true in the
+body) get server-sent events instead of one JSON body: an "intent" event
+as soon as the request is classified, a "chunk" event per reply fragment
+as the handler produces it, then "done" (or "error"). Handlers may return
+a string, a generator or an async generator of fragments; generators run
+on the handler thread pool, async generators on the event loop.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from session_store import valid_driver_id
+
+QUERY_PATH = "/api/assistant/query"
+HEALTH_PATH = "/healthz"
+METRICS_PATH = "/metrics"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+EVENT_STREAM_CONTENT_TYPE = "text/event-stream; charset=utf-8"
+
+def sse_event(event, data):
+    """One server-sent event; json.dumps escapes newlines, so data fits on one line"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+class MicroBatcher:
+    """Collects concurrent classification requests into batches"""
+
+    def __init__(self, agent, executor, max_batch_size=32, max_wait_ms=5):
+        self.agent = agent
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.task = None
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        # Created here so the queue belongs to the loop the batcher runs on
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def classify(self, text: str):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.agent.process_batch, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+class InferenceServer:
+    def __init__(self, agent, server_config):
+        self.agent = agent
+        self.config = server_config
+        self.executor = ThreadPoolExecutor(max_workers=server_config['handler_workers'])
+        self.batcher = MicroBatcher(
+            agent, self.executor,
+            max_batch_size=server_config['max_batch_size'],
+            max_wait_ms=server_config['max_wait_ms'],
+        )
+        self.inflight = 0
+        self.connections = set()
+        # Set by prefork workers: returns the health table of every worker
+        self.worker_health = None
+
+    async def handle_query(self, payload, stream=False):
+        text = payload.get("text") if isinstance(payload, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            return HTTPStatus.BAD_REQUEST, {"error": "Request body must include non-empty 'text'"}
+        driver_id = payload.get("driver_id")
+        if driver_id is not None and not valid_driver_id(driver_id):
+            return HTTPStatus.BAD_REQUEST, {
+                "error": "'driver_id' must be an integer or 1-64 letters, digits, '_' or '-'"
+            }
+
+        start = time.perf_counter()
+        # A message answering a handler's follow-up question skips classification
+        session = self.agent.session(driver_id)
+        result = self.agent.resume(text, session) or await self.batcher.classify(text)
+
+        if stream or payload.get("stream") is True:
+            return HTTPStatus.OK, self.stream_events(result, text, session, start)
+
+        fragments = self.response_fragments(result['category_id'], text, session)
+        result['response'] = "".join([fragment async for fragment in fragments])
+
+        return HTTPStatus.OK, {
+            "reply": result['response'],
+            "category_id": result['category_id'],
+            "category_name": result['category_name'],
+            "confidence": result['confidence'],
+            "is_confident": result['is_confident'],
+            "awaiting": session.pending_slot,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    async def response_fragments(self, category_id, text, session):
+        """Reply fragments as the handler produces them.
+
+        The handler is called on the executor. A string reply is one fragment;
+        a generator is iterated on the executor and an async generator on this loop.
+        The turn is closed once the handler has finished, even if the consumer stops early.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stopped = threading.Event()
+        start = time.perf_counter()
+
+        def emit(kind, value=None):
+            if not stopped.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+
+        def produce():
+            try:
+                output = self.agent.open_response(category_id, text, session)
+                if isinstance(output, str):
+                    emit("fragment", output)
+                elif hasattr(output, "__aiter__"):
+                    emit("async", output)
+                    return
+                else:
+                    try:
+                        for fragment in output:
+                            if stopped.is_set():
+                                break
+                            emit("fragment", fragment)
+                    finally:
+                        close = getattr(output, "close", None)
+                        if close is not None:
+                            close()
+                emit("end")
+            except Exception as e:
+                emit("error", e)
+
+        producing = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "fragment":
+                    yield value
+                elif kind == "async":
+                    try:
+                        async for fragment in value:
+                            yield fragment
+                    finally:
+                        await value.aclose()
+                    return
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            stopped.set()
+
+            def close(_=None):
+                self.agent.close_response(category_id, session, start)
+
+            # A client that stops reading closes this generator while the handler may
+            # still be running on the pool; end the turn only once it has returned, so
+            # a follow-up question it asks is not lost
+            try:
+                await asyncio.shield(producing)
+            except asyncio.CancelledError:
+                producing.add_done_callback(close)
+                raise
+            close()
+
+    async def stream_events(self, result, text, session, start):
+        """Server-sent events for one query: intent, reply chunks, then done or error"""
+        yield sse_event("intent", {
+            "category_id": result['category_id'],
+            "category_name": result['category_name'],
+            "confidence": result['confidence'],
+            "is_confident": result['is_confident'],
+        })
+
+        instrumentation = self.agent.classifier.instrumentation
+        first = True
+        fragments = self.response_fragments(result['category_id'], text, session)
+        try:
+            async for fragment in fragments:
+                if not fragment:
+                    continue
+                if first and instrumentation is not None:
+                    instrumentation.observe_stage('first_fragment', time.perf_counter() - start)
+                first = False
+                yield sse_event("chunk", {"text": fragment})
+        except Exception as e:
+            print(f"Error handling request: {e}")
+            yield sse_event("error", {"error": "Internal server error"})
+            return
+        finally:
+            # Closed here rather than whenever it is garbage collected, so the turn ends before this returns
+            await fragments.aclose()
+
+        yield sse_event("done", {
+            "awaiting": session.pending_slot,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+        })
+
+    async def route(self, method, path, body, headers=None):
+        if path == HEALTH_PATH and method == "GET":
+            cache = self.agent.classifier.cache
+            router = self.agent.classifier.router
+            health = {
+                "status": "ok",
+                "pid": os.getpid(),
+                "model_version": self.agent.classifier.model_version,
+                "batches": self.batcher.batches,
+                "requests": self.batcher.requests,
+                "cache": cache.stats() if cache is not None else None,
+                "fast_path": router.stats() if router is not None else None,
+                "sessions": self.agent.sessions.stats(),
+            }
+            if self.worker_health is not None:
+                health["workers"] = self.worker_health()
+            return HTTPStatus.OK, health
+
+        if path == METRICS_PATH and method == "GET":
+            instrumentation = self.agent.classifier.instrumentation
+            if instrumentation is None:
+                return HTTPStatus.NOT_FOUND, {"error": "Instrumentation is disabled"}
+            return HTTPStatus.OK, instrumentation.render_prometheus()
+
+        if path != QUERY_PATH:
+            return HTTPStatus.NOT_FOUND, {"error": "Not found"}
+
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST"}
+
+        try:
+            payload = json.loads(body or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return HTTPStatus.BAD_REQUEST, {"error": "Invalid JSON body"}
+
+        accept = (headers or {}).get("accept", "")
+        return await self.handle_query(payload, stream="text/event-stream" in accept)
+
+    async def handle_connection(self, reader, writer):
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.write_response(writer, HTTPStatus.BAD_REQUEST, {"error": "Bad request"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                if "transfer-encoding" in headers:
+                    # Only Content-Length framed bodies are read; a chunked body is not parsed as empty
+                    await self.write_response(writer, HTTPStatus.LENGTH_REQUIRED,
+                                              {"error": "Send the body with a Content-Length"}, False)
+                    break
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.write_response(writer, HTTPStatus.BAD_REQUEST,
+                                              {"error": "Invalid Content-Length"}, False)
+                    break
+                if length > self.config['max_body_bytes']:
+                    await self.write_response(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                              {"error": "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    and version == "HTTP/1.1"
+                )
+
+                self.inflight += 1
+                try:
+                    if method == "OPTIONS":
+                        status, payload = HTTPStatus.NO_CONTENT, None
+                    else:
+                        try:
+                            status, payload = await self.route(method, target.split("?", 1)[0], body, headers)
+                        except Exception as e:
+                            print(f"Error handling request: {e}")
+                            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+
+                    if hasattr(payload, "__aiter__"):
+                        await self.write_stream(writer, payload, keep_alive, chunked=version == "HTTP/1.1")
+                    else:
+                        await self.write_response(writer, status, payload, keep_alive)
+                finally:
+                    self.inflight -= 1
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def write_response(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), PROMETHEUS_CONTENT_TYPE
+        else:
+            body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Access-Control-Allow-Origin: *\r\n"
+            f"Access-Control-Allow-Headers: Content-Type\r\n"
+            f"Access-Control-Allow-Methods: POST, GET, OPTIONS\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def write_stream(self, writer, events, keep_alive, chunked=True):
+        """Send each event as soon as it is produced; without chunked framing the connection closes after"""
+        head = (
+            f"HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {EVENT_STREAM_CONTENT_TYPE}\r\n"
+            f"Cache-Control: no-cache\r\n"
+            f"X-Accel-Buffering: no\r\n"
+            + (f"Transfer-Encoding: chunked\r\n" if chunked else "")
+            + f"Access-Control-Allow-Origin: *\r\n"
+            f"Access-Control-Allow-Headers: Content-Type\r\n"
+            f"Access-Control-Allow-Methods: POST, GET, OPTIONS\r\n"
+            f"Connection: {'keep-alive' if keep_alive and chunked else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1"))
+        try:
+            async for event in events:
+                writer.write(b"%x\r\n%s\r\n" % (len(event), event) if chunked else event)
+                await writer.drain()
+        finally:
+            await events.aclose()
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+
+    async def serve(self, host=None, port=None, sock=None, stop=None):
+        """Serve until cancelled, or until the `stop` event is set and in-flight requests finish.
+
+        sock is an already bound listening socket, e.g. one shared by prefork workers.
+        """
+        self.batcher.start()
+        if sock is not None:
+            server = await asyncio.start_server(self.handle_connection, sock=sock)
+        else:
+            host = host or self.config['host']
+            port = port or self.config['port']
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print(f"Serving on http://{host}:{port}{QUERY_PATH}")
+
+        try:
+            async with server:
+                if stop is None:
+                    await server.serve_forever()
+                else:
+                    await stop.wait()
+                    server.close()
+                    await self.drain(self.config.get('shutdown_grace_seconds', 10))
+        finally:
+            await self.batcher.stop()
+            self.executor.shutdown(wait=False)
+
+    async def drain(self, timeout):
+        """Wait for requests already being handled to finish, then drop idle keep-alive connections"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.inflight and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        for writer in list(self.connections):
+            writer.close()
+
+def serve(agent, server_config, host=None, port=None):
+    """Run the inference server until interrupted"""
+    try:
+        asyncio.run(InferenceServer(agent, server_config).serve(host, port))
+    except KeyboardInterrupt:
+        print("Server stopped")
@@ -0,0 +1,266 @@
+"""
+Per-driver conversation sessions for multi-turn follow-ups.
+
+A Session carries what a handler needs on the driver's next turn:
+
+- a pending slot: a handler that asked a follow-up question ("costs or
+  revenue?") calls session.ask(slot, accepts). If accepts() says the
+  driver's next message answers it, QueryAgent sends that message straight
+  back to the handler with session.followup set, without classifying it;
+  any other message (a new question) is classified as usual and the
+  follow-up is dropped
+- fetched data: session.fetch(key, loader) (fetch_async in async
+  handlers) keeps a handler's upstream result (trip ledger, metrics) for
+  data_ttl_seconds, so later turns reuse it
+
+Driver IDs come from clients and end up in file names and upstream URLs,
+so SessionStore.get only accepts IDs matching DRIVER_ID_PATTERN.
+
+SessionStore bounds the memory held for sessions three ways: at most
+max_sessions entries (least recently used evicted first), sessions idle
+longer than idle_ttl_seconds are dropped, and the estimated size of all
+sessions and their data never exceeds max_bytes.
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+DRIVER_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Rough cost of an empty session: the slotted object, its data dict and the store entry
+SESSION_OVERHEAD_BYTES = 256
+
+def valid_driver_id(driver_id):
+    """True for a non-bool int or a string of 1-64 letters, digits, '_' or '-'"""
+    if isinstance(driver_id, bool) or not isinstance(driver_id, (str, int)):
+        return False
+    return DRIVER_ID_PATTERN.fullmatch(str(driver_id)) is not None
+
+def estimate_size(value):
+    """Approximate bytes held by a cached value; arrays and TripLedgers report nbytes"""
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+class Session:
+    __slots__ = (
+        "driver_id", "last_seen", "turns", "pending_category", "pending_slot", "pending_accepts",
+        "followup", "asked", "asked_accepts", "data", "nbytes", "store",
+    )
+
+    def __init__(self, driver_id, store=None, now=0.0):
+        self.driver_id = driver_id
+        self.last_seen = now
+        self.turns = 0
+        self.pending_category = None   # handler waiting for the next message
+        self.pending_slot = None
+        self.pending_accepts = None
+        self.followup = None           # slot the current message answers, if any
+        self.asked = None              # slot asked for during the current turn
+        self.asked_accepts = None
+        self.data = {}                 # key -> (value, fetched_at, nbytes)
+        self.nbytes = SESSION_OVERHEAD_BYTES
+        self.store = store             # None for a one-off session that keeps nothing
+
+    def ask(self, slot, accepts):
+        """Route the driver's next message back to the current handler as the answer to `slot`.
+
+        accepts(message) -> bool decides whether that message answers it; if not,
+        it is classified like any other.
+        """
+        self.asked, self.asked_accepts = slot, accepts
+
+    def fetch(self, key, loader):
+        """Value cached in this session under key, or loader()'s result (cached if the store allows)"""
+        if self.store is None:
+            return loader()
+        found, value = self.store.lookup(self, key)
+        if not found:
+            value = loader()
+            self.store.remember(self, key, value)
+        return value
+
+    async def fetch_async(self, key, loader):
+        """fetch() for async handlers; loader() returns an awaitable"""
+        if self.store is None:
+            return await loader()
+        found, value = self.store.lookup(self, key)
+        if not found:
+            value = await loader()
+            self.store.remember(self, key, value)
+        return value
+
+    def begin_turn(self, request):
+        """Take the pending slot if `request` answers it; returns the waiting handler's category or None"""
+        category_id, slot, accepts = self.pending_category, self.pending_slot, self.pending_accepts
+        self.pending_category = self.pending_slot = self.pending_accepts = None
+        self.asked = self.asked_accepts = None
+        self.turns += 1
+        if category_id is not None and not accepts(request):
+            category_id = slot = None
+        self.followup = slot
+        return category_id
+
+    def end_turn(self, category_id):
+        if self.asked is not None:
+            self.pending_category, self.pending_slot = category_id, self.asked
+            self.pending_accepts = self.asked_accepts
+        self.followup = self.asked = self.asked_accepts = None
+
+class SessionStore:
+    def __init__(self, max_sessions=100000, idle_ttl_seconds=900, max_bytes=256 * 1024 * 1024,
+                 data_ttl_seconds=300, clock=time.monotonic):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_bytes = max_bytes
+        self.data_ttl_seconds = data_ttl_seconds
+        self.clock = clock
+        self.nbytes = 0
+        self._sessions = OrderedDict()   # least recently used first
+        self._lock = threading.Lock()
+        self.created = 0
+        self.resumed = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.memory_evictions = 0
+        self.data_hits = 0
+        self.data_misses = 0
+
+    def get(self, driver_id):
+        """The driver's session, created if missing or expired, marked most recently used"""
+        if not valid_driver_id(driver_id):
+            raise ValueError(f"Invalid driver ID {driver_id!r}")
+        driver_id = str(driver_id)
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            session = self._sessions.get(driver_id)
+            if session is None:
+                session = Session(driver_id, self, now)
+                self._sessions[driver_id] = session
+                self.nbytes += session.nbytes
+                self.created += 1
+                while len(self._sessions) > self.max_sessions:
+                    self._evict_oldest()
+                    self.evictions += 1
+                self._enforce_memory_cap(session)
+            else:
+                self._sessions.move_to_end(driver_id)
+                self.resumed += 1
+            session.last_seen = now
+            return session
+
+    def _expire(self, now):
+        # Sessions are kept in last-use order, so idle ones are all at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen <= self.idle_ttl_seconds:
+                return
+            self._evict_oldest()
+            self.expirations += 1
+
+    def _evict_oldest(self):
+        _, session = self._sessions.popitem(last=False)
+        self.nbytes -= session.nbytes
+        session.store = None   # a handler still holding it stops caching into the store
+
+    def lookup(self, session, key):
+        """(True, value) if the session holds fresh data under key, else (False, None)"""
+        with self._lock:
+            entry = session.data.get(key)
+            if entry is not None and self.clock() - entry[1] <= self.data_ttl_seconds:
+                self.data_hits += 1
+                return True, entry[0]
+            self.data_misses += 1
+            return False, None
+
+    def remember(self, session, key, value):
+        """Cache a loaded value on the session, evicting other sessions to stay under max_bytes"""
+        # Sized outside the lock; loaders run outside it too since upstream calls can take a while
+        size = estimate_size(value)
+        with self._lock:
+            if session.store is not self:
+                return
+            old = session.data.pop(key, None)
+            if old is not None:
+                self._resize(session, -old[2])
+            if SESSION_OVERHEAD_BYTES + size > self.max_bytes:
+                return   # could never fit; served uncached
+            session.data[key] = (value, self.clock(), size)
+            self._resize(session, size)
+            self._enforce_memory_cap(session)
+
+    def _resize(self, session, delta):
+        session.nbytes += delta
+        self.nbytes += delta
+
+    def _enforce_memory_cap(self, keep):
+        while self.nbytes > self.max_bytes:
+            victim = next((s for s in self._sessions.values() if s is not keep), None)
+            if victim is None:
+                break
+            del self._sessions[victim.driver_id]
+            self.nbytes -= victim.nbytes
+            victim.store = None
+            self.memory_evictions += 1
+
+        # Only the current session is left over the cap: drop its older data
+        while self.nbytes > self.max_bytes and keep.data:
+            key = min(keep.data, key=lambda k: keep.data[k][1])
+            self._resize(keep, -keep.data.pop(key)[2])
+
+    def drop(self, driver_id):
+        with self._lock:
+            session = self._sessions.pop(str(driver_id), None)
+            if session is not None:
+                self.nbytes -= session.nbytes
+                session.store = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.data_hits + self.data_misses
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "created": self.created,
+                "resumed": self.resumed,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "memory_evictions": self.memory_evictions,
+                "data_hit_rate": round(self.data_hits / lookups, 4) if lookups else 0.0,
+            }
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+def get_session_store():
+    """Process-wide store built from config.SESSIONS on first use"""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            from config import SESSIONS
+            _session_store = SessionStore(
+                SESSIONS['max_sessions'], SESSIONS['idle_ttl_seconds'],
+                SESSIONS['max_bytes'], SESSIONS['data_ttl_seconds'],
+            )
+        return _session_store
+
+def set_session_store(store):
+    global _session_store
+    with _session_store_lock:
+        _session_store = store
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Local stub for the trip-ledger and business-metrics APIs and the
+generative model behind the default handler.
+
+Stands in for the upstream services behind data_access.py and
+genai_fallback.py during development and load testing:
+
+    python stub_backend.py --port 9100 --delay-ms 50 --model-delay-ms 2000
+
+then point config.DATA_ACCESS['sources'] at
+http://127.0.0.1:9100/trips/{user_id} and
+http://127.0.0.1:9100/metrics/{user_id}, and config.GENAI_FALLBACK['url']
+at http://127.0.0.1:9100/generate. --model-delay-ms and --model-fail-rate
+make only the model slow or failing. GET /stats returns how many calls
+each endpoint received, which shows caching and coalescing at work, and
+the most /generate calls that were in flight at once.
+The tests under backend/tests start StubBackend in-process instead.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from response_handlers.trip_ledger import fetch_trip_ledger
+from response_handlers.business_handler import fetch_business_metrics
+
+class StubBackend:
+    def __init__(self, delay_ms=0, fail_rate=0.0, seed=None, model_delay_ms=0, model_fail_rate=0.0):
+        self.delay = delay_ms / 1000
+        self.fail_rate = fail_rate
+        self.model_delay = model_delay_ms / 1000
+        self.model_fail_rate = model_fail_rate
+        self.random = random.Random(seed)
+        self.calls = {"trips": 0, "metrics": 0, "generate": 0}
+        self.model_active = 0
+        self.model_peak_concurrency = 0
+        self.server = None
+
+    async def generate(self, body):
+        self.calls["generate"] += 1
+        self.model_active += 1
+        self.model_peak_concurrency = max(self.model_peak_concurrency, self.model_active)
+        try:
+            if self.model_delay:
+                await asyncio.sleep(self.model_delay)
+        finally:
+            self.model_active -= 1
+        if self.random.random() < self.model_fail_rate:
+            return 503, {"error": "Injected model failure"}
+        try:
+            prompt = json.loads(body or b"{}").get("prompt", "")
+        except (ValueError, AttributeError):
+            return 400, {"error": "Invalid JSON body"}
+        return 200, {"reply": f"Here is what I found about '{prompt}': please contact Porter support for details."}
+
+    def route(self, path):
+        parts = path.strip("/").split("/")
+        if parts == ["stats"]:
+            return 200, {"calls": self.calls, "model_peak_concurrency": self.model_peak_concurrency}
+        if len(parts) == 2 and parts[0] == "trips":
+            self.calls["trips"] += 1
+            return 200, fetch_trip_ledger(parts[1]).to_columns()
+        if len(parts) == 2 and parts[0] == "metrics":
+            self.calls["metrics"] += 1
+            return 200, fetch_business_metrics(parts[1])
+        return 404, {"error": "Not found"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split()
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value.strip())
+                body = await reader.readexactly(length) if length else b""
+
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                if path != "/stats" and self.random.random() < self.fail_rate:
+                    status, payload = 503, {"error": "Injected failure"}
+                elif method == "POST" and path == "/generate":
+                    status, payload = await self.generate(body)
+                else:
+                    status, payload = self.route(path)
+
+                body = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=9100):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+async def run(host, port, delay_ms, fail_rate, model_delay_ms=0, model_fail_rate=0.0):
+    backend = StubBackend(delay_ms, fail_rate, model_delay_ms=model_delay_ms, model_fail_rate=model_fail_rate)
+    port = await backend.start(host, port)
+    print(f"Stub trips/metrics/model API on http://{host}:{port}")
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub trip-ledger, metrics and generative model APIs")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--delay-ms', type=float, default=0, help='Latency added to every response')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of requests answered with 503')
+    parser.add_argument('--model-delay-ms', type=float, default=0, help='Extra latency of POST /generate')
+    parser.add_argument('--model-fail-rate', type=float, default=0.0, help='Share of /generate calls answered with 503')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args.host, args.port, args.delay_ms, args.fail_rate,
+                        args.model_delay_ms, args.model_fail_rate))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+# Backend modules are imported flat (`from config import ...`), as main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def stub_backend():
+    """Start StubBackend(**options) on a background loop; returns (backend, base_url)"""
+    from stub_backend import StubBackend
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    started = []
+
+    def start(**options):
+        backend = StubBackend(seed=0, **options)
+        port = asyncio.run_coroutine_threadsafe(backend.start(port=0), loop).result()
+        started.append(backend)
+        return backend, f"http://127.0.0.1:{port}"
+
+    async def shutdown():
+        for backend in started:
+            await backend.stop()
+        # Connection handlers of keep-alive clients are still waiting for requests
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    yield start
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+@pytest.fixture
+def server():
+    """InferenceServer over the shipped model with its own SessionStore"""
+    from config import CATEGORIES, CONFIDENCE_THRESHOLD, MODEL_CONFIG, MODEL_PATH, SERVER_CONFIG
+    from server import InferenceServer
+    from session_store import SessionStore
+    from utils import IntentClassifier, QueryAgent
+
+    classifier = IntentClassifier(MODEL_CONFIG, CATEGORIES)
+    classifier.load_model(MODEL_PATH)
+    server = InferenceServer(QueryAgent(classifier, CONFIDENCE_THRESHOLD, sessions=SessionStore()), SERVER_CONFIG)
+    yield server
+    server.executor.shutdown()
+
+@pytest.fixture
+def http(server):
+    """Send raw request bytes to the server over a real socket; returns everything it wrote until it closed"""
+    def exchange(raw):
+        async def send():
+            listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+            server.batcher.start()
+            try:
+                port = listener.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(raw)
+                await writer.drain()
+                response = await asyncio.wait_for(reader.read(), 10)
+                writer.close()
+                return response
+            finally:
+                await server.batcher.stop()
+                listener.close()
+                await listener.wait_closed()
+        return asyncio.run(send())
+    return exchange
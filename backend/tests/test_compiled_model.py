@@ -0,0 +1,62 @@
+import copy
+
+import numpy as np
+import pytest
+
+from compiled_model import compile_pipeline
+from config import MODEL_CONFIG
+from model_build import build_pipeline
+from training_data import training_data
+
+TEXTS = [text for text, _ in training_data]
+
+EDGE_TEXTS = [
+    "",
+    "   ",
+    "?!",
+    "the and of",                                # stop words only
+    "zxqv blorptastic unseenword",                # nothing in the vocabulary
+    "EARNINGS",                                   # case folding
+    "earnings",                                   # a single token: no bigrams
+    "quarterly earnings statement",               # bigrams that were trained
+    "statement quarterly earnings earnings",      # known tokens, unseen and repeated bigrams
+    "earnings-per-share,profit/loss",             # punctuation splits tokens
+    "a b c d e f g",                              # single characters the token pattern drops
+    "weather " * 200,                             # long repeated input
+    "café naïve résumé ₹500 2024",                # non-ASCII and digits
+]
+
+def _pipeline(**tfidf):
+    config = copy.deepcopy(MODEL_CONFIG)
+    config['tfidf'].update(tfidf)
+    pipeline, _, _ = build_pipeline(config, training_data)
+    return pipeline
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return _pipeline()
+
+def _assert_parity(pipeline, texts):
+    compiled = compile_pipeline(pipeline)
+    assert list(compiled.classes_.astype(str)) == list(pipeline.classes_)
+    np.testing.assert_allclose(compiled.predict_proba(texts), pipeline.predict_proba(texts), rtol=0, atol=1e-9)
+
+def test_parity_on_training_texts(pipeline):
+    _assert_parity(pipeline, TEXTS)
+
+@pytest.mark.parametrize("text", EDGE_TEXTS)
+def test_parity_on_edge_inputs(pipeline, text):
+    _assert_parity(pipeline, [text])
+
+def test_parity_on_mixed_batch(pipeline):
+    # Row boundaries in the sparse matrix must not leak terms between texts
+    _assert_parity(pipeline, EDGE_TEXTS + TEXTS[:10] + [""])
+
+@pytest.mark.parametrize("tfidf", [
+    {'ngram_range': (1, 1)},
+    {'ngram_range': (1, 3), 'max_features': None},
+    {'ngram_range': (2, 2), 'max_features': None},
+    {'sublinear_tf': True, 'norm': 'l1'},
+])
+def test_parity_across_vectorizer_settings(tfidf):
+    _assert_parity(_pipeline(**tfidf), TEXTS + EDGE_TEXTS)
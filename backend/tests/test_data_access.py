@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+from data_access import DataAccessError, DataAccessLayer, set_data_access
+from session_store import Session
+from utils import join_fragments
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def layers():
+    """DataAccessLayer factory whose layers are closed after the test"""
+    created = []
+
+    def make(**options):
+        layer = DataAccessLayer(**options)
+        created.append(layer)
+        return layer
+
+    yield make
+    for layer in created:
+        layer.close()
+
+@pytest.fixture
+def handler_layer():
+    """Installs a layer as the process-wide one for handlers, restoring the default after"""
+    yield set_data_access
+    set_data_access(None)
+
+def _fetch_concurrently(layer, n):
+    async def fetch_all():
+        return await asyncio.gather(*(layer.fetch_async("trips", "42") for _ in range(n)))
+    return asyncio.run(fetch_all())
+
+def test_concurrent_fetches_share_one_upstream_call(stub_backend, layers):
+    backend, url = stub_backend(delay_ms=100)
+    layer = layers(sources={"trips": f"{url}/trips/{{user_id}}"})
+
+    results = _fetch_concurrently(layer, 20)
+
+    assert backend.calls["trips"] == 1
+    assert layer.stats["upstream_calls"] == 1
+    assert layer.stats["coalesced"] == 19
+    assert all(result == results[0] for result in results)
+
+def test_cached_until_ttl_expires(stub_backend, layers):
+    backend, url = stub_backend()
+    clock = FakeClock()
+    layer = layers(sources={"trips": f"{url}/trips/{{user_id}}"}, ttl_seconds=30, clock=clock)
+
+    layer.fetch_sync("trips", "42")
+    clock.now += 29
+    layer.fetch_sync("trips", "42")
+    assert backend.calls["trips"] == 1
+    assert layer.stats["hits"] == 1
+
+    clock.now += 2
+    layer.fetch_sync("trips", "42")
+    assert backend.calls["trips"] == 2
+
+def test_invalidate_forces_a_refetch(stub_backend, layers):
+    backend, url = stub_backend()
+    layer = layers(sources={"trips": f"{url}/trips/{{user_id}}"})
+
+    layer.fetch_sync("trips", "42")
+    layer.fetch_sync("trips", "7")
+    layer.invalidate("trips", "42")
+    layer.fetch_sync("trips", "42")
+    layer.fetch_sync("trips", "7")
+    assert backend.calls["trips"] == 3
+
+def test_slow_upstream_raises_data_access_error(stub_backend, layers):
+    _, url = stub_backend(delay_ms=500)
+    layer = layers(sources={"trips": f"{url}/trips/{{user_id}}"}, timeout_seconds=0.05)
+
+    with pytest.raises(DataAccessError, match="timed out"):
+        layer.fetch_sync("trips", "42")
+    assert layer.stats["errors"] == 1
+
+def test_waiting_for_a_slot_counts_against_the_timeout(stub_backend, layers):
+    _, url = stub_backend(delay_ms=1000)
+    layer = layers(sources={"trips": f"{url}/trips/{{user_id}}"}, timeout_seconds=0.2, max_concurrency=1)
+
+    async def fetch(user_id):
+        start = time.perf_counter()
+        with pytest.raises(DataAccessError, match="timed out"):
+            await layer.fetch_async("trips", user_id)
+        return time.perf_counter() - start
+
+    async def fetch_all():
+        return await asyncio.gather(*(fetch(str(user_id)) for user_id in range(3)))
+
+    # One slot and three drivers: the queued fetches give up at the same deadline
+    assert max(asyncio.run(fetch_all())) < 0.35
+    assert layer.stats["errors"] == 3
+    # A fetch that never got the slot is not counted as a call (the second may
+    # just get the slot the first one gives up at the deadline)
+    assert layer.stats["upstream_calls"] in (1, 2)
+
+def test_failing_upstream_raises_data_access_error(stub_backend, layers):
+    _, url = stub_backend(fail_rate=1.0)
+    layer = layers(sources={"trips": f"{url}/trips/{{user_id}}"})
+
+    with pytest.raises(DataAccessError, match="503"):
+        layer.fetch_sync("trips", "42")
+
+def test_handlers_answer_from_the_stub(stub_backend, handler_layer):
+    from response_handlers.business_handler import handle_business
+    from response_handlers.earning_handler import handle_earning
+
+    backend, url = stub_backend()
+    handler_layer(DataAccessLayer(sources={
+        "trips": f"{url}/trips/{{user_id}}",
+        "business_metrics": f"{url}/metrics/{{user_id}}",
+    }))
+
+    assert "Net Earning" in handle_earning("my earnings", Session("42"))
+    assert "325 deliveries" in join_fragments(handle_business("business summary", Session("42")))
+    assert backend.calls == {"trips": 1, "metrics": 1, "generate": 0}
+
+@pytest.mark.parametrize("options", [{"delay_ms": 500}, {"fail_rate": 1.0}])
+def test_handlers_fall_back_when_upstream_is_unavailable(stub_backend, handler_layer, options):
+    from response_handlers.business_handler import handle_business
+    from response_handlers.earning_handler import handle_earning
+
+    _, url = stub_backend(**options)
+    handler_layer(DataAccessLayer(sources={
+        "trips": f"{url}/trips/{{user_id}}",
+        "business_metrics": f"{url}/metrics/{{user_id}}",
+    }, timeout_seconds=0.05))
+
+    assert handle_earning("my earnings", Session("42")).startswith("Sorry, I couldn't fetch your earnings")
+    assert join_fragments(handle_business("business summary", Session("42"))).startswith(
+        "Sorry, I couldn't fetch your business metrics"
+    )
@@ -0,0 +1,91 @@
+import calendar
+import datetime
+
+import numpy as np
+import pytest
+
+from earnings_engine import TripLedger, compute_earnings, group_earnings, period_keys, period_start
+from response_handlers.trip_ledger import format_period_breakdown
+
+def utc(*fields):
+    return calendar.timegm(datetime.datetime(*fields).timetuple())
+
+# Pairs straddling a day, a Monday week start, month ends (leap February,
+# December into January) and a quarter end
+BOUNDARIES = [
+    utc(2023, 12, 31, 23, 59, 59), utc(2024, 1, 1),
+    utc(2024, 2, 29, 23, 59, 59), utc(2024, 3, 1),
+    utc(2024, 3, 10, 23, 59, 59), utc(2024, 3, 11),     # Sunday -> Monday
+    utc(2024, 3, 17, 23, 59, 59),                        # the Sunday ending that week
+    utc(2024, 3, 31, 23, 59, 59), utc(2024, 4, 1),
+]
+
+def bucket(timestamp, period):
+    """Brute-force bucket start from the calendar"""
+    day = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).date()
+    if period == "week":
+        day -= datetime.timedelta(days=day.weekday())
+    elif period == "month":
+        day = day.replace(day=1)
+    elif period == "quarter":
+        day = day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return calendar.timegm(day.timetuple())
+
+@pytest.fixture
+def ledger():
+    rng = np.random.default_rng(3)
+    n = len(BOUNDARIES)
+    fare = rng.uniform(100, 500, n).round()
+    return TripLedger({
+        "timestamp": BOUNDARIES,
+        "fare": fare,
+        "km": rng.uniform(1, 20, n).round(1),
+        "vehicle_type": rng.integers(1, 7, n),
+        "commission": (fare * 0.15).round(),
+        "penalty": np.where(rng.random(n) < 0.3, 50, 0),
+        "bonus": np.where(rng.random(n) < 0.3, 100, 0),
+    })
+
+@pytest.mark.parametrize("period", ["day", "week", "month", "quarter"])
+def test_bucket_starts_match_the_calendar(period):
+    keys = period_keys(np.asarray(BOUNDARIES, dtype=np.int64), period)
+    for timestamp, key in zip(BOUNDARIES, keys):
+        assert period_start(key, period) == bucket(timestamp, period)
+        assert period_start(key, period) <= timestamp < period_start(key + 1, period)
+
+def test_boundaries_split_buckets():
+    keys = {period: period_keys(np.asarray(BOUNDARIES, dtype=np.int64), period) for period in ("day", "week", "month")}
+    # 23:59:59 UTC and the next midnight are different days
+    assert keys["day"][0] != keys["day"][1]
+    # Sunday night ends a week; Monday 00:00 through the next Sunday is one week
+    assert keys["week"][4] != keys["week"][5]
+    assert keys["week"][5] == keys["week"][6]
+    # Month and year rollovers, including 29 February
+    assert keys["month"][0] + 1 == keys["month"][1]
+    assert keys["month"][2] + 1 == keys["month"][3]
+
+@pytest.mark.parametrize("period", ["day", "week", "month", "quarter"])
+def test_group_earnings_matches_per_bucket_totals(ledger, period):
+    groups = group_earnings(ledger, period)
+    starts = sorted({bucket(t, period) for t in BOUNDARIES})
+    assert [period_start(key, period) for key in groups["period"]] == starts
+
+    for i, key in enumerate(groups["period"]):
+        expected = compute_earnings(ledger, period_start(key, period), period_start(key + 1, period))
+        assert groups["trips"][i] == expected["trips"]
+        for name in ("total_earning", "commission", "penalty", "bonus", "km_travelled", "travel_cost", "net_earning"):
+            assert groups[name][i] == pytest.approx(expected[name])
+
+def test_group_earnings_respects_the_range(ledger):
+    groups = group_earnings(ledger, "month", utc(2024, 1, 1), utc(2024, 3, 11))
+    assert groups["trips"].tolist() == [1, 1, 2]
+
+def test_breakdown_lists_empty_buckets_and_marks_the_current_one(ledger):
+    reply = format_period_breakdown(ledger, "week", utc(2024, 2, 19), utc(2024, 3, 12), "Weekly")
+    lines = reply.split("\n")
+    assert lines[0] == "Weekly:"
+    assert [line.split(":")[0] for line in lines[1:]] == [
+        "Week of 19 Feb 2024", "Week of 26 Feb 2024", "Week of 04 Mar 2024", "Week of 11 Mar 2024 so far",
+    ]
+    assert lines[1].endswith("₹0 net from 0 trips")
+    assert [int(line.split(" from ")[1].split()[0]) for line in lines[1:]] == [0, 2, 1, 1]
@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+
+from data_access import DataAccessError
+from earnings_engine import TripLedger
+from earnings_store import EarningsStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class Ledger:
+    """seed() for the store: serves the trips added so far, or fails on demand"""
+
+    def __init__(self, timestamps):
+        self.timestamps = list(timestamps)
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self, driver_id):
+        self.calls += 1
+        if self.fail:
+            raise DataAccessError("ledger unavailable")
+        return TripLedger({"timestamp": self.timestamps, "fare": [100.0] * len(self.timestamps)})
+
+def test_series_loaded_from_disk_picks_up_newer_trips(tmp_path):
+    ledger = Ledger([100, 200, 300])
+    EarningsStore(str(tmp_path), seed=ledger).series("7")
+
+    ledger.timestamps += [400, 500]
+    appended = []
+    store = EarningsStore(str(tmp_path), seed=ledger, refresh_seconds=30)
+    store.listeners.append(lambda driver_id, trips: appended.append((driver_id, trips.timestamp.tolist())))
+
+    series = store.series("7")
+    assert series.timestamps.tolist() == [100, 200, 300, 400, 500]
+    assert series.totals()["total_earning"] == pytest.approx(500.0)
+    assert appended == [("7", [400, 500])]
+    # Persisted, so the next process starts from the refreshed series
+    assert len(EarningsStore(str(tmp_path)).series("7")) == 5
+
+def test_loaded_series_refreshes_every_refresh_seconds(tmp_path):
+    ledger = Ledger([100])
+    clock = FakeClock()
+    store = EarningsStore(str(tmp_path), seed=ledger, refresh_seconds=30, clock=clock)
+    store.series("7")
+
+    ledger.timestamps.append(200)
+    clock.now += 29
+    assert len(store.series("7")) == 1
+    assert ledger.calls == 1
+
+    clock.now += 1
+    assert len(store.series("7")) == 2
+    assert ledger.calls == 2
+
+def test_refresh_never_appends_a_trip_twice(tmp_path):
+    ledger = Ledger([100, 200])
+    store = EarningsStore(str(tmp_path), seed=ledger)
+    store.series("7")
+
+    ledger.timestamps.append(300)
+    assert store.refresh("7") == 1
+    assert store.refresh("7") == 0
+    assert store.series("7").timestamps.tolist() == [100, 200, 300]
+
+def test_unavailable_ledger_keeps_the_stale_series(tmp_path):
+    ledger = Ledger([100])
+    clock = FakeClock()
+    store = EarningsStore(str(tmp_path), seed=ledger, refresh_seconds=30, clock=clock)
+    store.series("7")
+
+    ledger.fail = True
+    clock.now += 60
+    assert store.series("7").timestamps.tolist() == [100]
+
+def test_loaded_series_are_bounded_least_recently_used_first(tmp_path):
+    store = EarningsStore(str(tmp_path), seed=Ledger([100]), max_drivers=2)
+    first = store.series("1")
+    store.series("2")
+    store.series("1")
+    store.series("3")
+
+    assert list(store._series) == ["1", "3"]
+    assert store.series("1") is first
+    # An evicted driver reloads from disk
+    assert np.array_equal(store.series("2").timestamps, [100])
+
+@pytest.mark.parametrize("driver_id", ["../evil", "../../tmp/evil_driver", "a/../../evil", "/tmp/evil"])
+def test_rejects_paths_outside_the_store(tmp_path, driver_id):
+    store = EarningsStore(str(tmp_path / "store"), seed=Ledger([100]))
+    with pytest.raises(ValueError):
+        store.series(driver_id)
+    assert not list(tmp_path.rglob("*.npz"))
+
+def _trips(*timestamps):
+    return TripLedger({"timestamp": list(timestamps), "fare": [100.0] * len(timestamps)})
+
+def _on_disk(tmp_path, driver_id):
+    return EarningsStore(str(tmp_path)).series(driver_id).timestamps.tolist()
+
+def test_appends_rewrite_the_file_at_most_every_save_seconds(tmp_path):
+    clock = FakeClock()
+    store = EarningsStore(str(tmp_path), seed=Ledger([100]), save_seconds=10, clock=clock)
+    store.series("7")
+    assert store.saves == 1   # the seeded series
+
+    for t in range(200, 250):
+        store.append("7", _trips(t))
+    assert store.saves == 1
+    assert _on_disk(tmp_path, "7") == [100]
+
+    clock.now += 10
+    store.append("7", _trips(300))
+    assert store.saves == 2
+    assert len(_on_disk(tmp_path, "7")) == 52
+
+    store.append("7", _trips(400))
+    store.flush()
+    assert store.saves == 3
+    assert _on_disk(tmp_path, "7")[-1] == 400
+    store.flush()
+    assert store.saves == 3
+
+def test_evicted_series_is_saved_before_it_is_dropped(tmp_path):
+    store = EarningsStore(str(tmp_path), seed=Ledger([100]), max_drivers=1, save_seconds=3600)
+    store.append("1", _trips(200))
+    assert _on_disk(tmp_path, "1") == [100]
+
+    store.series("2")
+    assert _on_disk(tmp_path, "1") == [100, 200]
+    assert store.series("1").timestamps.tolist() == [100, 200]
+
+def test_a_slow_save_does_not_block_other_drivers(tmp_path, monkeypatch):
+    import threading
+
+    from earnings_store import EarningsSeries
+
+    store = EarningsStore(str(tmp_path), seed=Ledger([100]))
+    slow = "1"
+    other = next(str(i) for i in range(2, 1000) if store._driver_lock(str(i)) is not store._driver_lock(slow))
+    store.series(slow)
+    store.series(other)
+
+    writing, release = threading.Event(), threading.Event()
+    save = EarningsSeries.save
+
+    def blocking_save(series, path):
+        if path.endswith(f"{slow}.npz"):
+            writing.set()
+            assert release.wait(5)
+        save(series, path)
+
+    monkeypatch.setattr(EarningsSeries, "save", blocking_save)
+    thread = threading.Thread(target=store.append, args=(slow, _trips(200)))
+    thread.start()
+    try:
+        assert writing.wait(5)
+        store.append(other, _trips(300))
+        assert store.series(other).timestamps.tolist() == [100, 300]
+        assert _on_disk(tmp_path, other) == [100, 300]
+    finally:
+        release.set()
+        thread.join()
+    assert _on_disk(tmp_path, slow) == [100, 200]
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from genai_fallback import GenerativeFallback, set_fallback
+from response_handlers.default_handler import handle_default
+from session_store import Session
+from utils import join_fragments
+
+CANNED = "I cannot help with this, do you have any other query?"
+
+@pytest.fixture
+def fallback(stub_backend):
+    """Install a GenerativeFallback(**options) pointed at a stub model; returns (fallback, backend)"""
+    def install(model_delay_ms=0, model_fail_rate=0.0, **options):
+        backend, url = stub_backend(model_delay_ms=model_delay_ms, model_fail_rate=model_fail_rate)
+        fallback = GenerativeFallback(f"{url}/generate", CANNED, **options)
+        set_fallback(fallback)
+        return fallback, backend
+
+    yield install
+    set_fallback(None)
+
+def _ask(text):
+    start = time.perf_counter()
+    reply = join_fragments(handle_default(text, Session("42")))
+    return reply, time.perf_counter() - start
+
+def test_slow_model_gives_the_canned_reply_at_the_deadline(fallback):
+    fb, _ = fallback(model_delay_ms=1000, deadline_seconds=0.1)
+
+    reply, elapsed = _ask("tell me a joke")
+
+    assert reply == CANNED
+    assert 0.1 <= elapsed < 0.5
+    assert fb.stats["deadline_missed"] == 1
+
+def test_late_answer_is_cached_for_the_next_request(fallback):
+    fb, backend = fallback(model_delay_ms=300, deadline_seconds=0.05)
+
+    assert _ask("tell me a joke")[0] == CANNED
+    deadline = time.monotonic() + 5
+    while fb.cache.get(fb.preprocessor.preprocess("tell me a joke")) is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+    reply, elapsed = _ask("Tell me a joke!")
+    assert reply.startswith("Here is what I found")
+    assert elapsed < 0.05
+    assert backend.calls["generate"] == 1
+
+def test_failing_model_gives_the_canned_reply_quickly(fallback):
+    fb, _ = fallback(model_fail_rate=1.0, deadline_seconds=2.0)
+
+    reply, elapsed = _ask("tell me a joke")
+
+    assert reply == CANNED
+    assert elapsed < 0.5
+    assert fb.stats["errors"] == 1
+
+def test_concurrent_requests_stay_within_max_concurrency(fallback):
+    fb, backend = fallback(model_delay_ms=200, deadline_seconds=0.5, max_concurrency=2)
+    replies = {}
+
+    def ask(i):
+        replies[i] = _ask(f"question number {i}")
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.model_peak_concurrency == 2
+    assert backend.calls["generate"] < 8
+    assert fb.stats["rejected"] + fb.stats["deadline_missed"] > 0
+    for reply, elapsed in replies.values():
+        assert reply == CANNED or reply.startswith("Here is what I found")
+        assert elapsed < 0.5 + 0.2
+
+def test_identical_questions_share_one_model_call(fallback):
+    fb, backend = fallback(model_delay_ms=200, deadline_seconds=1.0)
+    replies = []
+    threads = [threading.Thread(target=lambda: replies.append(_ask("tell me a joke")[0])) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.calls["generate"] == 1
+    assert fb.stats["coalesced"] == 4
+    assert len(set(replies)) == 1 and replies[0] != CANNED
+
+def test_slow_fallbacks_do_not_hold_handler_threads(fallback, server):
+    from config import SERVER_CONFIG
+    from server import QUERY_PATH, InferenceServer
+
+    fallback(model_delay_ms=2000, deadline_seconds=1.0)
+    server = InferenceServer(server.agent, dict(SERVER_CONFIG, handler_workers=1))
+
+    async def ask(text, delay=0.0):
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        _, payload = await server.route("POST", QUERY_PATH, json.dumps({"text": text}).encode("utf-8"))
+        return payload["category_name"], time.perf_counter() - start
+
+    async def main():
+        server.batcher.start()
+        try:
+            return await asyncio.gather(
+                *(ask(f"tell me a joke number {i}") for i in range(4)),
+                ask("safety rules", delay=0.1),
+            )
+        finally:
+            await server.batcher.stop()
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        server.executor.shutdown()
+    assert [name for name, _ in results] == ["others"] * 4 + ["safety"]
+    # The fast intent is answered while every fallback is still waiting on the model
+    assert results[-1][1] < 0.5
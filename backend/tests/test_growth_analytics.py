@@ -0,0 +1,137 @@
+import threading
+
+import numpy as np
+import pytest
+
+from earnings_engine import TripLedger
+from growth_analytics import DAY_SECONDS, HISTORY_DAYS, GrowthTracker
+
+DAY = 20000
+
+def flat_history(values):
+    """history() giving each driver a constant daily net from `values`"""
+    def history(driver_id, day):
+        return np.full(HISTORY_DAYS, float(values[driver_id])), 0.0
+    return history
+
+def test_slow_history_does_not_block_other_drivers():
+    release = threading.Event()
+    values = {"slow": 10.0, "fast": 20.0}
+
+    def history(driver_id, day):
+        if driver_id == "slow":
+            assert release.wait(5)
+        return flat_history(values)(driver_id, day)
+
+    tracker = GrowthTracker(day=DAY, history=history)
+    slow = threading.Thread(target=tracker.row, args=("slow",))
+    slow.start()
+    try:
+        assert tracker.driver_metrics("fast", now=DAY * DAY_SECONDS)["week"] == pytest.approx(140.0)
+        driver_ids, _ = tracker.fleet_report(now=DAY * DAY_SECONDS)
+        assert driver_ids == ["fast"]
+    finally:
+        release.set()
+        slow.join()
+    assert tracker.driver_metrics("slow", now=DAY * DAY_SECONDS)["week"] == pytest.approx(70.0)
+
+def test_rows_are_bounded_least_recently_used_first():
+    values = {"a": 1.0, "b": 2.0, "c": 3.0}
+    tracker = GrowthTracker(day=DAY, history=flat_history(values), max_drivers=2)
+    tracker.row("a")
+    tracker.row("b")
+    tracker.row("a")
+    tracker.row("c")
+
+    assert len(tracker) == 2
+    assert "b" not in tracker.rows
+    driver_ids, metrics = tracker.fleet_report(now=DAY * DAY_SECONDS)
+    assert sorted(driver_ids) == ["a", "c"]
+    for driver_id, week in zip(driver_ids, metrics["week"]):
+        assert week == pytest.approx(7 * values[driver_id])
+
+def test_listener_skips_untracked_drivers():
+    tracker = GrowthTracker(day=DAY, history=flat_history({"a": 1.0, "b": 1.0}))
+    tracker.row("a")
+    trips = TripLedger({"timestamp": [DAY * DAY_SECONDS + 60], "fare": [100.0]})
+
+    tracker.record_trips("a", trips)
+    tracker.record_trips("b", trips)
+
+    assert "b" not in tracker.rows
+    assert tracker.today[tracker.rows["a"]] == pytest.approx(100.0 - trips.travel_cost_per_trip()[0])
+
+def brute_force(daily, day):
+    """Every metric recomputed from {day: net} for the complete days before `day`"""
+    history = np.array([daily.get(day - age, 0.0) for age in range(HISTORY_DAYS, 0, -1)])   # oldest first
+    week, previous_week = history[-7:].sum(), history[-14:-7].sum()
+    month, previous_month = history[-30:].sum(), history[-60:-30].sum()
+    slope, intercept = np.polyfit(np.arange(30), history[-30:], 1)
+    return {
+        "week": week,
+        "previous_week": previous_week,
+        "week_over_week": (week - previous_week) / abs(previous_week) if previous_week else np.nan,
+        "month": month,
+        "previous_month": previous_month,
+        "month_over_month": (month - previous_month) / abs(previous_month) if previous_month else np.nan,
+        "moving_average_7d": week / 7,
+        "moving_average_30d": month / 30,
+        "trend_per_day": slope,
+        "projected_next_7d": sum(intercept + slope * x for x in range(30, 37)),
+        "projected_next_30d": sum(intercept + slope * x for x in range(30, 60)),
+    }
+
+def assert_matches(tracker, daily, day):
+    driver_ids, metrics = tracker.fleet_report(now=day * DAY_SECONDS)
+    for i, driver_id in enumerate(driver_ids):
+        expected = brute_force(daily[driver_id], day)
+        for name, value in expected.items():
+            assert metrics[name][i] == pytest.approx(value, rel=1e-9, abs=1e-6, nan_ok=True), (driver_id, day, name)
+        assert tracker.driver_metrics(driver_id, now=day * DAY_SECONDS)["week"] == pytest.approx(expected["week"], abs=1e-6)
+
+def test_metrics_match_a_brute_force_recompute_across_gaps():
+    rng = np.random.default_rng(7)
+    tracker = GrowthTracker(day=DAY)
+    daily = {"a": {}, "b": {}}
+
+    def trip(driver_id, day, value):
+        tracker.record(driver_id, day * DAY_SECONDS + int(rng.integers(0, DAY_SECONDS)), value)
+        daily[driver_id][day] = daily[driver_id].get(day, 0.0) + value
+
+    # 75 days of trips, with a 5-day gap for both drivers and "b" idle for 12 days
+    for day in range(DAY, DAY + 75):
+        if DAY + 40 <= day < DAY + 45:
+            continue
+        for driver_id in ("a", "b"):
+            if driver_id == "b" and DAY + 50 <= day < DAY + 62:
+                continue
+            for _ in range(int(rng.integers(1, 4))):
+                trip(driver_id, day, float(rng.uniform(-50, 400)))
+        if day % 9 == 0:
+            assert_matches(tracker, daily, day)
+
+    # A late trip for a day that is already complete
+    trip("a", DAY + 70, 123.0)
+    assert_matches(tracker, daily, DAY + 75)
+
+    # Days pass with no trips at all; the windows roll over on their own
+    for day in (DAY + 78, DAY + 90, DAY + 110, DAY + 134, DAY + 136):
+        assert_matches(tracker, daily, day)
+
+    # A gap longer than the whole history clears every window
+    assert_matches(tracker, daily, DAY + 300)
+    driver_ids, metrics = tracker.fleet_report(now=(DAY + 300) * DAY_SECONDS)
+    assert np.all(metrics["month"] == 0.0)
+    assert np.all(np.isnan(metrics["week_over_week"]))
+
+def test_seeded_history_matches_a_brute_force_recompute():
+    rng = np.random.default_rng(11)
+    seeded = rng.uniform(0, 500, HISTORY_DAYS)
+    daily = {"a": {DAY - HISTORY_DAYS + i: value for i, value in enumerate(seeded)}}
+    daily["a"][DAY] = 80.0
+
+    tracker = GrowthTracker(day=DAY, history=lambda driver_id, day: (seeded, 80.0))
+    assert_matches(tracker, daily, DAY)
+    # Today's seeded net enters the windows when the day rolls over, then three idle days
+    assert_matches(tracker, daily, DAY + 1)
+    assert_matches(tracker, daily, DAY + 4)
@@ -0,0 +1,39 @@
+import sys
+import types
+
+import pytest
+
+from config import CATEGORIES, HANDLERS
+from handler_registry import HandlerRegistry
+
+@pytest.fixture
+def handlers_module(monkeypatch):
+    module = types.ModuleType("fake_handlers")
+    module.__spec__ = types.SimpleNamespace(name="fake_handlers")
+    monkeypatch.setitem(sys.modules, "fake_handlers", module)
+    return module
+
+def registry_with(module, name):
+    handlers = dict(HANDLERS, default=f"fake_handlers:{name}")
+    return HandlerRegistry(CATEGORIES, handlers)
+
+def test_single_argument_handler_is_rejected_when_loaded(handlers_module):
+    handlers_module.old = lambda request: "reply"
+    registry = registry_with(handlers_module, "old")
+    with pytest.raises(ValueError, match=r"'fake_handlers:old' must accept \(request, session\)"):
+        registry.get("default")
+    assert "default" not in registry.loaded()
+
+@pytest.mark.parametrize("handler", [
+    lambda request, session: "reply",
+    lambda request, session=None: "reply",
+    lambda *args: "reply",
+])
+def test_two_argument_handlers_load(handlers_module, handler):
+    handlers_module.handler = handler
+    assert registry_with(handlers_module, "handler").get("default") is handler
+
+def test_preload_checks_every_shipped_handler():
+    registry = HandlerRegistry(CATEGORIES, HANDLERS)
+    registry.preload()
+    assert sorted(registry.loaded(), key=str) == sorted(HANDLERS, key=str)
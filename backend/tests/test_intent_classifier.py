@@ -0,0 +1,65 @@
+import pytest
+
+from config import CATEGORIES, FAST_PATH_RULES, MODEL_CONFIG, MODEL_PATH
+from utils import IntentClassifier
+
+@pytest.fixture
+def classifier():
+    classifier = IntentClassifier(MODEL_CONFIG, CATEGORIES)
+    classifier.load_model(MODEL_PATH)
+    return classifier
+
+def test_shadow_batch_records_saveable_model_time(classifier):
+    classifier.enable_fast_path(FAST_PATH_RULES, 'shadow')
+    results = classifier.predict_batch(["weather today", "safety rules", "show my earnings"])
+    assert len(results) == 3
+
+    stats = classifier.router.stats()
+    assert stats["fires"] == 2
+    assert stats["agreements"] + stats["disagreements"] == 2
+    assert stats["model_ms_saveable"] > 0
+
+def test_batch_path_observes_each_stage(classifier):
+    from instrumentation import Instrumentation
+
+    classifier.instrumentation = Instrumentation()
+    classifier.predict_batch(["show my earnings", "business plan"])
+    stages = {stage for stage, _ in classifier.instrumentation.stages}
+    assert {"batch", "preprocess", "vectorize", "score"} <= stages
+
+def test_failed_batch_keeps_stdout_jsonl(classifier, capsys):
+    import io
+    import json
+    import sys
+
+    from main import run_batch
+
+    vectorize = classifier._vectorize
+
+    def failing(texts):
+        if any("broken" in text for text in texts):
+            raise ValueError("bad record")
+        return vectorize(texts)
+
+    classifier._vectorize = failing
+    stream = io.StringIO("show my earnings\nbroken record\nsafety rules\nbusiness plan\n")
+    run_batch(classifier, stream, sys.stdout, batch_size=2)
+
+    captured = capsys.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    assert [record["text"] for record in records] == ["show my earnings", "broken record", "safety rules", "business plan"]
+    # Only the failing chunk falls back to the default label
+    assert [record["category_name"] for record in records[:2]] == ["others", "others"]
+    assert records[3]["category_name"] == "business"
+    assert "Error in batch prediction: bad record" in captured.err
+
+def test_failed_prediction_is_reported_on_stderr(classifier, capsys):
+    def failing(texts):
+        raise ValueError("bad record")
+
+    classifier._vectorize = failing
+    result = classifier.classify("broken record")
+    assert result["category_name"] == "others"
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "Error in prediction: bad record" in captured.err
@@ -0,0 +1,63 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from compiled_model import compile_pipeline
+from config import MODEL_CONFIG
+from model_artifact import load_artifact, read_manifest, save_artifact
+from model_build import build_pipeline
+from training_data import training_data
+
+@pytest.fixture(scope="module")
+def compiled():
+    pipeline, _, _ = build_pipeline(MODEL_CONFIG, training_data)
+    return compile_pipeline(pipeline)
+
+def test_round_trip(compiled, tmp_path):
+    directory = str(tmp_path / "model")
+    save_artifact(compiled, directory, "fp")
+    model, manifest = load_artifact(directory, "fp")
+    texts = [text for text, _ in training_data]
+    np.testing.assert_array_equal(model.predict_proba(texts), compiled.predict_proba(texts))
+    assert manifest["fingerprint"] == "fp"
+
+def test_missing_artifact_fails_fast(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_manifest(str(tmp_path / "missing"))
+
+def test_load_waits_out_the_swap_gap(compiled, tmp_path):
+    # Freeze save_artifact between its two renames: nothing exists at `directory`
+    directory = str(tmp_path / "model")
+    save_artifact(compiled, directory, "fp-new")
+    os.rename(directory, f"{directory}.tmp-1")
+    os.makedirs(f"{directory}.old-1")
+    finish = threading.Timer(0.05, os.rename, (f"{directory}.tmp-1", directory))
+    finish.start()
+    try:
+        _, manifest = load_artifact(directory)
+    finally:
+        finish.join()
+    assert manifest["fingerprint"] == "fp-new"
+
+def test_load_retries_a_mixed_read(compiled, tmp_path, monkeypatch):
+    # The manifest changes between reading it and loading the arrays
+    import model_artifact
+
+    directory = str(tmp_path / "model")
+    save_artifact(compiled, directory, "fp-old")
+    load = model_artifact._load_artifact
+    calls = []
+
+    def load_then_replace(*args):
+        result = load(*args)
+        if not calls:
+            save_artifact(compiled, directory, "fp-new")
+        calls.append(result[1]["fingerprint"])
+        return result
+
+    monkeypatch.setattr(model_artifact, "_load_artifact", load_then_replace)
+    _, manifest = load_artifact(directory)
+    assert calls == ["fp-old", "fp-new"]
+    assert manifest["fingerprint"] == "fp-new"
@@ -0,0 +1,38 @@
+import copy
+
+import pytest
+
+import model_build
+from config import CATEGORIES, MODEL_CONFIG
+from online_model import build_online_model
+from training_data import training_data
+from utils import IntentClassifier
+
+ONLINE_CONFIG = dict(copy.deepcopy(MODEL_CONFIG), model_type='hashing_sgd')
+ONLINE_CONFIG['online'] = dict(ONLINE_CONFIG['online'], epochs=2)
+
+def test_online_build_uses_the_batch_split(monkeypatch):
+    calls = []
+    split = model_build.split_training_data
+
+    def spy(data):
+        calls.append(data)
+        return split(data)
+
+    monkeypatch.setattr(model_build, "split_training_data", spy)
+    _, metrics = build_online_model(ONLINE_CONFIG, training_data, [str(key) for key in CATEGORIES])
+
+    assert calls == [training_data]
+    texts_train, texts_test, _, _ = split(training_data)
+    assert (metrics["train_examples"], metrics["test_examples"]) == (len(texts_train), len(texts_test))
+
+def test_compaction_of_the_online_model_is_rejected_before_training(monkeypatch):
+    config = copy.deepcopy(ONLINE_CONFIG)
+    config['compaction']['enabled'] = True
+
+    def fail(*args):
+        raise AssertionError("trained before rejecting the config")
+
+    monkeypatch.setattr("online_model.build_online_model", fail)
+    with pytest.raises(ValueError, match="tfidf_logreg"):
+        IntentClassifier(config, CATEGORIES).train(training_data)
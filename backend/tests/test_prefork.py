@@ -0,0 +1,34 @@
+from prefork import PreforkServer
+
+CONFIG = {'workers': 2, 'heartbeat_seconds': 1, 'worker_startup_seconds': 5}
+
+def test_reload_waits_while_the_previous_generation_drains():
+    reloads = []
+    server = PreforkServer(None, CONFIG, "unused", lambda: reloads.append(1))
+    # Current generation plus one old worker still draining: only one slot left
+    server.table.rows["pid"][:3] = [101, 102, 103]
+
+    assert server.reload() is False
+    assert reloads == []
+    assert server._reload_requested
+
+    # Once the old worker is reaped the retried reload can proceed
+    server.table.rows["pid"][2] = 0
+    assert server.table.free_slots() == 2
+
+def test_handlers_are_imported_before_freezing():
+    import gc
+    import types
+
+    from config import CATEGORIES, HANDLERS
+    from handler_registry import HandlerRegistry
+
+    agent = types.SimpleNamespace(handlers=HandlerRegistry(CATEGORIES, HANDLERS))
+    server = PreforkServer(agent, CONFIG, "unused", None)
+    assert agent.handlers.loaded() == []
+    try:
+        server._freeze()
+        assert sorted(agent.handlers.loaded(), key=str) == sorted(HANDLERS, key=str)
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
@@ -0,0 +1,70 @@
+import pytest
+
+from config import CATEGORIES, CONFIDENCE_THRESHOLD, MODEL_CONFIG, MODEL_PATH
+from earnings_store import EarningsStore, _seed_from_trip_ledger, set_earnings_store
+from session_store import SessionStore
+from utils import IntentClassifier, QueryAgent
+
+@pytest.fixture
+def agent(tmp_path):
+    set_earnings_store(EarningsStore(str(tmp_path), seed=_seed_from_trip_ledger))
+    classifier = IntentClassifier(MODEL_CONFIG, CATEGORIES)
+    classifier.load_model(MODEL_PATH)
+    yield QueryAgent(classifier, CONFIDENCE_THRESHOLD, sessions=SessionStore())
+    set_earnings_store(None)
+
+def test_answer_to_a_follow_up_goes_back_to_the_handler(agent):
+    assert agent.run("safety protocols", "9")["category_name"] == "safety"
+    assert agent.sessions.get("9").pending_slot == "topic"
+
+    result = agent.run("accident", "9")
+    assert result["category_name"] == "safety"
+    assert result["source"] == "session"
+    assert result["response"].startswith("If you are in an accident")
+    assert agent.sessions.get("9").pending_slot is None
+
+def test_new_question_is_not_swallowed_by_a_pending_follow_up(agent):
+    agent.run("safety protocols", "9")
+
+    result = agent.run("what are my earnings today?", "9")
+    assert result["category_name"] == "daily_earning"
+    assert result["source"] == "model"
+    assert result["response"].startswith(("Your earnings today", "You have no completed trips"))
+    # The unanswered follow-up is dropped
+    assert agent.sessions.get("9").pending_slot is None
+
+def test_improve_earning_follow_up(agent):
+    agent.run("how can I improve my earnings", "8")
+    assert agent.sessions.get("8").pending_slot == "focus"
+
+    result = agent.run("costs", "8")
+    assert result["category_name"] == "improve_earning"
+    assert result["source"] == "session"
+    assert "commission, penalties and travel cost" in result["response"]
+
+def test_follow_ups_are_per_driver(agent):
+    agent.run("safety protocols", "1")
+    result = agent.run("accident", "2")
+    assert result["source"] != "session"
+    assert agent.sessions.get("1").pending_slot == "topic"
+
+@pytest.mark.parametrize("date", ["2024-02-30", "2024-13-01"])
+def test_invalid_date_gets_a_reply_not_an_error(agent, date):
+    result = agent.run(f"daily earnings on {date}", "42")
+    assert result["category_name"] == "daily_earning"
+    assert "please give a valid date (yyyy-mm-dd)" in result["response"].lower()
+
+def test_valid_date_is_answered(agent):
+    result = agent.run("daily earnings on 2024-02-29", "42")
+    assert result["category_name"] == "daily_earning"
+    assert "2024-02-29" in result["response"]
+
+def test_weather_follow_up(agent):
+    assert agent.run("what's the weather like", "7")["category_name"] == "weather"
+    assert agent.sessions.get("7").pending_slot == "place"
+
+    result = agent.run("Bandra this evening", "7")
+    assert result["category_name"] == "weather"
+    assert result["source"] == "session"
+    assert "Bandra this evening" in result["response"]
+    assert agent.sessions.get("7").pending_slot is None
@@ -0,0 +1,26 @@
+import pytest
+
+import replay
+from config import CATEGORIES, CONFIDENCE_THRESHOLD, MODEL_PATH
+
+@pytest.fixture
+def models():
+    classifier = replay._load_classifier(MODEL_PATH, CATEGORIES)
+    replay._models = (classifier, classifier, CONFIDENCE_THRESHOLD)
+    yield
+    replay._models = None
+
+def test_batched_throughput_counts_distinct_texts_labelled(models):
+    lines = ["show my earnings"] * 8 + ['{"text": "business plan"}', "", "safety rules"]
+    part = replay.replay_chunk((lines, 0, 1000))
+    assert part["queries"] == 10
+    assert part["labelled"] == 3
+
+    names, _ = replay._label_index(CATEGORIES)
+    total = replay._empty_counts(len(names))
+    replay._merge(total, part)
+    total["batch_seconds"][:] = 0.5
+    summary = replay.summarize(total, names, 1.0, 1)
+    assert summary["labelled"] == 3
+    assert summary["models"]["baseline"]["batched_queries_per_second"] == 6.0
+    assert summary["agreement"] == 1.0
@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+import pytest
+
+from server import QUERY_PATH, MicroBatcher
+
+def query(server, *payloads):
+    """(status, payload) for each request body, sent in turn on one event loop"""
+    async def send():
+        server.batcher.start()
+        try:
+            return [
+                await server.route("POST", QUERY_PATH, json.dumps(payload).encode("utf-8"))
+                for payload in payloads
+            ]
+        finally:
+            await server.batcher.stop()
+    return asyncio.run(send())
+
+@pytest.mark.parametrize("driver_id", ["../../../../tmp/evil_driver", "a/b", "..", "", True])
+def test_rejects_unsafe_driver_ids(server, driver_id):
+    [(status, payload)] = query(server, {"text": "daily earnings yesterday", "driver_id": driver_id})
+    assert status == 400
+    assert "driver_id" in payload["error"]
+    assert len(server.agent.sessions) == 0
+
+def test_new_question_during_a_follow_up_is_classified(server, tmp_path):
+    from earnings_store import EarningsStore, _seed_from_trip_ledger, set_earnings_store
+
+    set_earnings_store(EarningsStore(str(tmp_path), seed=_seed_from_trip_ledger))
+    try:
+        (_, asked), (status, answered), _, (_, resumed) = query(
+            server,
+            {"text": "safety protocols", "driver_id": "9"},
+            {"text": "what are my earnings today?", "driver_id": "9"},
+            {"text": "safety protocols", "driver_id": "9"},
+            {"text": "accident", "driver_id": "9"},
+        )
+        assert asked["awaiting"] == "topic"
+        assert status == 200
+        assert answered["category_name"] == "daily_earning"
+        assert answered["awaiting"] is None
+        assert resumed["category_name"] == "safety"
+        assert resumed["reply"].startswith("If you are in an accident")
+    finally:
+        set_earnings_store(None)
+
+class RecordingAgent:
+    """process_batch stand-in that records each batch it is given"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def process_batch(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model down")
+        return [text.upper() for text in texts]
+
+def run_batcher(agent, max_batch_size, max_wait_ms, arrivals):
+    """Classify each group of texts concurrently, pausing `gap` seconds before each group"""
+    async def main():
+        batcher = MicroBatcher(agent, None, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        batcher.start()
+        try:
+            results = []
+            for gap, texts in arrivals:
+                await asyncio.sleep(gap)
+                results += await asyncio.gather(*(batcher.classify(text) for text in texts), return_exceptions=True)
+            return batcher, results
+        finally:
+            await batcher.stop()
+    return asyncio.run(main())
+
+def test_batcher_collects_requests_arriving_within_the_window():
+    agent = RecordingAgent()
+    batcher, results = run_batcher(agent, 32, 50, [(0, ["a", "b", "c", "d", "e"])])
+    assert agent.batches == [["a", "b", "c", "d", "e"]]
+    assert results == ["A", "B", "C", "D", "E"]
+    assert (batcher.batches, batcher.requests) == (1, 5)
+
+def test_batcher_caps_batch_size():
+    agent = RecordingAgent()
+    _, results = run_batcher(agent, 4, 50, [(0, [str(i) for i in range(10)])])
+    assert [len(batch) for batch in agent.batches] == [4, 4, 2]
+    assert results == [str(i) for i in range(10)]
+
+def test_batcher_does_not_wait_past_the_window():
+    agent = RecordingAgent()
+    run_batcher(agent, 32, 10, [(0, ["a"]), (0.1, ["b"])])
+    assert agent.batches == [["a"], ["b"]]
+
+def test_batcher_fails_the_batch_and_keeps_running():
+    agent = RecordingAgent(fail=True)
+    _, results = run_batcher(agent, 32, 10, [(0, ["a", "b"]), (0.05, ["c"])])
+    assert [str(result) for result in results] == ["model down"] * 3
+    assert len(agent.batches) == 2
+
+def post(body, headers):
+    head = f"POST {QUERY_PATH} HTTP/1.1\r\nHost: test\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    return head.encode("latin-1") + b"\r\n" + body
+
+def status_and_payload(response):
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_rejected(http, length):
+    status, payload = status_and_payload(http(post(b"{}", {"Content-Length": length})))
+    assert status == 400
+    assert payload == {"error": "Invalid Content-Length"}
+
+def test_body_over_the_limit_is_rejected(http, server):
+    body = b"x" * (server.config['max_body_bytes'] + 1)
+    status, payload = status_and_payload(http(post(body, {"Content-Length": len(body)})))
+    assert status == 413
+    assert payload == {"error": "Request body too large"}
+
+def test_chunked_body_is_rejected_not_read_as_empty(http):
+    body = json.dumps({"text": "show my earnings"}).encode("utf-8")
+    chunked = b"%x\r\n%s\r\n0\r\n\r\n" % (len(body), body)
+    status, payload = status_and_payload(http(post(chunked, {"Transfer-Encoding": "chunked"})))
+    assert status == 411
+    assert "Content-Length" in payload["error"]
+
+def test_query_over_http(http):
+    body = json.dumps({"text": "safety rules"}).encode("utf-8")
+    status, payload = status_and_payload(http(post(body, {"Content-Length": len(body), "Connection": "close"})))
+    assert status == 200
+    assert payload["category_name"] == "safety"
+
+def test_healthz(http):
+    status, payload = status_and_payload(http(b"GET /healthz HTTP/1.1\r\nConnection: close\r\n\r\n"))
+    assert status == 200
+    assert payload["status"] == "ok"
+    assert payload["model_version"]
+    assert {"pid", "batches", "requests", "cache", "fast_path", "sessions"} <= set(payload)
+    assert payload["sessions"]["sessions"] == 0
+    assert "workers" not in payload
+
+def test_metrics(http, server):
+    status, payload = status_and_payload(http(b"GET /metrics HTTP/1.1\r\nConnection: close\r\n\r\n"))
+    assert status == 404
+
+    from instrumentation import Instrumentation
+
+    server.agent.classifier.instrumentation = Instrumentation()
+    query(server, {"text": "safety rules"})
+    response = http(b"GET /metrics HTTP/1.1\r\nConnection: close\r\n\r\n")
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    assert b"Content-Type: text/plain; version=0.0.4" in head
+    text = body.decode("utf-8")
+    assert 'saathi_classifications_total{category="safety"} 1' in text
+    assert 'saathi_stage_seconds_count{stage="batch"} 1' in text
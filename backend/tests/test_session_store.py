@@ -0,0 +1,54 @@
+import pytest
+
+from session_store import SessionStore, valid_driver_id
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.mark.parametrize("driver_id", ["123", 123, "driver_7", "a-b", "x" * 64])
+def test_accepts_plain_driver_ids(driver_id):
+    assert valid_driver_id(driver_id)
+
+@pytest.mark.parametrize("driver_id", [
+    "", " ", "../../../../tmp/evil_driver", "a/b", "..", "a.b", "a b", "x" * 65, "é",
+    True, None, 1.5, ["1"],
+])
+def test_rejects_other_driver_ids(driver_id):
+    assert not valid_driver_id(driver_id)
+    with pytest.raises(ValueError):
+        SessionStore().get(driver_id)
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionStore(max_sessions=2)
+    first = store.get("1")
+    store.get("2")
+    store.get("1")
+    store.get("3")
+
+    assert len(store) == 2
+    assert store.get("1") is first
+    assert store.stats()["evictions"] == 1
+
+def test_idle_sessions_expire():
+    clock = FakeClock()
+    store = SessionStore(idle_ttl_seconds=900, clock=clock)
+    first = store.get("1")
+    clock.now += 901
+
+    assert store.get("1") is not first
+    assert store.stats()["expirations"] == 1
+
+def test_session_data_stays_under_max_bytes():
+    store = SessionStore(max_bytes=4096)
+    one = store.get("1")
+    one.fetch("blob", lambda: b"x" * 2000)
+    two = store.get("2")
+    two.fetch("blob", lambda: b"x" * 2000)
+
+    assert store.nbytes <= 4096
+    assert len(store) == 1
+    assert one.store is None
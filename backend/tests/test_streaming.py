@@ -0,0 +1,216 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from server import QUERY_PATH
+from utils import join_fragments
+
+@pytest.fixture
+def handle(server):
+    """Route every category to the given handler function"""
+    def use(handler):
+        for category_id in server.agent.handlers.paths:
+            server.agent.handlers._loaded[category_id] = handler
+    return use
+
+def parse_events(data):
+    events = []
+    for block in data.decode("utf-8").split("\n\n"):
+        if block:
+            event, payload = block.split("\n")
+            events.append((event.removeprefix("event: "), json.loads(payload.removeprefix("data: "))))
+    return events
+
+def stream(server, payload, headers=None):
+    """(status, [(event, data), ...]) for one streamed query"""
+    async def send():
+        server.batcher.start()
+        try:
+            status, events = await server.route("POST", QUERY_PATH, json.dumps(payload).encode("utf-8"), headers)
+            return status, parse_events(b"".join([event async for event in events]))
+        finally:
+            await server.batcher.stop()
+    return asyncio.run(send())
+
+def names(events):
+    return [event for event, _ in events]
+
+def chunks(events):
+    return [data["text"] for event, data in events if event == "chunk"]
+
+ACCEPT_STREAM = {"accept": "text/event-stream"}
+
+def test_string_reply_is_one_chunk(server, handle):
+    handle(lambda request, session: "whole reply")
+    status, events = stream(server, {"text": "show my earnings"}, ACCEPT_STREAM)
+    assert status == 200
+    assert names(events) == ["intent", "chunk", "done"]
+    assert events[0][1]["category_name"] == "earning"
+    assert chunks(events) == ["whole reply"]
+    assert events[-1][1]["awaiting"] is None
+
+def test_generator_runs_on_the_handler_pool(server, handle):
+    threads = []
+
+    def handler(request, session):
+        threads.append(threading.current_thread())
+        yield "one "
+        yield ""          # empty fragments are not sent
+        threads.append(threading.current_thread())
+        yield "two"
+
+    handle(handler)
+    status, events = stream(server, {"text": "show my earnings", "stream": True})
+    assert status == 200
+    assert names(events) == ["intent", "chunk", "chunk", "done"]
+    assert chunks(events) == ["one ", "two"]
+    assert threading.current_thread() not in threads
+
+def test_async_generator_runs_on_the_loop(server, handle):
+    threads = []
+
+    async def handler(request, session):
+        threads.append(threading.current_thread())
+        yield "one "
+        await asyncio.sleep(0)
+        yield "two"
+
+    handle(handler)
+    _, events = stream(server, {"text": "show my earnings"}, ACCEPT_STREAM)
+    assert names(events) == ["intent", "chunk", "chunk", "done"]
+    assert chunks(events) == ["one ", "two"]
+    assert threads == [threading.current_thread()]
+
+def failing_generator(request, session):
+    yield "partial"
+    raise RuntimeError("upstream broke")
+
+async def failing_async_generator(request, session):
+    yield "partial"
+    raise RuntimeError("upstream broke")
+
+def failing_function(request, session):
+    raise RuntimeError("upstream broke")
+
+@pytest.mark.parametrize("handler, sent", [
+    (failing_generator, ["partial"]),
+    (failing_async_generator, ["partial"]),
+    (failing_function, []),
+])
+def test_failure_ends_the_stream_with_an_error_event(server, handle, handler, sent):
+    handle(handler)
+    _, events = stream(server, {"text": "show my earnings", "driver_id": "5"}, ACCEPT_STREAM)
+    assert names(events) == ["intent"] + ["chunk"] * len(sent) + ["error"]
+    assert chunks(events) == sent
+    assert events[-1][1] == {"error": "Internal server error"}
+    # The turn still ended
+    assert server.agent.sessions.get("5").followup is None
+
+def test_follow_up_asked_while_streaming_is_pending_on_done(server, handle):
+    def handler(request, session):
+        yield "Which one?"
+        session.ask("choice", lambda message: True)
+
+    handle(handler)
+    _, events = stream(server, {"text": "show my earnings", "driver_id": "5"}, ACCEPT_STREAM)
+    assert events[-1] == ("done", {"awaiting": "choice", "latency_ms": events[-1][1]["latency_ms"]})
+
+def test_turn_ends_after_the_handler_when_the_client_stops_reading(server, handle):
+    release = threading.Event()
+
+    def handler(request, session):
+        yield "first"
+        release.wait(5)
+        session.ask("choice", lambda message: True)
+        yield "second"
+
+    handle(handler)
+
+    async def read_one_chunk():
+        server.batcher.start()
+        try:
+            _, events = await server.route(
+                "POST", QUERY_PATH, json.dumps({"text": "show my earnings", "driver_id": "5"}).encode(), ACCEPT_STREAM,
+            )
+            assert parse_events(await events.__anext__())[0][0] == "intent"
+            assert parse_events(await events.__anext__())[0][0] == "chunk"
+            # The client goes away while the handler is still between fragments
+            threading.Timer(0.05, release.set).start()
+            await events.aclose()
+        finally:
+            await server.batcher.stop()
+
+    asyncio.run(read_one_chunk())
+    assert server.agent.sessions.get("5").pending_slot == "choice"
+
+def test_without_stream_fragments_are_joined(server, handle):
+    def handler(request, session):
+        yield "one "
+        yield "two"
+
+    handle(handler)
+
+    async def send():
+        server.batcher.start()
+        try:
+            return await server.route("POST", QUERY_PATH, json.dumps({"text": "show my earnings"}).encode("utf-8"))
+        finally:
+            await server.batcher.stop()
+
+    status, payload = asyncio.run(send())
+    assert status == 200
+    assert payload["reply"] == "one two"
+
+def request_bytes(version, body, headers=""):
+    body = json.dumps(body).encode("utf-8")
+    return (
+        f"POST {QUERY_PATH} {version}\r\nHost: test\r\nAccept: text/event-stream\r\n{headers}"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode("latin-1") + body
+
+def dechunk(body):
+    data = b""
+    while True:
+        size, _, body = body.partition(b"\r\n")
+        size = int(size, 16)
+        if not size:
+            assert body == b"\r\n"
+            return data
+        data, body = data + body[:size], body[size + 2:]
+
+def test_http_1_1_stream_is_chunked(http, handle):
+    handle(lambda request, session: iter(["one ", "two"]))
+    response = http(request_bytes("HTTP/1.1", {"text": "show my earnings"}, "Connection: close\r\n"))
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert b"Transfer-Encoding: chunked" in head
+    assert b"Content-Type: text/event-stream" in head
+    events = parse_events(dechunk(body))
+    assert names(events) == ["intent", "chunk", "chunk", "done"]
+
+def test_http_1_0_stream_is_close_delimited(http, handle):
+    handle(lambda request, session: iter(["one ", "two"]))
+    response = http(request_bytes("HTTP/1.0", {"text": "show my earnings"}))
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert b"Transfer-Encoding" not in head
+    assert b"Connection: close" in head
+    assert chunks(parse_events(body)) == ["one ", "two"]
+
+def test_join_fragments_shapes():
+    async def fragments():
+        yield "a"
+        await asyncio.sleep(0)
+        yield "b"
+
+    assert join_fragments("ab") == "ab"
+    assert join_fragments(iter(["a", "b"])) == "ab"
+    assert join_fragments(fragments()) == "ab"
+
+def test_agent_run_joins_an_async_handler(server, handle):
+    async def handler(request, session):
+        yield "one "
+        yield "two"
+
+    handle(handler)
+    assert server.agent.run("show my earnings")["response"] == "one two"
@@ -0,0 +1,156 @@
+"""
+Cross-validated hyperparameter search for MODEL_CONFIG.
+
+Every vectorizer setting in the grid is one task in a process pool. A task
+fits the vectorizer once per stratified fold and reuses the resulting
+TF-IDF matrices for every classifier setting, then refits on all data to
+measure what each configuration costs at serving time: compiled model
+size and per-query latency. The report lists accuracy against those costs
+and flags the Pareto-optimal configurations.
+"""
+
+import copy
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+def expand_grid(grid):
+    """{'C': [1, 2], 'tol': [0.1]} -> [{'C': 1, 'tol': 0.1}, {'C': 2, 'tol': 0.1}]"""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+def model_size_bytes(compiled):
+    return int(sum(array.nbytes for array in compiled.to_arrays().values()))
+
+def latency_us(compiled, texts, repeats=3):
+    """Median per-query latency of the compiled serving path"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in texts:
+            compiled.predict_proba([text])
+        samples.append((time.perf_counter() - start) / len(texts))
+    return float(np.median(samples) * 1e6)
+
+def evaluate_vectorizer(task):
+    """Score every classifier setting against one vectorizer setting"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.pipeline import Pipeline
+    from compiled_model import compile_pipeline
+
+    base_config, tfidf_params, classifier_grid, training_data, n_folds, seed = task
+    tfidf_config = dict(base_config['tfidf'], **tfidf_params)
+    texts = np.asarray([text for text, _ in training_data], dtype=object)
+    labels = np.asarray([str(label) for _, label in training_data])
+
+    fold_scores = {i: [] for i in range(len(classifier_grid))}
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+
+    for train_index, test_index in folds.split(texts, labels):
+        vectorizer = TfidfVectorizer(**tfidf_config)
+        X_train = vectorizer.fit_transform(texts[train_index])
+        X_test = vectorizer.transform(texts[test_index])
+
+        for i, classifier_params in enumerate(classifier_grid):
+            clf = LogisticRegression(**dict(base_config['classifier'], **classifier_params))
+            clf.fit(X_train, labels[train_index])
+            fold_scores[i].append(float((clf.predict(X_test) == labels[test_index]).mean()))
+
+    vectorizer = TfidfVectorizer(**tfidf_config)
+    X_all = vectorizer.fit_transform(texts)
+    results = []
+
+    for i, classifier_params in enumerate(classifier_grid):
+        clf = LogisticRegression(**dict(base_config['classifier'], **classifier_params))
+        clf.fit(X_all, labels)
+        compiled = compile_pipeline(Pipeline([('tfidf', vectorizer), ('clf', clf)]))
+
+        results.append({
+            "tfidf": tfidf_params,
+            "classifier": classifier_params,
+            "cv_accuracy_mean": round(float(np.mean(fold_scores[i])), 4),
+            "cv_accuracy_std": round(float(np.std(fold_scores[i])), 4),
+            "vocabulary_size": len(vectorizer.vocabulary_),
+            "model_size_bytes": model_size_bytes(compiled),
+            "latency_us": round(latency_us(compiled, list(texts)), 2),
+        })
+
+    return results
+
+def _dominates(a, b):
+    no_worse = (
+        a["cv_accuracy_mean"] >= b["cv_accuracy_mean"]
+        and a["model_size_bytes"] <= b["model_size_bytes"]
+        and a["latency_us"] <= b["latency_us"]
+    )
+    better = (
+        a["cv_accuracy_mean"] > b["cv_accuracy_mean"]
+        or a["model_size_bytes"] < b["model_size_bytes"]
+        or a["latency_us"] < b["latency_us"]
+    )
+    return no_worse and better
+
+def mark_pareto(results):
+    """Flag configs that no other config beats on accuracy, size and latency at once"""
+    for result in results:
+        result["pareto"] = not any(_dominates(other, result) for other in results)
+
+def tune(model_config, training_data, grid, n_folds=5, jobs=None, seed=42):
+    """Run the search and return (best_config, report)"""
+    vectorizer_grid = expand_grid(grid.get('tfidf', {}))
+    classifier_grid = expand_grid(grid.get('classifier', {}))
+    tasks = [
+        (model_config, tfidf_params, classifier_grid, training_data, n_folds, seed)
+        for tfidf_params in vectorizer_grid
+    ]
+
+    start = time.perf_counter()
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        results = [result for batch in pool.map(evaluate_vectorizer, tasks) for result in batch]
+
+    mark_pareto(results)
+    # Best accuracy wins; ties go to the smaller, then faster model
+    results.sort(key=lambda r: (-r["cv_accuracy_mean"], r["model_size_bytes"], r["latency_us"]))
+    best = results[0]
+
+    best_config = copy.deepcopy(model_config)
+    best_config['tfidf'].update(best["tfidf"])
+    best_config['classifier'].update(best["classifier"])
+
+    report = {
+        "folds": n_folds,
+        "jobs": jobs,
+        "configurations": len(results),
+        "elapsed_seconds": round(time.perf_counter() - start, 2),
+        "best": best,
+        "results": results,
+    }
+    return best_config, report
+
+def write_results(best_config, report, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    config_path = os.path.join(output_dir, "tuned_model_config.json")
+    report_path = os.path.join(output_dir, "tuning_report.json")
+
+    with open(config_path, "w") as f:
+        json.dump(best_config, f, indent=2)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    return config_path, report_path
+
+def print_report(report, limit=10):
+    print(f"{'accuracy':>9} {'size KB':>8} {'latency us':>11}  pareto  config")
+    for result in report["results"][:limit]:
+        print(
+            f"{result['cv_accuracy_mean']:>9.3f} {result['model_size_bytes'] / 1024:>8.1f} "
+            f"{result['latency_us']:>11.1f}  {'  *   ' if result['pareto'] else '      '}  "
+            f"{json.dumps({**result['tfidf'], **result['classifier']}, default=list)}"
+        )
@@ -1,19 +1,17 @@
+import asyncio
+import json
 import re
+import sys
+import time
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
 import pickle
 
-# Import all handler functions
-from response_handlers import (
-    handle_earning, handle_business, handle_safety, 
-    handle_quarterly_earning, handle_daily_earning,
-    handle_improve_earning, handle_growth, handle_weather,
-    handle_default
-)
+from compiled_model import compile_pipeline, check_parity
+from model_artifact import save_artifact, load_artifact
+from prediction_cache import PredictionCache
+from fast_path import KeywordRouter
+from handler_registry import HandlerRegistry
+from session_store import Session, get_session_store
 
 class TextPreprocessor:
     def preprocess(self, text: str) -> str:
@@ -29,28 +27,68 @@ class IntentClassifier:
         self.preprocessor = TextPreprocessor()
         self.model_config = model_config
         self.model = None
+        self.manifest = None
+        self.metrics = {}
+        self.model_version = 0
+        self.cache = None
+        self.router = None
+        self.instrumentation = None
+
+    def enable_cache(self, max_size=10000, ttl_seconds=None):
+        """Cache predictions keyed on preprocessed text and model version"""
+        self.cache = PredictionCache(max_size, ttl_seconds)
+
+    def enable_fast_path(self, rules, mode='shadow'):
+        """Route unambiguous keyword matches without running the model"""
+        self.router = KeywordRouter(rules, self.categories, self.preprocessor, mode)
+        if not self.router.enabled:
+            self.router = None
+
+    def _vectorize(self, texts):
+        return self.model.steps[0][1].transform(texts)
+
+    def _predict_proba(self, features):
+        return self.model.steps[-1][1].predict_proba(features)
+
+    def _set_model(self, model):
+        self.model = model
+        self.model_version += 1
+        if self.cache is not None:
+            self.cache.clear()
+
+    def train(self, training_data, cache_dir=None):
+        """Train the model with validation, reusing cached build stages when possible"""
+        online = self.model_config.get('model_type', 'tfidf_logreg') == 'hashing_sgd'
+        compaction = self.model_config.get('compaction', {})
+        if online and compaction.get('enabled'):
+            # Checked up front rather than after a full training run
+            raise ValueError("Only the 'tfidf_logreg' model can be compacted; disable "
+                             "MODEL_CONFIG['compaction'] for 'hashing_sgd'")
+
+        # sklearn is only needed for training, so serving from an artifact never imports it
+        if online:
+            from online_model import build_online_model
+            model, self.metrics = build_online_model(
+                self.model_config, training_data, [str(key) for key in self.categories]
+            )
+            cache_hits = {}
+        else:
+            from model_build import build_pipeline
+            model, self.metrics, cache_hits = build_pipeline(self.model_config, training_data, cache_dir)
+        self._set_model(model)
 
-    def train(self, training_data):
-        """Train the model with validation"""
-        texts, labels = zip(*training_data)
-        labels = [str(label) for label in labels]
-
-        X_train, X_test, y_train, y_test = train_test_split(
-            texts, labels, test_size=0.2, random_state=42, stratify=labels
-        )
-
-        self.model = Pipeline([
-            ('tfidf', TfidfVectorizer(**self.model_config['tfidf'])),
-            ('clf', LogisticRegression(**self.model_config['classifier']))
-        ])
-
-        self.model.fit(X_train, y_train)
+        for stage, hit in cache_hits.items():
+            print(f"{stage.capitalize()} stage: {'reused from cache' if hit else 'fitted'}")
 
-        train_preds = self.model.predict(X_train)
-        test_preds = self.model.predict(X_test)
+        if compaction.get('enabled'):
+            from model_build import split_training_data
+            _, texts_test, _, y_test = split_training_data(training_data)
+            result = self.compact(compaction['weight_dtype'], compaction['prune_threshold'], (texts_test, y_test))
+            print(f"Compacted to {compaction['weight_dtype']} (prune {compaction['prune_threshold']}): "
+                  f"test accuracy {result['accuracy']:.3f}, {result['model_size_bytes'] / 1024:.1f} KB")
 
-        train_acc = accuracy_score(y_train, train_preds)
-        test_acc = accuracy_score(y_test, test_preds)
+        train_acc = self.metrics["train_accuracy"]
+        test_acc = self.metrics["test_accuracy"]
 
         print(f"Training accuracy: {train_acc:.3f}")
         print(f"Test accuracy: {test_acc:.3f}")
@@ -60,103 +98,382 @@ class IntentClassifier:
         else:
             print("Warning: Model may need more training data or tuning")
 
-    def predict(self, request: str, confidence_threshold=0.3):
-        """Predict intent with confidence"""
+    def compact(self, weight_dtype="int8", prune_threshold=0.0, validation=None):
+        """Replace the TF-IDF model with a pruned, quantized copy (see model_compaction.py).
+
+        With validation=(texts, labels), returns and records its accuracy, size and latency.
+        """
+        from model_compaction import compact_model, evaluate
+
+        model = self.model if hasattr(self.model, 'to_arrays') else compile_pipeline(self.model)
+        compacted = compact_model(model, weight_dtype, prune_threshold)
+        result = None
+        if validation is not None:
+            result = evaluate(compacted, validation[0], validation[1], model)
+            self.metrics['compaction'] = dict(result, weight_dtype=weight_dtype, prune_threshold=prune_threshold)
+        self._set_model(compacted)
+        return result
+
+    def update(self, new_examples, batch_size=256):
+        """Fold new (text, label) examples into an online model without revisiting old data"""
+        if not hasattr(self.model, 'partial_fit'):
+            raise ValueError("update() needs MODEL_CONFIG['model_type'] = 'hashing_sgd'")
+
+        new_examples = list(new_examples)
+        for start in range(0, len(new_examples), batch_size):
+            texts, labels = zip(*new_examples[start:start + batch_size])
+            self.model.partial_fit(texts, labels)
+
+        self.metrics['examples_seen'] = self.model.examples_seen
+        # Predictions changed, so cached results must not be served
+        self._set_model(self.model)
+        return len(new_examples)
+
+    def classify(self, request: str, confidence_threshold=0.3):
+        """Preprocess, vectorize and score a request exactly once"""
+        timings = {}
+        start = time.perf_counter()
+        result = {
+            "category_id": "default",
+            "category_name": "others",
+            "confidence": 0.0,
+            "source": "model",
+            "timings": timings,
+        }
+
         try:
             processed_text = self.preprocessor.preprocess(request)
+            timings['preprocess_ms'] = (time.perf_counter() - start) * 1000
 
             if not processed_text.strip():
-                return "default", "others", 0.0
+                return result
+
+            rule_category = self.router.match(processed_text) if self.router is not None else None
+            if rule_category is not None and self.router.short_circuits:
+                result['category_id'] = rule_category
+                result['category_name'] = self.categories.get(rule_category, "others")
+                result['confidence'] = 1.0
+                result['source'] = "fast_path"
+                return result
+
+            cache_key = (self.model_version, processed_text)
+            cached = self.cache.get(cache_key) if self.cache is not None else None
+
+            if cached is not None:
+                predicted_class, confidence = cached
+                result['source'] = "cache"
+            else:
+                stage = time.perf_counter()
+                features = self._vectorize([processed_text])
+                timings['vectorize_ms'] = (time.perf_counter() - stage) * 1000
 
-            prediction = self.model.predict([processed_text])[0]
-            probabilities = self.model.predict_proba([processed_text])[0]
+                stage = time.perf_counter()
+                probabilities = self._predict_proba(features)[0]
+                timings['score_ms'] = (time.perf_counter() - stage) * 1000
 
-            predicted_index = np.argmax(probabilities)
-            predicted_class = self.model.classes_[predicted_index]
-            confidence = probabilities[predicted_index]
+                predicted_index = np.argmax(probabilities)
+                predicted_class = self.model.classes_[predicted_index]
+                confidence = float(probabilities[predicted_index])
+                if self.cache is not None:
+                    self.cache.put(cache_key, (predicted_class, confidence))
 
-            if confidence < confidence_threshold:
-                return "default", "others", confidence
+            if rule_category is not None:
+                model_ms = timings.get('vectorize_ms', 0.0) + timings.get('score_ms', 0.0)
+                self.router.record(rule_category, self._category_id(predicted_class), model_ms)
 
-            if predicted_class == 'default':
-                category_id = "default"
-            else:
-                category_id = int(predicted_class)
+            result['category_id'], result['category_name'], result['confidence'] = self._label(
+                predicted_class, confidence, confidence_threshold
+            )
+            return result
 
-            category_name = self.categories.get(category_id, "others")
+        except Exception as e:
+            print(f"Error in prediction: {e}", file=sys.stderr)
+            result['confidence'] = 0.0
+            return result
+
+        finally:
+            timings['classify_ms'] = (time.perf_counter() - start) * 1000
+            if self.instrumentation is not None:
+                self.instrumentation.observe_timings(timings)
+                self.instrumentation.observe_classification(
+                    result['category_name'], result['confidence'], result['source']
+                )
 
-            return category_id, category_name, confidence
+    def predict(self, request: str, confidence_threshold=0.3):
+        """Predict intent with confidence"""
+        result = self.classify(request, confidence_threshold)
+        return result['category_id'], result['category_name'], result['confidence']
+
+    def predict_batch(self, requests, confidence_threshold=0.3):
+        """Predict intents for a list of requests in one vectorized pass"""
+        if self.instrumentation is None:
+            return self._predict_batch(requests, confidence_threshold)
+
+        start = time.perf_counter()
+        sources = ["model"] * len(requests)
+        timings = {}
+        results = self._predict_batch(requests, confidence_threshold, sources, timings)
+        self.instrumentation.observe_stage('batch', time.perf_counter() - start)
+        # Each stage is observed once per batch, like 'batch' itself
+        self.instrumentation.observe_timings(timings)
+        for (_, category_name, confidence), source in zip(results, sources):
+            self.instrumentation.observe_classification(category_name, confidence, source)
+        return results
+
+    def _predict_batch(self, requests, confidence_threshold, sources=None, timings=None):
+        results = [("default", "others", 0.0)] * len(requests)
+        timings = {} if timings is None else timings
+        start = time.perf_counter()
+        processed = [self.preprocessor.preprocess(request) for request in requests]
+        timings['preprocess_ms'] = (time.perf_counter() - start) * 1000
+        version = self.model_version
+        pending = []
+        rule_hits = {}
+
+        for i, text in enumerate(processed):
+            if not text.strip():
+                continue
+
+            rule_category = self.router.match(text) if self.router is not None else None
+            if rule_category is not None:
+                if self.router.short_circuits:
+                    results[i] = (rule_category, self.categories.get(rule_category, "others"), 1.0)
+                    if sources is not None:
+                        sources[i] = "fast_path"
+                    continue
+                rule_hits[i] = rule_category
+
+            cached = self.cache.get((version, text)) if self.cache is not None else None
+            if cached is not None:
+                results[i] = self._label(*cached, confidence_threshold)
+                if sources is not None:
+                    sources[i] = "cache"
+            else:
+                pending.append(i)
 
-        except Exception as e:
-            print(f"Error in prediction: {e}")
-            return "default", "others", 0.0
+        if not pending:
+            return results
 
-    def save_model(self, filename="intent_model.pkl"):
-        with open(filename, 'wb') as f:
-            pickle.dump(self.model, f)
-        print(f"Model saved as {filename}")
+        try:
+            start = time.perf_counter()
+            features = self._vectorize([processed[i] for i in pending])
+            timings['vectorize_ms'] = (time.perf_counter() - start) * 1000
 
-    def load_model(self, filename="intent_model.pkl"):
+            start = time.perf_counter()
+            probabilities = self._predict_proba(features)
+            timings['score_ms'] = (time.perf_counter() - start) * 1000
+
+            # Each row's share of the batched model call, for the shadow router's saveable time
+            model_ms = (timings['vectorize_ms'] + timings['score_ms']) / len(pending)
+        except Exception as e:
+            print(f"Error in batch prediction: {e}", file=sys.stderr)
+            return results
+
+        predicted_indices = probabilities.argmax(axis=1)
+        confidences = probabilities[np.arange(len(pending)), predicted_indices]
+        predicted_classes = self.model.classes_[predicted_indices]
+
+        for i, predicted_class, confidence in zip(pending, predicted_classes, confidences):
+            confidence = float(confidence)
+            if self.cache is not None:
+                self.cache.put((version, processed[i]), (predicted_class, confidence))
+            if i in rule_hits:
+                self.router.record(rule_hits[i], self._category_id(predicted_class), model_ms)
+            results[i] = self._label(predicted_class, confidence, confidence_threshold)
+
+        return results
+
+    def _label(self, predicted_class, confidence, confidence_threshold):
+        if confidence < confidence_threshold:
+            return "default", "others", confidence
+
+        category_id = self._category_id(predicted_class)
+        return category_id, self.categories.get(category_id, "others"), confidence
+
+    def _category_id(self, predicted_class):
+        if predicted_class == 'default':
+            return "default"
+        return int(predicted_class)
+
+    def save_model(self, directory="intent_model", fingerprint=None, parity_texts=None):
+        """Save the trained model as a versioned, memory-mappable artifact"""
+        if hasattr(self.model, 'to_arrays'):
+            model = self.model
+        else:
+            model = compile_pipeline(self.model)
+            if parity_texts:
+                max_diff = check_parity(self.model, model, parity_texts)
+                print(f"Parity check passed on {len(parity_texts)} texts (max diff {max_diff:.2e})")
+
+        self.manifest = save_artifact(model, directory, fingerprint, self.metrics)
+        print(f"Model saved to {directory}/")
+
+    def load_model(self, directory="intent_model", expected_fingerprint=None):
+        """Load an artifact; raises ArtifactError if it does not match expected_fingerprint"""
+        model, self.manifest = load_artifact(directory, expected_fingerprint)
+        self._set_model(model)
+        self.metrics = self.manifest.get("metrics", {})
+        print(f"Model loaded from {directory}/")
+
+    def load_pickle(self, filename="intent_model.pkl"):
+        """Load a legacy pickled Pipeline so it can be re-saved as an artifact"""
         with open(filename, 'rb') as f:
-            self.model = pickle.load(f)
-        print(f"Model loaded from {filename}")
+            self._set_model(pickle.load(f))
+        print(f"Legacy model loaded from {filename}")
+
+def read_batch_records(stream):
+    """Yield one record per non-empty line, accepting JSONL or plain text"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            if isinstance(record, dict) and isinstance(record.get('text'), str):
+                yield record
+                continue
+
+        yield {"text": line}
+
+def join_fragments(output):
+    """Whole reply from a handler's string, generator or async generator output"""
+    if isinstance(output, str):
+        return output
+    if hasattr(output, "__aiter__"):
+        async def collect():
+            return "".join([fragment async for fragment in output])
+        return asyncio.run(collect())
+    return "".join(output)
 
 class QueryAgent:
-    def __init__(self, classifier, confidence_threshold=0.0001):
+    def __init__(self, classifier, confidence_threshold=0.0001, handlers=None, sessions=None):
+        from config import SESSIONS
         self.classifier = classifier
         self.confidence_threshold = confidence_threshold
 
-        # Mapping of category_id to handler functions
-        self.handler_map = {
-            1: handle_earning,
-            2: handle_business,
-            3: handle_safety,
-            4: handle_quarterly_earning,
-            5: handle_daily_earning,
-            6: handle_improve_earning,
-            7: handle_growth,
-            8: handle_weather,
-            "default": handle_default
+        # category_id -> "module:function"; validated now, imported on first use
+        if handlers is None:
+            from config import HANDLERS as handlers
+        self.handlers = HandlerRegistry(classifier.categories, handlers)
+
+        self.sessions = sessions if sessions is not None else get_session_store()
+        self.default_driver_id = SESSIONS['default_driver_id']
+
+    def session(self, driver_id=None):
+        """The driver's stored session, or a one-off session when no driver ID is known"""
+        if driver_id is None:
+            return Session(self.default_driver_id)
+        return self.sessions.get(driver_id)
+
+    def resume(self, request, session):
+        """Start a turn; a result routed to the handler waiting for this message, or None to classify it"""
+        category_id = session.begin_turn(request)
+        if category_id is None:
+            return None
+
+        category_name = self.classifier.categories.get(category_id, "others")
+        if self.classifier.instrumentation is not None:
+            self.classifier.instrumentation.observe_classification(category_name, 1.0, "session")
+        return {
+            "request": request,
+            "category_id": category_id,
+            "category_name": category_name,
+            "confidence": 1.0,
+            "is_confident": True,
+            "source": "session",
+            "timings": {},
         }
 
     def process_request(self, request: str):
-        category_id, category_name, confidence = self.classifier.predict(
-            request, self.confidence_threshold
-        )
+        result = self.classifier.classify(request, self.confidence_threshold)
+        confidence = result['confidence']
 
         return {
             "request": request,
-            "category_id": category_id,
-            "category_name": category_name,
+            "category_id": result['category_id'],
+            "category_name": result['category_name'],
             "confidence": round(confidence, 4),
-            "is_confident": confidence > self.confidence_threshold
+            "is_confident": confidence > self.confidence_threshold,
+            "source": result['source'],
+            "timings": result['timings']
         }
 
-    def get_response(self, category_id, request):
-        """Call the appropriate handler function"""
-        handler = self.handler_map.get(category_id, self.handler_map["default"])
-        return handler(request)
+    def process_batch(self, requests):
+        """Classify many requests with one model call"""
+        predictions = self.classifier.predict_batch(requests, self.confidence_threshold)
+
+        return [
+            {
+                "request": request,
+                "category_id": category_id,
+                "category_name": category_name,
+                "confidence": round(confidence, 4),
+                "is_confident": confidence > self.confidence_threshold
+            }
+            for request, (category_id, category_name, confidence) in zip(requests, predictions)
+        ]
+
+    def open_response(self, category_id, request, session):
+        """Call the handler: a reply string, or a generator / async generator of reply fragments.
+
+        Generator bodies run while they are consumed; call close_response once they are done.
+        """
+        return self.handlers.get(category_id)(request, session)
+
+    def close_response(self, category_id, session, start):
+        """End the turn (a question the handler asked stays pending) and record handler time"""
+        session.end_turn(category_id)
+        instrumentation = self.classifier.instrumentation
+        if instrumentation is not None:
+            category_name = self.classifier.categories.get(category_id, "others")
+            instrumentation.observe_stage('handler', time.perf_counter() - start, category_name)
+
+    def get_response(self, category_id, request, session=None):
+        """Call the appropriate handler and return its whole reply, joining streamed fragments"""
+        if session is None:
+            session = self.session()
+        start = time.perf_counter()
+        try:
+            return join_fragments(self.open_response(category_id, request, session))
+        finally:
+            self.close_response(category_id, session, start)
+
+    def run(self, request: str, driver_id=None):
+        """Classify a request once (unless it answers a pending follow-up) and dispatch it"""
+        start = time.perf_counter()
+        session = self.session(driver_id)
+        result = self.resume(request, session) or self.process_request(request)
 
-    def handle_query(self, request: str):
-        result = self.process_request(request)
-        response = self.get_response(result['category_id'], request)
+        stage = time.perf_counter()
+        result['response'] = self.get_response(result['category_id'], request, session)
+        result['timings']['handler_ms'] = (time.perf_counter() - stage) * 1000
+        result['timings']['total_ms'] = (time.perf_counter() - start) * 1000
 
+        return result
+
+    def format_response(self, result):
         if result['is_confident']:
-            return f"{response} (Confidence: {result['confidence']:.2%})"
+            return f"{result['response']} (Confidence: {result['confidence']:.2%})"
         else:
-            return response
+            return result['response']
+
+    def handle_query(self, request: str):
+        return self.format_response(self.run(request))
 
     def test_queries(self, queries):
         print("Testing sample queries:")
         print("=" * 60)
 
         for query in queries:
-            result = self.process_request(query)
-            response = self.get_response(result['category_id'], query)
+            result = self.run(query)
 
             print(f"\nQuery: '{query}'")
             print(f"Category: {result['category_name']} (ID: {result['category_id']})")
             print(f"Confidence: {result['confidence']:.2%}")
             print(f"Confident: {result['is_confident']}")
-            print(f"Response: {response}")
+            print(f"Response: {result['response']}")
             print("-" * 40)
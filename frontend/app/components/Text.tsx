@@ -9,6 +9,7 @@ import SpeechRecognition, { useSpeechRecognition } from "react-speech-recognitio
  * - uses NEXT_PUBLIC_ASSISTANT_URL or defaults to /api/assistant/query
  * - prevents duplicate sends
  * - shows processing state
+ * - streams the reply (server-sent events) so the first paragraph shows before the rest is ready
  * - persists conversation to localStorage
  * - checks mic permission before starting
  * - uses aria-live for accessibility
@@ -23,6 +24,31 @@ type ConversationEntry = {
 const STORAGE_KEY = "saathi_conversation_v1";
 const API_URL = process.env.NEXT_PUBLIC_ASSISTANT_URL || "/api/assistant/query";
 
+// Calls onEvent(event, data) for each server-sent event in a fetch response body
+async function readEventStream(body: ReadableStream<Uint8Array>, onEvent: (event: string, data: any) => void) {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let event = "message";
+      let data = "";
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
 export default function SaathiAssistant() {
   const [conversation, setConversation] = useState<ConversationEntry[]>(() => {
     try {
@@ -69,8 +95,8 @@ export default function SaathiAssistant() {
     try {
       const res = await fetch(API_URL, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ driverId: 1, text, lang: "hi" }),
+        headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+        body: JSON.stringify({ driver_id: "1", text, lang: "hi" }),
       });
 
       if (!res.ok) {
@@ -80,11 +106,28 @@ export default function SaathiAssistant() {
         throw new Error(msg);
       }
 
-      const data = await res.json();
-      const reply = data.reply ?? (data?.message ?? "Maaf, kuch galat hua.");
-
-      // append assistant reply
-      setConversation((p) => [...p, { speaker: "saathi", text: reply, timestamp: Date.now() }]);
+      let reply = "";
+      if (res.body && (res.headers.get("content-type") || "").includes("text/event-stream")) {
+        // Show the reply as it streams in: one saathi entry, extended chunk by chunk
+        setConversation((p) => [...p, { speaker: "saathi", text: "", timestamp: Date.now() }]);
+        await readEventStream(res.body, (event, data) => {
+          if (event === "error") throw new Error(data?.error || "Server error");
+          if (event !== "chunk") return;
+          reply += data.text;
+          const partial = reply;
+          setConversation((p) => {
+            const next = p.slice();
+            next[next.length - 1] = { ...next[next.length - 1], text: partial };
+            return next;
+          });
+        });
+        if (!reply) throw new Error("Maaf, kuch galat hua.");
+      } else {
+        const data = await res.json();
+        reply = data.reply ?? (data?.message ?? "Maaf, kuch galat hua.");
+        // append assistant reply
+        setConversation((p) => [...p, { speaker: "saathi", text: reply, timestamp: Date.now() }]);
+      }
       speakText(reply);
     } catch (err: any) {
       const msg = err?.message || "Network error";